@@ -1,116 +1,109 @@
-//==============================================================================
-//DESCRIPTION:
-// *
-//
-//MODIFICATION HISTORY:---------------------------------------------------------
-//   Version | Author | Date       | Changes
-//   :-----: | :----: | :--------: | -------------------------------------------
-//   0.1     | hid4net | 2022-05-12 | start to coding
-//
-//==============================================================================
-"use strict"
-//------------------------------------------------------------------------------
-const vscode = require('vscode')
-const os = require("os")
-const path = require('path')
-const fs = require('fs')
-const cp = require('child_process')
-
-//------------------------------------------------------------------------------
-
-class vlgInstTb {
-    constructor(context) {
-        this.context = context;
-    }
-
-    // save the code in %tmp%, with "utf-8"
-    _save_code() {
-        // get code
-        const actEditor = vscode.window.activeTextEditor
-        if (!actEditor) {
-            return ""
-        }
-        const code = actEditor.document.getText()
-        // save the code to OS.tempFile, with "utf-8"
-        const tmpFile = path.join(os.tmpdir(), 'code')
-        fs.writeFileSync(tmpFile, code, 'utf-8')
-        return tmpFile
-    }
-
-    // get the path of the "pyTool"
-    _get_pyTool() {
-        let pyTool = path.join(this.context.extensionUri.fsPath, "src", "pyTools", "hyhdl")
-        if (os.platform() == 'win32') {
-            pyTool += '.exe'
-        } else {
-            pyTool = "python3 " + pyTool + '.py'
-        }
-        return pyTool
-    }
-
-    get_inst() {
-        // save the code in %tmp%, with "utf-8"
-        let tmpFile = this._save_code()
-        if (!tmpFile) {
-            return
-        }
-        // format command
-        let pyToolCmd = this._get_pyTool() + ` -i "${tmpFile}"`
-        // run command
-        cp.exec(pyToolCmd, (err, stdout, stderr) => {
-            if (err) {
-                console.log(err);
-                console.log(stderr);
-                return
-            }
-            tmpFile = stdout.replace("\r", "").replace("\n", "");
-            // write the code of instantiation to the clipboard
-            vscode.env.clipboard.writeText(fs.readFileSync(tmpFile, "utf8"))
-            vscode.window.showInformationMessage(`hyhdl: the instantiation code is copied to the clipboard`)
-        });
-    }
-
-    // get the testbench template file
-    _get_tb_template() {
-        let templateFile = vscode.workspace.getConfiguration("hyhdl").get("Testbench template file path")
-        if (templateFile !== "") {
-            if (!fs.existsSync(templateFile)) {
-                vscode.window.showWarningMessage(`user specified testbench template does not exist, using default template`)
-                templateFile = ""
-            }
-        }
-        return templateFile
-    }
-
-    get_testbench() {
-        // save the code in %tmp%, with "utf-8"
-        let tmpFile = this._save_code()
-        if (!tmpFile) {
-            return
-        }
-        // get the testbench template file
-        const templateFile = this._get_tb_template()
-        // format command
-        let pyToolCmd = this._get_pyTool() + ` -t "${tmpFile}"`
-        if (templateFile) {
-            pyToolCmd += ` -T "${templateFile}"`
-        }
-        // run command
-        cp.exec(pyToolCmd, (err, stdout, stderr) => {
-            if (err) {
-                console.log(err);
-                console.log(stderr);
-                return
-            }
-            tmpFile = stdout.replace("\r", "").replace("\n", "");
-            // copy the testbench to an new document
-            const newDoc = vscode.workspace.openTextDocument({ language: "verilog", content: fs.readFileSync(tmpFile, "utf8") })
-            vscode.window.showTextDocument(newDoc)
-            vscode.window.showInformationMessage(`hyhdl: The code of testbench has been generated`)
-        });
-    }
-}
-//------------------------------------------------------------------------------
-module.exports = {
-    vlgInstTb
-}
+//==============================================================================
+//DESCRIPTION:
+// *
+//
+//MODIFICATION HISTORY:---------------------------------------------------------
+//   Version | Author | Date       | Changes
+//   :-----: | :----: | :--------: | -------------------------------------------
+//   0.1     | hid4net | 2022-05-12 | start to coding
+//   0.2     | hid4net | 2026-10-18 | the path of a large saved file is sent instead of its code
+//   0.3     | hid4net | 2026-10-18 | the path is sent with the code, to find the `include files
+//   0.4     | hid4net | 2026-10-18 | the cursor offset is sent in code points
+//
+//==============================================================================
+"use strict"
+//------------------------------------------------------------------------------
+const vscode = require('vscode')
+const fs = require('fs')
+const { codePointOffset } = require('./pyToolServer')
+
+//------------------------------------------------------------------------------
+// a saved file not smaller than this is read by the "pyTool" itself, only its module statements are scanned
+const LARGE_FILE_SIZE = 4 * 1024 * 1024
+
+//------------------------------------------------------------------------------
+
+class vlgInstTb {
+    /**
+     * @param {vscode.ExtensionContext} context
+     * @param {import('./pyToolServer').pyToolServer} server
+     */
+    constructor(context, server) {
+        this.context = context;
+        this.server = server;
+    }
+
+    // get the code of the active editor and the cursor offset, they are sent to the "pyTool" directly
+    // the cursor offset selects the module when there are several modules in the file
+    // a large saved file (e.g. a netlist) is not sent, the "pyTool" maps the file and reads only the module statements
+    _get_code() {
+        const actEditor = vscode.window.activeTextEditor
+        if (!actEditor) {
+            return {}
+        }
+        const document = actEditor.document
+        const position = actEditor.selection.active
+        const offset = codePointOffset(document, position)
+        if (document.uri.scheme === "file" && !document.isDirty) {
+            try {
+                if (fs.statSync(document.fileName).size >= LARGE_FILE_SIZE) {
+                    // the "pyTool" reads "\r\n" as "\n", one character less per line
+                    const crlf = document.eol === vscode.EndOfLine.CRLF
+                    return { file: document.fileName, offset: crlf ? offset - position.line : offset }
+                }
+            } catch (err) {
+                console.log(err)
+            }
+        }
+        // the path is only used to find the `include files beside the file
+        const file = document.uri.scheme === "file" ? document.fileName : undefined
+        return { code: document.getText(), offset: offset, file: file }
+    }
+
+    get_inst() {
+        // get the code
+        const req = this._get_code()
+        if (!req.code && !req.file) {
+            return
+        }
+        // run command
+        this.server.request("get_inst", req).then((inst) => {
+            // write the code of instantiation to the clipboard
+            vscode.env.clipboard.writeText(inst)
+            vscode.window.showInformationMessage(`hyhdl: the instantiation code is copied to the clipboard`)
+        }).catch((err) => { console.log(err) });
+    }
+
+    // get the testbench template file
+    _get_tb_template() {
+        let templateFile = vscode.workspace.getConfiguration("hyhdl").get("Testbench template file path")
+        if (templateFile !== "") {
+            if (!fs.existsSync(templateFile)) {
+                vscode.window.showWarningMessage(`user specified testbench template does not exist, using default template`)
+                templateFile = ""
+            }
+        }
+        return templateFile
+    }
+
+    get_testbench() {
+        // get the code
+        const req = this._get_code()
+        if (!req.code && !req.file) {
+            return
+        }
+        // get the testbench template file
+        req.template = this._get_tb_template()
+        // run command
+        this.server.request("get_testbench", req).then((testbench) => {
+            // copy the testbench to an new document
+            const newDoc = vscode.workspace.openTextDocument({ language: "verilog", content: testbench })
+            vscode.window.showTextDocument(newDoc)
+            vscode.window.showInformationMessage(`hyhdl: The code of testbench has been generated`)
+        }).catch((err) => { console.log(err) });
+    }
+}
+//------------------------------------------------------------------------------
+module.exports = {
+    vlgInstTb
+}
@@ -1,160 +1,251 @@
-//==============================================================================
-//DESCRIPTION:
-// *
-//
-//MODIFICATION HISTORY:---------------------------------------------------------
-//   Version | Author | Date       | Changes
-//   :-----: | :----: | :--------: | -------------------------------------------
-//   0.1     | hid4net | 2022-05-12 | start to coding
-//
-//==============================================================================
-"use strict"
-//------------------------------------------------------------------------------
-const vscode = require('vscode')
-const os = require("os")
-const path = require('path')
-const fs = require('fs')
-const cp = require('child_process')
-
-//------------------------------------------------------------------------------
-
-class documentor {
-    panel = undefined
-    curDocument = undefined
-    /**
-     * @param {vscode.ExtensionContext} context
-     */
-    constructor(context) {
-        this.context = context;
-    }
-
-    openPreview() {
-        const actEditor = vscode.window.activeTextEditor
-        if (!actEditor) {
-            return
-        }
-        const actDoc = actEditor.document
-        if (actDoc === undefined) {
-            return
-        }
-
-        if (this.panel === undefined) {
-            this.panel = vscode.window.createWebviewPanel(
-                'Documentation',
-                'Preview: documentation',
-                vscode.ViewColumn.Two,
-                {
-                    enableScripts: true,
-                    retainContextWhenHidden: true,
-                    // localResourceRoots: [vscode.Uri.joinPath(this.context.extensionUri, "src", "pyTools", "wavedrom")]
-                    localResourceRoots: [vscode.Uri.file(path.join(this.context.extensionPath, "src", "pyTools", "wavedrom"))]
-                }
-            );
-            this.panel.onDidDispose(
-                () => { this.panel = undefined; },
-                undefined,
-                this.context.subscriptions
-            );
-            this.panel.webview.onDidReceiveMessage(
-                message => {
-                    if (message.command == "export") {
-                        if (message.text == "html") {
-                            this.exportHtml(message.text)
-                        }
-                    }
-                },
-                undefined,
-                this.context.subscriptions
-            );
-        }
-        //---------- 更新 html ----------
-        this.updatePreview(actDoc);
-    }
-
-    // save the code in %tmp%, with "utf-8"
-    _save_code(document) {
-        // get code
-        const code = document.getText()
-        // save the code to OS.tempFile, with "utf-8"
-        const tmpFile = path.join(os.tmpdir(), 'code')
-        fs.writeFileSync(tmpFile, code, 'utf-8')
-        return tmpFile
-    }
-
-    // get the path of the "pyTool"
-    _get_pyTool() {
-        let pyTool = path.join(this.context.extensionUri.fsPath, "src", "pyTools", "hyhdl")
-        if (os.platform() == 'win32') {
-            pyTool += '.exe'
-        } else {
-            pyTool = "python3 " + pyTool + '.py'
-        }
-        return pyTool
-    }
-
-    updatePreview(document) {
-        this.curDocument = document
-        // save the code in %tmp%, with "utf-8"
-        let tmpFile = this._save_code(document)
-        // format command
-        let pyToolCmd = this._get_pyTool() + ` -p "${tmpFile}"`
-        // run command
-        cp.exec(pyToolCmd, (err, stdout, stderr) => {
-            if (err) {
-                console.log(err);
-                console.log(stderr);
-                return
-            }
-            //---------- update preview ----------
-            tmpFile = stdout.replace("\r", "").replace("\n", "");
-            this.panel.webview.html = fs.readFileSync(tmpFile, "utf8");
-        });
-    }
-
-    exportHtml(export_type) {
-        const docPath = this.curDocument.uri.fsPath
-        if (fs.existsSync(docPath)) {   // 判断文件是否保存在硬盘中
-            // save the code in %tmp%, with "utf-8"
-            let tmpFile = this._save_code(this.curDocument)
-            // format command
-            let pyToolCmd = this._get_pyTool() + ` -e "${tmpFile}"`
-            // run command
-            cp.exec(pyToolCmd, (err, stdout, stderr) => {
-                if (err) {
-                    console.log(err);
-                    console.log(stderr);
-                    return
-                }
-                tmpFile = stdout.replace("\r", "").replace("\n", "");
-                // export the html
-                const tPath = path.parse(docPath)
-                const html_path = path.join(tPath.dir, tPath.name + ".html")
-                fs.copyFileSync(tmpFile, html_path)
-                vscode.window.showInformationMessage(`hyhdl: The README document has been exported to ${html_path}`)
-            });
-        }
-        else {
-            vscode.window.showWarningMessage(`hyhdl: currently edited file needs be saved firstly`)
-        }
-    }
-
-    updateOpenedPreview(document) {
-        const langId = document.languageId
-        if (langId !== "verilog" && langId !== "systemverilog") {
-            return
-        }
-        this.updatePreview(document)
-    }
-
-    updatePreviewOnVisible(textEditors) {
-        if (textEditors.length === 0) {
-            return
-        }
-        const document = textEditors[textEditors.length - 1].document
-        this.updateOpenedPreview(document)
-    }
-}
-//------------------------------------------------------------------------------
-module.exports = {
-    documentor
-}
+//==============================================================================
+//DESCRIPTION:
+// *
+//
+//MODIFICATION HISTORY:---------------------------------------------------------
+//   Version | Author | Date       | Changes
+//   :-----: | :----: | :--------: | -------------------------------------------
+//   0.1     | hid4net | 2022-05-12 | start to coding
+//   0.2     | hid4net | 2026-10-18 | live preview while typing, only the edits are sent
+//   0.3     | hid4net | 2026-10-18 | selectable wavedrom skin, preview references the wavedrom scripts
+//   0.4     | hid4net | 2026-10-18 | the waves are rendered to svg by the "pyTool" by default
+//   0.5     | hid4net | 2026-10-18 | only the changed sections of the preview are patched in place
+//   0.6     | hid4net | 2026-10-18 | the ports of the block diagram can be grouped by bus
+//   0.7     | hid4net | 2026-10-18 | the path is sent with the code, to find the `include files
+//   0.8     | hid4net | 2026-10-18 | the previews superseded by a newer request are skipped
+//   0.9     | hid4net | 2026-10-18 | the whole code is sent while the document has characters out of the BMP (e.g. emoji)
+//
+//==============================================================================
+"use strict"
+//------------------------------------------------------------------------------
+const vscode = require('vscode')
+const path = require('path')
+const fs = require('fs')
+const { SURROGATE, codePointOffset } = require('./pyToolServer')
+
+//------------------------------------------------------------------------------
+
+class documentor {
+    panel = undefined
+    curDocument = undefined
+    pendingEdits = []       // edits of curDocument not yet sent to the "pyTool"
+    hasSurrogates = false   // curDocument has surrogate pairs, the offsets of vscode (UTF-16) differ from the "pyTool" (code points)
+    editTimer = undefined
+    shownDoc = undefined    // the document shown in the preview, its sections can be patched
+    /**
+     * @param {vscode.ExtensionContext} context
+     * @param {import('./pyToolServer').pyToolServer} server
+     */
+    constructor(context, server) {
+        this.context = context;
+        this.server = server;
+    }
+
+    openPreview() {
+        const actEditor = vscode.window.activeTextEditor
+        if (!actEditor) {
+            return
+        }
+        const actDoc = actEditor.document
+        if (actDoc === undefined) {
+            return
+        }
+
+        if (this.panel === undefined) {
+            this.panel = vscode.window.createWebviewPanel(
+                'Documentation',
+                'Preview: documentation',
+                vscode.ViewColumn.Two,
+                {
+                    enableScripts: true,
+                    retainContextWhenHidden: true,
+                    // localResourceRoots: [vscode.Uri.joinPath(this.context.extensionUri, "src", "pyTools", "wavedrom")]
+                    localResourceRoots: [this._wavedromDir()]
+                }
+            );
+            this.shownDoc = undefined
+            this.panel.onDidDispose(
+                () => { this.panel = undefined; this.shownDoc = undefined; },
+                undefined,
+                this.context.subscriptions
+            );
+            this.panel.webview.onDidReceiveMessage(
+                message => {
+                    if (message.command == "export") {
+                        if (message.text == "html") {
+                            this.exportHtml(message.text)
+                        }
+                    }
+                    else if (message.command == "resync" && this.curDocument !== undefined) {
+                        // the preview lost some sections, reload the whole html
+                        this.shownDoc = undefined
+                        this.updatePreview(this.curDocument)
+                    }
+                },
+                undefined,
+                this.context.subscriptions
+            );
+        }
+        //---------- 更新 html ----------
+        this.updatePreview(actDoc);
+    }
+
+    _wavedromDir() {
+        return vscode.Uri.file(path.join(this.context.extensionPath, "src", "pyTools", "wavedrom"))
+    }
+
+    // the skin and the renderer of the wavedrom waves, the block diagram mode,
+    // and the uri of the wavedrom scripts in the webview (not embedded in the html)
+    _assetOptions() {
+        const config = vscode.workspace.getConfiguration("hyhdl")
+        const options = {
+            skin: config.get("Wavedrom skin") || "default",
+            wave: config.get("Wavedrom renderer") || "svg",
+            diagram: config.get("Diagram ports") || "auto"
+        }
+        if (this.panel !== undefined) {
+            options.asset_uri = this.panel.webview.asWebviewUri(this._wavedromDir()).toString()
+        }
+        return options
+    }
+
+    // get the cursor offset if the document is in the active editor, it selects the module to be shown
+    _get_offset(document) {
+        const actEditor = vscode.window.activeTextEditor
+        if (!actEditor || actEditor.document !== document) {
+            return undefined
+        }
+        const position = actEditor.selection.active
+        return this.hasSurrogates ? codePointOffset(document, position) : document.offsetAt(position)
+    }
+
+    // the path of a saved document, only used to find the `include files beside it
+    _get_file(document) {
+        return document.uri.scheme === "file" ? document.fileName : undefined
+    }
+
+    // the "pyTool" returns the whole html, or only the changed sections if the document is already shown
+    _showPreview(document, result) {
+        // null: superseded by a newer request of the document, whose result follows
+        if (this.panel === undefined || result === null) {
+            return
+        }
+        if (typeof result === "string") {
+            this.panel.webview.html = result;
+        }
+        else {
+            this.panel.webview.postMessage({ command: "patch", ids: result.ids, sections: result.sections })
+        }
+        this.shownDoc = document.uri.toString()
+    }
+
+    updatePreview(document) {
+        this.curDocument = document
+        // the whole code includes the pending edits
+        this.pendingEdits = []
+        clearTimeout(this.editTimer)
+        // run command, the code is sent to the "pyTool" directly, which keeps the parsed document as "doc"
+        const doc = document.uri.toString()
+        const code = document.getText()
+        this.hasSurrogates = SURROGATE.test(code)
+        const req = { doc: doc, code: code, file: this._get_file(document), offset: this._get_offset(document), patch: this.shownDoc === doc, ...this._assetOptions() }
+        this.server.request("get_preview_html", req).then((result) => {
+            //---------- update preview ----------
+            this._showPreview(document, result)
+        }).catch((err) => { console.log(err) });
+    }
+
+    // collect the edits while typing, send them together after a short delay
+    updatePreviewOnChange(e) {
+        if (this.panel === undefined || e.document !== this.curDocument || e.contentChanges.length === 0) {
+            return
+        }
+        // the offsets of vscode count UTF-16 code units, the same as code points only without surrogate pairs
+        // the document before the event has none: the offsets are exact, and it has some afterwards only if they are inserted
+        // otherwise the whole code is sent (which checks the document again)
+        const document = e.document
+        if (!this.hasSurrogates && e.contentChanges.some((change) => SURROGATE.test(change.text))) {
+            this.hasSurrogates = true
+        }
+        if (!this.hasSurrogates) {
+            // the changes of one event refer to the document before the event, apply them from the end
+            const changes = [...e.contentChanges].sort((a, b) => b.rangeOffset - a.rangeOffset)
+            for (const change of changes) {
+                this.pendingEdits.push([change.rangeOffset, change.rangeLength, change.text])
+            }
+        }
+        clearTimeout(this.editTimer)
+        this.editTimer = setTimeout(() => { this.hasSurrogates ? this.updatePreview(document) : this._sendEdits() }, 300)
+    }
+
+    _sendEdits() {
+        const document = this.curDocument
+        const edits = this.pendingEdits
+        this.pendingEdits = []
+        if (document === undefined || edits.length === 0) {
+            return
+        }
+        // only the edits are sent, the "pyTool" re-parses the affected parts
+        const doc = document.uri.toString()
+        const req = { doc: doc, edits: edits, offset: this._get_offset(document), patch: this.shownDoc === doc, ...this._assetOptions() }
+        this.server.request("get_preview_html", req).then((result) => {
+            this._showPreview(document, result)
+        }).catch((err) => {
+            // the "pyTool" lost the document (e.g. restarted), send the whole code
+            console.log(err)
+            this.updatePreview(document)
+        });
+    }
+
+    closeDocument(document) {
+        const langId = document.languageId
+        if (langId !== "verilog" && langId !== "systemverilog") {
+            return
+        }
+        this.server.request("close_doc", { doc: document.uri.toString() }).catch((err) => { console.log(err) });
+        if (document === this.curDocument) {
+            this.pendingEdits = []
+            clearTimeout(this.editTimer)
+        }
+    }
+
+    exportHtml(export_type) {
+        const docPath = this.curDocument.uri.fsPath
+        if (fs.existsSync(docPath)) {   // 判断文件是否保存在硬盘中
+            // run command, the code is sent to the "pyTool" directly
+            // the exported html is opened alone, the wavedrom scripts are embedded
+            const { skin, wave, diagram } = this._assetOptions()
+            const req = { code: this.curDocument.getText(), file: docPath, offset: this._get_offset(this.curDocument), skin: skin, wave: wave, diagram: diagram }
+            this.server.request("get_export_html", req).then((html) => {
+                // export the html
+                const tPath = path.parse(docPath)
+                const html_path = path.join(tPath.dir, tPath.name + ".html")
+                fs.writeFileSync(html_path, html, 'utf-8')
+                vscode.window.showInformationMessage(`hyhdl: The README document has been exported to ${html_path}`)
+            }).catch((err) => { console.log(err) });
+        }
+        else {
+            vscode.window.showWarningMessage(`hyhdl: currently edited file needs be saved firstly`)
+        }
+    }
+
+    updateOpenedPreview(document) {
+        const langId = document.languageId
+        if (langId !== "verilog" && langId !== "systemverilog") {
+            return
+        }
+        this.updatePreview(document)
+    }
+
+    updatePreviewOnVisible(textEditors) {
+        if (textEditors.length === 0) {
+            return
+        }
+        const document = textEditors[textEditors.length - 1].document
+        this.updateOpenedPreview(document)
+    }
+}
+//------------------------------------------------------------------------------
+module.exports = {
+    documentor
+}
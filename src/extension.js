@@ -1,41 +1,53 @@
-//==============================================================================
-//DESCRIPTION:
-// *
-//
-//MODIFICATION HISTORY:---------------------------------------------------------
-//   Version | Author | Date       | Changes
-//   :-----: | :----: | :--------: | -------------------------------------------
-//   0.1     | hid4net | 2022-05-12 | start to coding
-//
-//==============================================================================
-"use strict"
-//==============================================================================
-const vscode = require('vscode');
-const codeTemplate = require('./codeTemplate')      // myCode: realize instantiation and testbench generation
-const documentation = require('./documentation')    // myCode: realize documentation
-//------------------------------------------------------------------------------
-/**
- * @param {vscode.ExtensionContext} context
- */
-function activate(context) {
-    //---------- codeTemplate: instantiation and testbench ----------
-    const vlgInstTb = new codeTemplate.vlgInstTb(context) // myCode: instantiate a object
-    context.subscriptions.push(vscode.commands.registerCommand('hyhdl.instantiation', () => { vlgInstTb.get_inst() }));     // myCode: enable the command of instantiation
-    context.subscriptions.push(vscode.commands.registerCommand('hyhdl.testbench', () => { vlgInstTb.get_testbench() }));    // myCode: enable the command of testbench
-    //---------- documentation ----------
-    const myDocumentor = new documentation.documentor(context) // myCode: instantiate a object
-    context.subscriptions.push(
-        vscode.commands.registerCommand('hyhdl.documentation', () => { myDocumentor.openPreview() }),   // myCode: enable the command of documentation
-        vscode.workspace.onDidOpenTextDocument((e) => { myDocumentor.updateOpenedPreview(e) }),         // myCode: update the documentation preview when an new verilog file is open
-        vscode.workspace.onDidSaveTextDocument((e) => { myDocumentor.updateOpenedPreview(e) }),         // myCode: update the documentation preview when the current verilog file is saved
-        // vscode.window.onDidChangeActiveTextEditor((e) => (myDocumentor.updateOpenedPreview(e))),
-        vscode.window.onDidChangeVisibleTextEditors((e) => { myDocumentor.updatePreviewOnVisible(e) }), // myCode: update the documentation preview when the visibility of the verilog file is changed
-    );
-}
-//------------------------------------------------------------------------------
-function deactivate() { }
-//------------------------------------------------------------------------------
-module.exports = {
-    activate,
-    deactivate
-}
+//==============================================================================
+//DESCRIPTION:
+// *
+//
+//MODIFICATION HISTORY:---------------------------------------------------------
+//   Version | Author | Date       | Changes
+//   :-----: | :----: | :--------: | -------------------------------------------
+//   0.1     | hid4net | 2022-05-12 | start to coding
+//   0.2     | hid4net | 2026-10-18 | resend the preprocessor settings when they are changed
+//
+//==============================================================================
+"use strict"
+//==============================================================================
+const vscode = require('vscode');
+const codeTemplate = require('./codeTemplate')      // myCode: realize instantiation and testbench generation
+const documentation = require('./documentation')    // myCode: realize documentation
+const pyToolServer = require('./pyToolServer')      // myCode: keep the pyTool running in server mode
+//------------------------------------------------------------------------------
+/**
+ * @param {vscode.ExtensionContext} context
+ */
+function activate(context) {
+    //---------- pyTool server ----------
+    const server = new pyToolServer.pyToolServer(context) // myCode: shared by all the commands
+    context.subscriptions.push(server);
+    context.subscriptions.push(vscode.workspace.onDidChangeConfiguration((e) => {
+        if (e.affectsConfiguration("hyhdl.Verilog defines") || e.affectsConfiguration("hyhdl.Include directories")) {
+            server.configure().catch((err) => { console.log(err) })   // myCode: the macros and the include directories of the preprocessor
+        }
+    }));
+    //---------- codeTemplate: instantiation and testbench ----------
+    const vlgInstTb = new codeTemplate.vlgInstTb(context, server) // myCode: instantiate a object
+    context.subscriptions.push(vscode.commands.registerCommand('hyhdl.instantiation', () => { vlgInstTb.get_inst() }));     // myCode: enable the command of instantiation
+    context.subscriptions.push(vscode.commands.registerCommand('hyhdl.testbench', () => { vlgInstTb.get_testbench() }));    // myCode: enable the command of testbench
+    //---------- documentation ----------
+    const myDocumentor = new documentation.documentor(context, server) // myCode: instantiate a object
+    context.subscriptions.push(
+        vscode.commands.registerCommand('hyhdl.documentation', () => { myDocumentor.openPreview() }),   // myCode: enable the command of documentation
+        vscode.workspace.onDidOpenTextDocument((e) => { myDocumentor.updateOpenedPreview(e) }),         // myCode: update the documentation preview when an new verilog file is open
+        vscode.workspace.onDidSaveTextDocument((e) => { myDocumentor.updateOpenedPreview(e) }),         // myCode: update the documentation preview when the current verilog file is saved
+        vscode.workspace.onDidChangeTextDocument((e) => { myDocumentor.updatePreviewOnChange(e) }),     // myCode: update the documentation preview while typing, only the edits are sent
+        vscode.workspace.onDidCloseTextDocument((e) => { myDocumentor.closeDocument(e) }),              // myCode: forget the parsed document in the pyTool
+        // vscode.window.onDidChangeActiveTextEditor((e) => (myDocumentor.updateOpenedPreview(e))),
+        vscode.window.onDidChangeVisibleTextEditors((e) => { myDocumentor.updatePreviewOnVisible(e) }), // myCode: update the documentation preview when the visibility of the verilog file is changed
+    );
+}
+//------------------------------------------------------------------------------
+function deactivate() { }
+//------------------------------------------------------------------------------
+module.exports = {
+    activate,
+    deactivate
+}
@@ -0,0 +1,159 @@
+//==============================================================================
+//DESCRIPTION:
+// * keep the "pyTool" running in server mode (hyhdl -s), so that every command
+// * does not pay for the startup of the interpreter and the loading of libraries
+// * protocol: newline-delimited json over stdin/stdout
+//
+//MODIFICATION HISTORY:---------------------------------------------------------
+//   Version | Author | Date       | Changes
+//   :-----: | :----: | :--------: | -------------------------------------------
+//   0.1     | hid4net | 2026-10-18 | start to coding
+//   0.2     | hid4net | 2026-10-18 | send the preprocessor settings (macros, include directories)
+//   0.3     | hid4net | 2026-10-18 | a request superseded by a newer one of the same document resolves to null
+//   0.4     | hid4net | 2026-10-18 | reject the pending requests when the server fails to start or its stdin breaks
+//   0.5     | hid4net | 2026-10-18 | the offsets are sent in code points
+//
+//==============================================================================
+"use strict"
+//------------------------------------------------------------------------------
+const os = require("os")
+const path = require('path')
+const cp = require('child_process')
+const vscode = require('vscode')
+
+//------------------------------------------------------------------------------
+// a surrogate pair is one character (code point) for the "pyTool", but two UTF-16 code units for vscode
+const SURROGATE = /[\uD800-\uDFFF]/
+const SURROGATE_PAIRS = /[\uD800-\uDBFF][\uDC00-\uDFFF]/g
+
+// the offset of a position in code points, as the "pyTool" counts the characters
+function codePointOffset(document, position) {
+    const prefix = document.getText(new vscode.Range(new vscode.Position(0, 0), position))
+    const pairs = SURROGATE.test(prefix) ? (prefix.match(SURROGATE_PAIRS) || []).length : 0
+    return prefix.length - pairs
+}
+
+//------------------------------------------------------------------------------
+
+class pyToolServer {
+    proc = undefined
+    buffer = ""
+    nextId = 1
+    pending = new Map()
+    /**
+     * @param {import('vscode').ExtensionContext} context
+     */
+    constructor(context) {
+        this.context = context;
+    }
+
+    // start the "pyTool" in server mode
+    _start() {
+        let cmd = path.join(this.context.extensionUri.fsPath, "src", "pyTools", "hyhdl")
+        let args = ["-s"]
+        if (os.platform() == 'win32') {
+            cmd += '.exe'
+        } else {
+            args = [cmd + '.py', "-s"]
+            cmd = "python3"
+        }
+        const proc = cp.spawn(cmd, args)
+        proc.stdout.setEncoding("utf8")
+        proc.stdout.on("data", (data) => { this._onData(data) })
+        proc.stderr.on("data", (data) => { console.log(data.toString()) })
+        // the spawn may fail (e.g. no python3) without an "exit" event, and writing to a crashed server gives EPIPE
+        proc.on("error", (err) => { this._fail(proc, `hyhdl: the server has failed: ${err.message}`) })
+        proc.stdin.on("error", (err) => { this._fail(proc, `hyhdl: the server has failed: ${err.message}`) })
+        proc.on("exit", () => { this._fail(proc, "hyhdl: the server has exited") })
+        this.proc = proc
+        this.configure().catch((err) => { console.log(err) })
+    }
+
+    // reject the pending requests, the server will be restarted by the next request
+    _fail(proc, message) {
+        // "error" may be followed by "exit", the requests of a restarted server are not affected
+        if (this.proc !== proc && this.proc !== undefined) {
+            return
+        }
+        console.log(message)
+        for (const req of this.pending.values()) {
+            req.reject(new Error(message))
+        }
+        this.pending.clear()
+        this.buffer = ""
+        if (this.proc === proc) {
+            this.proc = undefined
+        }
+    }
+
+    // send the preprocessor settings to the running "pyTool", they apply to the later requests
+    configure() {
+        if (this.proc === undefined) {
+            return Promise.resolve()
+        }
+        const config = vscode.workspace.getConfiguration("hyhdl")
+        const folders = vscode.workspace.workspaceFolders || []
+        const includeDirs = (config.get("Include directories") || []).map((dir) => {
+            return path.isAbsolute(dir) || !folders.length ? dir : path.join(folders[0].uri.fsPath, dir)
+        })
+        return this.request("set_preprocessor", { defines: config.get("Verilog defines") || [], include_dirs: includeDirs })
+    }
+
+    // split the stdout into lines, each line is a json response
+    _onData(data) {
+        this.buffer += data
+        let idx
+        while ((idx = this.buffer.indexOf("\n")) >= 0) {
+            const line = this.buffer.slice(0, idx).trim()
+            this.buffer = this.buffer.slice(idx + 1)
+            if (!line) {
+                continue
+            }
+            let resp
+            try {
+                resp = JSON.parse(line)
+            } catch (err) {
+                console.log(`hyhdl: invalid response: ${line}`)
+                continue
+            }
+            const req = this.pending.get(resp.id)
+            if (req === undefined) {
+                continue
+            }
+            this.pending.delete(resp.id)
+            if (resp.error !== undefined) {
+                req.reject(new Error(resp.error))
+            } else if (resp.cancelled) {
+                // superseded by a newer request of the same document, only the newer one is shown
+                req.resolve(null)
+            } else {
+                req.resolve(resp.result)
+            }
+        }
+    }
+
+    // send a request, return a promise of the result
+    request(cmd, args = {}) {
+        if (this.proc === undefined) {
+            this._start()
+        }
+        const id = this.nextId++
+        return new Promise((resolve, reject) => {
+            this.pending.set(id, { resolve, reject })
+            this.proc.stdin.write(JSON.stringify({ id: id, cmd: cmd, ...args }) + "\n")
+        })
+    }
+
+    dispose() {
+        if (this.proc !== undefined) {
+            this.proc.stdin.end(JSON.stringify({ cmd: "exit" }) + "\n")
+            this.proc = undefined
+        }
+    }
+}
+//------------------------------------------------------------------------------
+module.exports = {
+    pyToolServer,
+    SURROGATE,
+    codePointOffset
+}
@@ -1,143 +1,936 @@
-# ==============================================================================
-# AUTHOR: hid4net<hid4net@outlook.com>
-# DESCRIPTION:
-# * 使用
-# *     usage: hyhdl.exe [-h] (-i | -t | -p | -e) [-T T] [verilog_file]
-# *
-# *     Generate the instantiation, testbench and documentation for verilog
-# *
-# *     positional arguments:
-# *       verilog_file  file path of verilog file
-# *
-# *     options:
-# *       -h, --help    show this help message and exit
-# *       -i            generate instantiation
-# *       -t            generate testbench
-# *       -p            generate documentation html for vscode preview
-# *       -e            generate documentation html for export
-# *       -T T          file path of template file (only used for testbench)
-# * 设计思路
-# *     1. 分离 module 声明前后
-# *         a. 逐次分离 wave 前后
-# *         b. 提取 wave, 转换为 json
-# *         c. 从 wave 以外的部分中, 提取表格
-# *     2. 提取 module 声明
-# *          a. 提取 parameter, ports
-# *          b. 提取 parameter, ports 的注释, 作为 description
-# *     3. 暂存提取的数据
-# *     4. 根据不同的模板, 生成文件
-# MODIFICATION HISTORY:---------------------------------------------------------
-#    Version | Author | Date       | Changes
-#    :-----: | :----: | :--------: | -------------------------------------------
-#    0.1     | hid4net | 2022-05-13 | start to coding
-#
-# ==============================================================================
-# %% ---------------------------------------------------------------------------
-#
-# ------------------------------------------------------------------------------
-import argparse
-# from line_profiler import *
-import sys
-import tempfile
-from pathlib import Path
-
-from hyhdl_lib import VerilogInstTb, VerilogDocumentor
-
-# %% ---------------------------------------------------------------------------
-# global variable
-# ------------------------------------------------------------------------------
-pyTool_dir = ""
-# %% ---------------------------------------------------------------------------
-# main
-# ------------------------------------------------------------------------------
-# @profile
-def main(option, verilog_file, template_file):
-    if option == 1:  # for instantiation
-        pyTool = VerilogInstTb(verilog_file)
-        tmpf = pyTool.get_inst()
-        # ! debug start
-        pyTool.dump_parsed()
-        # ! debug end
-    elif option == 2:  # for testbench
-        pyTool = VerilogInstTb(verilog_file)
-        if not template_file or not Path(template_file).exists:
-            template_file = pyTool_dir.joinpath("testbenchTemplate")
-        tmpf = pyTool.get_testbench(template_file)
-        # ! debug start
-        pyTool.dump_parsed()
-        # ! debug end
-    elif option == 3:  # for preview
-        pyTool = VerilogDocumentor(verilog_file, pyTool_dir)
-        tmpf = pyTool.get_preview_html(pyTool_dir.joinpath("previewTemplate.html"))
-        # ! debug start
-        pyTool.dump_parsed(dump_comment=True)
-        # ! debug end
-    elif option == 4:  # for export html
-        pyTool = VerilogDocumentor(verilog_file, pyTool_dir)
-        tmpf = pyTool.get_export_html(pyTool_dir.joinpath("exportTemplate.html"))
-        # ! debug start
-        pyTool.dump_parsed(dump_comment=True)
-        # ! debug end
-
-    print(tmpf, end=None)
-
-
-# %%
-if __name__ == "__main__":
-    pyTool_dir = Path(sys.argv[0]).absolute().parent
-
-    ap = argparse.ArgumentParser(
-        description="Generate the instantiation, testbench or documentation for verilog"
-    )
-
-    apg = ap.add_mutually_exclusive_group(required=True)
-    apg.add_argument(
-        "-i",
-        action="store_const",
-        const=1,
-        dest="opt",
-        help="generate instantiation",
-    )
-    apg.add_argument(
-        "-t",
-        action="store_const",
-        const=2,
-        dest="opt",
-        help="generate testbench",
-    )
-    apg.add_argument(
-        "-p",
-        action="store_const",
-        const=3,
-        dest="opt",
-        help="generate documentation html for vscode preview",
-    )
-    apg.add_argument(
-        "-e",
-        action="store_const",
-        const=4,
-        dest="opt",
-        help="generate documentation html for export",
-    )
-
-    ap.add_argument(
-        "verilog_file",
-        nargs="?",
-        # type=argparse.FileType("r", encoding="utf-8"),
-        default=Path(tempfile.gettempdir()).joinpath("code"),
-        help="file path of verilog file",
-    )
-
-    ap.add_argument(
-        "-T",
-        action="store",
-        # type=argparse.FileType("r", encoding="utf-8"),
-        help="file path of template file (only used for testbench)",
-    )
-
-    arg_parsed = ap.parse_args()
-    # print(f"{arg_parsed.opt=}")
-    # print(f"{arg_parsed.verilog_file=}")
-    # print(f"{arg_parsed.T=}")
-
-    main(arg_parsed.opt, arg_parsed.verilog_file, arg_parsed.T)
+# ==============================================================================
+# AUTHOR: hid4net<hid4net@outlook.com>
+# DESCRIPTION:
+# * 使用
+# *     usage: hyhdl.exe [-h] (-i | -t | -p | -e | -s | -x | -y | -b SOURCE [SOURCE ...] | -w SOURCE [SOURCE ...])
+# *                      [-T T] [-m M] [-c C] [-o]
+# *                      [-g G] [-d D] [-j J] [--index INDEX] [--depth DEPTH] [--skin {default,lowkey,narrow}]
+# *                      [--wave {svg,js}] [--diagram {auto,full,summary}] [--cache-dir CACHE_DIR]
+# *                      [-D NAME[=VALUE]] [-I DIR] [--debounce MS] [--metrics] [--dump]
+# *                      [verilog_file]
+# *
+# *     Generate the instantiation, testbench and documentation for verilog
+# *
+# *     positional arguments:
+# *       verilog_file  file path of verilog file, "-" to read from stdin, omit it to look up the
+# *                     module (-m) in the module index (--index)
+# *
+# *     options:
+# *       -h, --help    show this help message and exit
+# *       -i            generate instantiation
+# *       -t            generate testbench
+# *       -p            generate documentation html for vscode preview
+# *       -e            generate documentation html for export
+# *       -s            run as a server, read json requests from stdin line by line
+# *       -x            update the module index of the directory (--index), print the statistics
+# *       -y            update the module index of the directory (--index), print the design hierarchy
+# *                     under the module (-m) or under all the top modules as json
+# *       -b SOURCE [SOURCE ...]
+# *                     batch mode: generate for every module of the files in the directories, globs
+# *                     or file lists (@list.txt), print a json record per module as each file finishes
+# *       -w SOURCE [SOURCE ...]
+# *                     write a static documentation site of the modules in the sources into -d:
+# *                     a page per module, index.html, the wavedrom scripts are shared in assets/
+# *       -T T          file path of template file (only used for testbench)
+# *       -m M          name of the module, if there are several modules in the file
+# *       -c C          cursor offset, select the module at the cursor
+# *       -o            write the result to stdout instead of a temporary file
+# *       -g G          outputs of the batch mode (-b), letters of i, t, p, e (default: ite)
+# *       -d D          output directory of the batch mode (-b), default: beside each verilog file,
+# *                     or of the documentation site (-w)
+# *       -j J          number of worker processes of the batch mode (-b), default: number of cores
+# *       --index INDEX project directory, its modules are indexed in INDEX/.hyhdl/index.db
+# *       --depth DEPTH levels of the design hierarchy (-y) to expand, default: all
+# *       --skin {default,lowkey,narrow}
+# *                     skin of the wavedrom waves in the html (-p, -e, -b, -w), default: default
+# *       --wave {svg,js}
+# *                     render the wavedrom waves to svg when generating the html, or by wavedrom.min.js
+# *                     in the browser (the waves not supported by the svg renderer), default: svg
+# *       --diagram {auto,full,summary}
+# *                     block diagram of the module: one row per port (full), the ports grouped by bus
+# *                     or interface (auto, if there are many ports), or only the groups (summary)
+# *       --cache-dir CACHE_DIR
+# *                     keep the parse results and the outputs in CACHE_DIR, shared by the calls
+# *       -D NAME[=VALUE]
+# *                     define a macro for the preprocessor (`ifdef, `NAME), can be repeated
+# *       -I DIR        directory searched for the `include files after the directory of the including
+# *                     file, can be repeated
+# *       --debounce MS wait MS milliseconds for a newer request of the same document before rendering
+# *                     it in server mode (-s), default: 30
+# *       --metrics     print the timings and counts of each phase to stderr as json
+# *       --dump        dump the parsed data and the source code to hyhdl_dump (debug)
+# *     server mode (-s)
+# *         request:  {"id": 1, "cmd": "get_inst", "file": "...", "code": "...", "template": "...",
+# *                    "module": "...", "offset": 0, "index": "...", "to_file": false, "metrics": false}
+# *             module/offset: select the module by name or cursor offset
+# *             index: project directory, look up "module" in its module index if no file/code
+# *             doc: (get_preview_html, get_export_html) keep the parsed document in the server,
+# *                 "edits" is then accepted instead of "code": [[offset, removed, inserted], ...],
+# *                 applied in order, only the affected module header and //> comments are re-parsed
+# *             code: verilog code, "file" is not read if "code" is given (only used to find the
+# *                 `include files)
+# *             skin: (get_preview_html, get_export_html) skin of the wavedrom waves
+# *             wave: (get_preview_html, get_export_html) "svg" or "js", see --wave
+# *             diagram: (get_preview_html, get_export_html) "auto", "full" or "summary", see --diagram
+# *             asset_uri: (get_preview_html) uri of the wavedrom directory in the webview,
+# *                 the scripts are referenced instead of being embedded in the html
+# *             patch: (get_preview_html with doc) if the page shown for "doc" is unchanged, the result
+# *                 is {"ids": [...], "sections": {id: html}}: the ids of all the sections in order,
+# *                 and the html of the sections not shown last time, to be patched in place
+# *             to_file: write the result to a unique temporary file and return its path
+# *             metrics: return the timings and counts of each phase in "metrics"
+# *         response: {"id": 1, "result": "...", "metrics": {...}} or {"id": 1, "error": "..."}
+# *             or {"id": 1, "cancelled": true} if a newer request of the same "doc" supersedes it
+# *         scheduling: the requests are handled one by one in a worker thread, in order of arrival
+# *             the requests of a "doc" wait --debounce ms, a newer one of the same cmd and doc
+# *                 supersedes the waiting one (its "edits" are merged into the newer request)
+# *             a newer request with the whole code stops the rendering of the same doc at its next phase
+# *             identical requests (without "edits") are handled once, all of them get the result
+# *         cmd: get_inst, get_testbench, get_preview_html, get_export_html, update_index, get_hierarchy,
+# *             ping, exit
+# *             update_index: update the module index of "index", result is the statistics,
+# *                 only the files in "files" are checked if it is given (e.g. the saved files)
+# *             get_hierarchy: the design hierarchy of "index" under "module" (or under all the top
+# *                 modules) as a list of {"module", "instance", "defined", "children"}, "depth"
+# *                 limits the levels, the index is not updated (see update_index)
+# *             close_doc: forget the parsed document "doc"
+# *             cache_stats: the hits and misses of the caches
+# *             set_preprocessor: "defines" (["NAME=VALUE", ...]) and "include_dirs" of the later
+# *                 requests, see -D and -I
+# *     batch mode (-b)
+# *         record:   {"path": "...", "module": "...", "outputs": {"inst": "...", "testbench": "..."},
+# *                    "timings_ms": {...}, "error": null}
+# *         outputs:  <module>_inst.v, <module>_tb.v, <module>_preview.html, <module>.html
+# * 设计思路
+# *     1. 分离 module 声明前后
+# *         a. 逐次分离 wave 前后
+# *         b. 提取 wave, 转换为 json
+# *         c. 从 wave 以外的部分中, 提取表格
+# *     2. 提取 module 声明
+# *          a. 提取 parameter, ports
+# *          b. 提取 parameter, ports 的注释, 作为 description
+# *     3. 暂存提取的数据
+# *     4. 根据不同的模板, 生成文件
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author | Date       | Changes
+#    :-----: | :----: | :--------: | -------------------------------------------
+#    0.1     | hid4net | 2022-05-13 | start to coding
+#    0.2     | hid4net | 2026-10-18 | add server mode (-s)
+#    0.3     | hid4net | 2026-10-18 | read code from stdin/request, write result to stdout (-o)
+#    0.4     | hid4net | 2026-10-18 | opt-in --metrics and --dump, no more unconditional dump
+#    0.5     | hid4net | 2026-10-18 | select the module by name (-m) or cursor offset (-c)
+#    0.6     | hid4net | 2026-10-18 | persistent module index of the project (-x, --index)
+#    0.7     | hid4net | 2026-10-18 | incremental reparse of the documents kept in the server
+#    0.8     | hid4net | 2026-10-18 | content-addressed cache of the parse results and outputs (--cache-dir)
+#    0.9     | hid4net | 2026-10-18 | parallel batch mode over many files (-b, -g, -d, -j)
+#    0.10    | hid4net | 2026-10-18 | static documentation site with shared assets (-w)
+#    0.11    | hid4net | 2026-10-18 | selectable wavedrom skin (--skin), preview references the scripts (asset_uri)
+#    0.12    | hid4net | 2026-10-18 | render the wavedrom waves to svg without javascript (--wave)
+#    0.13    | hid4net | 2026-10-18 | partial updates of the preview (patch)
+#    0.14    | hid4net | 2026-10-18 | block diagram with the ports grouped by bus (--diagram)
+#    0.15    | hid4net | 2026-10-18 | preprocess `define, `ifdef and `include before the module parse (-D, -I)
+#    0.16    | hid4net | 2026-10-18 | design hierarchy from the instances in the module index (-y, --depth)
+#    0.17    | hid4net | 2026-10-18 | asyncio scheduling of the server requests: debounce, cancel, dedupe (--debounce)
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+#
+# ------------------------------------------------------------------------------
+import argparse
+import asyncio
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from hyhdl_lib import (
+    DIAGRAM_MODES,
+    Metrics,
+    NULL_METRICS,
+    RequestScheduler,
+    VerilogInstTb,
+    VerilogDocumentor,
+    VerilogIndexer,
+    VerilogSite,
+    WAVEDROM_SKINS,
+    cache_stats,
+    iter_verilog_files,
+    set_cache_dir,
+    get_preprocessor,
+    set_preprocessor,
+    write_to_tmpfile,
+)
+
+# %% ---------------------------------------------------------------------------
+# global variable
+# ------------------------------------------------------------------------------
+pyTool_dir = ""
+default_verilog_file = Path(tempfile.gettempdir()).joinpath("code")
+# server 模式下支持的命令
+server_cmds = {
+    "get_inst": 1,
+    "get_testbench": 2,
+    "get_preview_html": 3,
+    "get_export_html": 4,
+}
+# wavedrom 的主题 (--skin), server 的请求中可以单独指定
+wavedrom_skin = None
+# wave 的渲染方式 (--wave): "svg" 生成 html 时转换为 svg, "js" 在浏览器中由 wavedrom.min.js 渲染
+wave_render = "svg"
+# 框图的模式 (--diagram): "auto" 端口较多时按总线分组, "full" 每个端口一行, "summary" 只画分组
+diagram_mode = None
+# 已打开的 module 索引: 工程目录 -> VerilogIndexer
+indexers = {}
+# server 中保存的文档: doc -> VerilogDocumentor, 编辑时只重新解析受影响的部分
+documents = {}
+max_documents = 16
+# 预览中显示的文档: doc -> 上次返回的预览 (VerilogDocumentor.get_preview_update 的 state)
+previews = {}
+
+
+# %% ---------------------------------------------------------------------------
+# module 索引
+# ------------------------------------------------------------------------------
+def get_indexer(index_root) -> VerilogIndexer:
+    """
+    打开工程目录的 module 索引 (保存在 index_root/.hyhdl/index.db)\n
+    index_root: str => 工程目录\n
+    return: VerilogIndexer => module 索引
+    """
+    index_root = str(Path(index_root).absolute())
+    if index_root not in indexers:
+        indexers[index_root] = VerilogIndexer(Path(index_root).joinpath(".hyhdl", "index.db"))
+    return indexers[index_root]
+
+
+def find_module(index_root, name, metrics=None) -> dict:
+    """
+    更新 module 索引 (只解析变化的文件), 并按名称查找 module\n
+    index_root: str => 工程目录\n
+    name: str => module 的名称\n
+    metrics: Metrics => 记录各阶段的耗时, None 表示不记录\n
+    return: dict => module (parse_modules 返回的条目, 增加 path)
+    """
+    metrics = metrics or NULL_METRICS
+    indexer = get_indexer(index_root)
+    with metrics.phase("index update"):
+        stats = indexer.update(index_root)
+    for k, v in stats.items():
+        metrics.count(f"index_{k}", v)
+    modules = indexer.find(name)
+    if not modules:
+        raise ValueError(f"module {name} is not found in {index_root}")
+    return modules[0]
+
+
+# %% ---------------------------------------------------------------------------
+# main
+# ------------------------------------------------------------------------------
+def run(
+    option,
+    verilog_file,
+    template_file,
+    code=None,
+    metrics=None,
+    dump=False,
+    module=None,
+    offset=None,
+    model=None,
+    render_options=None,
+) -> str:
+    """
+    执行一次命令\n
+    option: int => 1: instantiation, 2: testbench, 3: preview, 4: export\n
+    verilog_file: str => verilog 文件路径\n
+    template_file: str => 模板文件路径 (only used for testbench)\n
+    code: str => verilog 代码, 不为 None 时不再读取 verilog_file\n
+    metrics: Metrics => 记录各阶段的耗时, None 表示不记录\n
+    dump: bool => 是否将解析结果 dump 到临时文件 hyhdl_dump (调试用)\n
+    module: str => 文件中有多个 module 时, 按名称选择\n
+    offset: int => 文件中有多个 module 时, 按光标的偏移选择\n
+    model: dict => 来自 module 索引的 module, 不为 None 时忽略 verilog_file, code, module, offset\n
+    render_options: dict => (preview, export) render_document 的参数 (skin, asset_uri, wave, diagram)\n
+    return: str => 生成的文本
+    """
+    metrics = metrics or NULL_METRICS
+    if model is not None:
+        # 例化和 testbench 直接使用索引中的 module, 文档还需要读取文件中的注释
+        verilog_file, code, module, offset = model["path"], None, model["name"], None
+    if option in (1, 2):
+        if model is not None:
+            pyTool = VerilogInstTb(code="", metrics=metrics)
+            pyTool.load_module(model)
+        else:
+            pyTool = VerilogInstTb(verilog_file, code, metrics, module, offset)
+    if option == 1:  # for instantiation
+        with metrics.phase("template render"):
+            text = pyTool.get_inst()
+    elif option == 2:  # for testbench
+        if not template_file or not Path(template_file).exists():
+            template_file = pyTool_dir.joinpath("testbenchTemplate")
+        with metrics.phase("template render"):
+            text = pyTool.get_testbench(template_file)
+    elif option in (3, 4):  # for preview and export html
+        pyTool = VerilogDocumentor(verilog_file, pyTool_dir, code, metrics, module, offset)
+        text = render_document(option, pyTool, **(render_options or {}))
+    if dump:
+        pyTool.dump_parsed(dump_comment=option in (3, 4))
+    return text
+
+
+def render_document(option, document, skin=None, asset_uri=None, wave=None, diagram=None) -> str:
+    """
+    生成文档的 html\n
+    option: int => 3: preview, 4: export\n
+    document: VerilogDocumentor => 解析后的文档\n
+    skin: str => wavedrom 的主题, None 表示使用 --skin\n
+    asset_uri: str => (preview) wavedrom 目录在 webview 中的地址, None 表示将脚本内嵌到 html 中\n
+    wave: str => wave 的渲染方式 ("svg" 或 "js"), None 表示使用 --wave\n
+    diagram: str => 框图的模式, None 表示使用 --diagram\n
+    return: str => html 文本
+    """
+    document.diagram = diagram or diagram_mode
+    skin = skin or wavedrom_skin
+    wave_svg = (wave or wave_render) == "svg"
+    if option == 3:
+        return document.get_preview_html(
+            pyTool_dir.joinpath("previewTemplate.html"), skin, asset_uri, wave_svg
+        )
+    return document.get_export_html(pyTool_dir.joinpath("exportTemplate.html"), skin, wave_svg)
+
+
+def run_document(option, req, metrics) -> str:
+    """
+    使用 server 中保存的文档生成 html: 请求中有 edits 时增量解析, 否则完整解析并保存\n
+    option: int => 3: preview, 4: export\n
+    req: dict => 请求 (doc, edits 或 file/code, module, offset, skin, asset_uri, wave, diagram)\n
+    metrics: Metrics => 记录各阶段的耗时\n
+    return: str 或 dict => html 文本, 或预览的局部更新 (请求 patch 时)
+    """
+    doc_id = req["doc"]
+    if "edits" in req:
+        document = documents.pop(doc_id, None)
+        if document is None:
+            raise ValueError(f"unknown doc {doc_id}, the whole code is required")
+        # 应用编辑失败时丢弃该文档 (状态可能已不一致), 客户端需要重新发送完整的代码
+        document.metrics = metrics
+        document.apply_edits(req["edits"])
+        if "module" in req or "offset" in req:
+            document.parse_module(req.get("module"), req.get("offset"))
+    else:
+        documents.pop(doc_id, None)
+        document = VerilogDocumentor(
+            req.get("file") or default_verilog_file,
+            pyTool_dir,
+            req.get("code"),
+            metrics,
+            req.get("module"),
+            req.get("offset"),
+        )
+    # 最近使用的文档放在最后, 超出数量时丢弃最早使用的文档
+    documents[doc_id] = document
+    while len(documents) > max_documents:
+        previews.pop(oldest := next(iter(documents)), None)
+        documents.pop(oldest)
+    if option != 3 or req.get("to_file"):
+        return render_document(
+            option,
+            document,
+            req.get("skin"),
+            req.get("asset_uri"),
+            req.get("wave"),
+            req.get("diagram"),
+        )
+    # 预览: 记录显示的各部分, 请求 patch 时只返回变化的部分
+    document.diagram = req.get("diagram") or diagram_mode
+    shown = previews.get(doc_id) if req.get("patch") else None
+    update, previews[doc_id] = document.get_preview_update(
+        pyTool_dir.joinpath("previewTemplate.html"),
+        req.get("skin") or wavedrom_skin,
+        req.get("asset_uri"),
+        (req.get("wave") or wave_render) == "svg",
+        shown,
+    )
+    return update
+
+
+def write_output(option, text) -> str:
+    """
+    将生成的文本写入唯一的临时文件\n
+    option: int => 1: instantiation, 2: testbench, 3: preview, 4: export\n
+    text: str => 生成的文本\n
+    return: str => 临时文件的路径
+    """
+    return write_to_tmpfile("hyhdl_output", text, suffix=".html" if option in (3, 4) else "")
+
+
+def main(
+    option,
+    verilog_file,
+    template_file,
+    to_stdout=False,
+    show_metrics=False,
+    dump=False,
+    module=None,
+    offset=None,
+    index_root=None,
+    depth=None,
+):
+    metrics = Metrics() if show_metrics else None
+    if option == 5:  # for module index
+        stats = get_indexer(index_root).update(index_root)
+        print(json.dumps(stats))
+        return
+    if option == 6:  # for design hierarchy
+        indexer = get_indexer(index_root)
+        indexer.update(index_root)
+        print(json.dumps(indexer.hierarchy(module, depth), ensure_ascii=False))
+        return
+    model = None
+    if verilog_file is None:
+        if index_root and module:
+            model = find_module(index_root, module, metrics)
+        else:
+            verilog_file = default_verilog_file
+    text = run(option, verilog_file, template_file, None, metrics, dump, module, offset, model)
+    metrics = metrics or NULL_METRICS
+    with metrics.phase("write"):
+        if to_stdout:
+            sys.stdout.reconfigure(encoding="utf-8")
+            sys.stdout.write(text)
+        else:
+            print(write_output(option, text), end=None)
+    if metrics.enabled:
+        metrics.count("output_bytes", len(text.encode("utf-8")))
+        # stdout 用于输出结果, metrics 写到 stderr
+        print(json.dumps(metrics.to_dict(), ensure_ascii=False), file=sys.stderr)
+
+
+# %% ---------------------------------------------------------------------------
+# server: 常驻进程, 避免每条命令都重新启动解释器并加载 jinja2, yaml, hyhdl_lib
+# ------------------------------------------------------------------------------
+def serve(debounce=0.03):
+    """
+    从 stdin 逐行读取 json 请求, 处理后向 stdout 逐行写入 json 响应, 直到 stdin 关闭或收到 exit\n
+    请求由 RequestScheduler 调度: 同一文档的请求防抖, 只处理最新的状态, 内容相同的请求只处理一次\n
+    debounce: float => 同一文档的请求的防抖时间 (s)
+    """
+    sys.stdin.reconfigure(encoding="utf-8")
+    asyncio.run(serve_async(debounce))
+
+
+async def serve_async(debounce):
+    loop = asyncio.get_running_loop()
+    # 在单独的线程中读取 stdin (Windows 的管道不能由事件循环读取), 处理请求时仍可读取更新的请求
+    reader = ThreadPoolExecutor(1)
+    scheduler = RequestScheduler(handle_request, write_response, debounce)
+    while line := await loop.run_in_executor(reader, sys.stdin.readline):
+        if not line.strip():
+            continue
+        # -------- 解析请求 --------
+        try:
+            req = json.loads(line)
+            req_id = req.get("id")
+            cmd = req.get("cmd")
+        except (json.JSONDecodeError, AttributeError) as e:
+            write_response({"id": None, "error": f"invalid request: {e}"})
+            continue
+        # -------- 调度请求 --------
+        if cmd == "exit":
+            break
+        elif cmd == "ping":
+            write_response({"id": req_id, "result": "pong"})
+        else:
+            scheduler.submit(req)
+    await scheduler.drain()
+    reader.shutdown(wait=False)
+
+
+def write_response(resp):
+    sys.stdout.write(json.dumps(resp) + "\n")
+    sys.stdout.flush()
+
+
+def handle_request(req, metrics) -> dict:
+    """
+    处理一个请求 (在 RequestScheduler 的工作线程中执行)\n
+    req: dict => 请求\n
+    metrics: CancellableMetrics => 记录各阶段的耗时, 被更新的请求取代时在阶段开始时停止\n
+    return: dict => 响应 (result 或 error, metrics; 不含 id), 出错时抛出异常
+    """
+    cmd = req.get("cmd")
+    if cmd == "cache_stats":
+        return {"result": cache_stats()}
+    elif cmd == "set_preprocessor":
+        set_preprocessor(req.get("defines"), req.get("include_dirs"))
+        return {"result": None}
+    elif cmd == "close_doc":
+        documents.pop(req.get("doc"), None)
+        previews.pop(req.get("doc"), None)
+        return {"result": None}
+    elif cmd == "update_index":
+        indexer = get_indexer(req["index"])
+        if req.get("files"):
+            return {"result": indexer.update_files(req["files"])}
+        return {"result": indexer.update(req["index"])}
+    elif cmd == "get_hierarchy":
+        return {"result": get_indexer(req["index"]).hierarchy(req.get("module"), req.get("depth"))}
+    elif cmd not in server_cmds:
+        return {"error": f"unknown command: {cmd}"}
+    model = None
+    if req.get("index") and req.get("module") and not (req.get("file") or req.get("code")):
+        model = find_module(req["index"], req["module"], metrics)
+    if req.get("doc") and server_cmds[cmd] in (3, 4) and model is None:
+        # 文档的状态更新后才记录为已显示, 在此之前停止不会留下不一致的状态
+        with metrics.cancellable():
+            text = run_document(server_cmds[cmd], req, metrics)
+    else:
+        text = run(
+            server_cmds[cmd],
+            req.get("file") or default_verilog_file,
+            req.get("template"),
+            req.get("code"),
+            metrics,
+            module=req.get("module"),
+            offset=req.get("offset"),
+            model=model,
+            render_options={k: req.get(k) for k in ("skin", "asset_uri", "wave", "diagram")},
+        )
+    if req.get("to_file"):
+        with metrics.phase("write"):
+            text = write_output(server_cmds[cmd], text)
+    resp = {"result": text}
+    if metrics.enabled:
+        resp["metrics"] = metrics.to_dict()
+    return resp
+
+
+# %% ---------------------------------------------------------------------------
+# batch: 多进程处理大量文件, 每个文件处理完后立即输出 json 记录
+# ------------------------------------------------------------------------------
+# batch 模式的输出: 选项字母 -> (option, 名称, 输出文件名的后缀)
+batch_outputs = {
+    "i": (1, "inst", "_inst.v"),
+    "t": (2, "testbench", "_tb.v"),
+    "p": (3, "preview", "_preview.html"),
+    "e": (4, "export", ".html"),
+}
+
+
+def expand_sources(sources) -> list[str]:
+    """
+    展开 batch 模式的输入: 目录 (递归查找 verilog 文件), glob, 文件列表 (@list.txt, 每行一个路径), 文件\n
+    sources: list[str] => 输入\n
+    return: list[str] => 去重后的文件列表
+    """
+    files = {}  # 保持顺序的去重
+    for source in sources:
+        if source.startswith("@"):
+            with open(source[1:], "r", encoding="utf-8") as fp:
+                paths = [x.strip() for x in fp if x.strip()]
+        elif Path(source).is_dir():
+            paths = sorted(x.path for x in iter_verilog_files(source))
+        elif glob.has_magic(source):
+            paths = sorted(glob.glob(source, recursive=True))
+        else:
+            paths = [source]
+        files.update(dict.fromkeys(paths))
+    return list(files)
+
+
+def init_batch_worker(
+    tools_dir, cache_dir, skin=None, wave="svg", diagram=None, defines=None, include_dirs=None
+) -> None:
+    """
+    初始化 batch 模式的子进程 (子进程中不会执行 __main__ 中的初始化)\n
+    tools_dir: str => pyTools 的路径\n
+    cache_dir: str => 磁盘缓存的目录\n
+    skin: str => wavedrom 的主题\n
+    wave: str => wave 的渲染方式\n
+    diagram: str => 框图的模式\n
+    defines: dict => 预处理的宏定义\n
+    include_dirs: list[str] => 预处理的 include 目录
+    """
+    global pyTool_dir, wavedrom_skin, wave_render, diagram_mode
+    pyTool_dir = Path(tools_dir)
+    wavedrom_skin = skin
+    wave_render = wave
+    diagram_mode = diagram
+    if cache_dir:
+        set_cache_dir(cache_dir)
+    set_preprocessor(defines, include_dirs)
+
+
+def batch_file(verilog_file, outputs, template_file, out_dir) -> list[dict]:
+    """
+    为一个文件中的每个 module 生成输出文件 (在子进程中执行)\n
+    verilog_file: str => verilog 文件路径\n
+    outputs: str => 输出的选项字母 (i, t, p, e)\n
+    template_file: str => testbench 的模板文件路径\n
+    out_dir: str => 输出目录, None 表示与 verilog 文件相同的目录\n
+    return: list[dict] => 每个 module 的记录
+    """
+    try:
+        names = [x["name"] for x in VerilogInstTb(verilog_file).parse_modules()]
+    except Exception as e:
+        return [{"path": verilog_file, "module": None, "error": f"{type(e).__name__}: {e}"}]
+    if not names:
+        return [{"path": verilog_file, "module": None, "error": "no module is found"}]
+    dst_dir = Path(out_dir) if out_dir else Path(verilog_file).parent
+    records = []
+    for name in names:
+        metrics = Metrics()
+        record = {"path": verilog_file, "module": name, "outputs": {}}
+        try:
+            for letter in outputs:
+                option, output_name, suffix = batch_outputs[letter]
+                text = run(option, verilog_file, template_file, metrics=metrics, module=name)
+                out_file = dst_dir.joinpath(name + suffix)
+                with metrics.phase("write"):
+                    out_file.write_text(text, encoding="utf-8")
+                record["outputs"][output_name] = str(out_file)
+            record["error"] = None
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["timings_ms"] = metrics.to_dict()["timings_ms"]
+        records.append(record)
+    return records
+
+
+def batch(sources, outputs="ite", template_file=None, out_dir=None, jobs=None, cache_dir=None):
+    """
+    batch 模式: 多进程处理所有文件, 每个文件处理完后立即向 stdout 输出 json 记录 (每行一条)\n
+    sources: list[str] => 目录, glob, 文件列表 (@list.txt) 或文件\n
+    outputs: str => 输出的选项字母 (i, t, p, e)\n
+    template_file: str => testbench 的模板文件路径\n
+    out_dir: str => 输出目录, None 表示与 verilog 文件相同的目录\n
+    jobs: int => 进程数, None 表示 CPU 核数, 1 表示在当前进程中处理\n
+    cache_dir: str => 磁盘缓存的目录
+    """
+    sys.stdout.reconfigure(encoding="utf-8")
+    files = expand_sources(sources)
+    if out_dir:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    def emit(records):
+        for record in records:
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+    jobs = min(jobs or os.cpu_count() or 1, max(len(files), 1))
+    if jobs == 1:
+        for verilog_file in files:
+            emit(batch_file(verilog_file, outputs, template_file, out_dir))
+        return
+    with ProcessPoolExecutor(
+        jobs,
+        initializer=init_batch_worker,
+        initargs=(
+            str(pyTool_dir),
+            cache_dir,
+            wavedrom_skin,
+            wave_render,
+            diagram_mode,
+            get_preprocessor().defines,
+            get_preprocessor().include_dirs,
+        ),
+    ) as pool:
+        futures = [
+            pool.submit(batch_file, x, outputs, template_file, out_dir) for x in files
+        ]
+        for future in as_completed(futures):
+            emit(future.result())
+
+
+# %% ---------------------------------------------------------------------------
+# site: 静态文档站点
+# ------------------------------------------------------------------------------
+def export_site(sources, out_dir, show_metrics=False):
+    """
+    生成静态文档站点, 向 stdout 输出统计信息 (json)\n
+    sources: list[str] => 目录, glob, 文件列表 (@list.txt) 或文件\n
+    out_dir: str => 输出目录\n
+    show_metrics: bool => 是否向 stderr 输出各阶段的耗时
+    """
+    metrics = Metrics() if show_metrics else None
+    site = VerilogSite(pyTool_dir, metrics, wavedrom_skin, wave_render == "svg", diagram_mode)
+    errors = []
+    for verilog_file in expand_sources(sources):
+        try:
+            site.add_file(verilog_file)
+        except Exception as e:
+            errors.append({"path": verilog_file, "error": f"{type(e).__name__}: {e}"})
+    stats = site.write(out_dir)
+    stats["errors"] = errors
+    print(json.dumps(stats, ensure_ascii=False))
+    if metrics:
+        print(json.dumps(metrics.to_dict(), ensure_ascii=False), file=sys.stderr)
+
+
+# %%
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包为 hyhdl.exe 后, 子进程需要
+
+    pyTool_dir = Path(sys.argv[0]).absolute().parent
+
+    ap = argparse.ArgumentParser(
+        description="Generate the instantiation, testbench or documentation for verilog"
+    )
+
+    apg = ap.add_mutually_exclusive_group(required=True)
+    apg.add_argument(
+        "-i",
+        action="store_const",
+        const=1,
+        dest="opt",
+        help="generate instantiation",
+    )
+    apg.add_argument(
+        "-t",
+        action="store_const",
+        const=2,
+        dest="opt",
+        help="generate testbench",
+    )
+    apg.add_argument(
+        "-p",
+        action="store_const",
+        const=3,
+        dest="opt",
+        help="generate documentation html for vscode preview",
+    )
+    apg.add_argument(
+        "-e",
+        action="store_const",
+        const=4,
+        dest="opt",
+        help="generate documentation html for export",
+    )
+    apg.add_argument(
+        "-s",
+        action="store_const",
+        const=0,
+        dest="opt",
+        help="run as a server, read json requests from stdin line by line",
+    )
+    apg.add_argument(
+        "-x",
+        action="store_const",
+        const=5,
+        dest="opt",
+        help="update the module index of the directory (--index), print the statistics",
+    )
+    apg.add_argument(
+        "-y",
+        action="store_const",
+        const=6,
+        dest="opt",
+        help="update the module index of the directory (--index), print the design hierarchy "
+        "under the module (-m) or under all the top modules as json",
+    )
+    apg.add_argument(
+        "-b",
+        nargs="+",
+        metavar="SOURCE",
+        dest="batch",
+        help="batch mode: generate for every module of the files in the directories, globs "
+        "or file lists (@list.txt), print a json record per module as each file finishes",
+    )
+    apg.add_argument(
+        "-w",
+        nargs="+",
+        metavar="SOURCE",
+        dest="site",
+        help="write a static documentation site of the modules in the sources into -d: "
+        "a page per module, index.html, the wavedrom scripts are shared in assets/",
+    )
+
+    ap.add_argument(
+        "verilog_file",
+        nargs="?",
+        # type=argparse.FileType("r", encoding="utf-8"),
+        help='file path of verilog file, "-" to read from stdin, '
+        "omit it to look up the module (-m) in the module index (--index)",
+    )
+
+    ap.add_argument(
+        "-T",
+        action="store",
+        # type=argparse.FileType("r", encoding="utf-8"),
+        help="file path of template file (only used for testbench)",
+    )
+
+    ap.add_argument(
+        "-m",
+        action="store",
+        dest="module",
+        help="name of the module, if there are several modules in the file",
+    )
+
+    ap.add_argument(
+        "-c",
+        action="store",
+        type=int,
+        dest="offset",
+        help="cursor offset, select the module at the cursor",
+    )
+
+    ap.add_argument(
+        "-o",
+        action="store_true",
+        dest="to_stdout",
+        help="write the result to stdout instead of a temporary file",
+    )
+
+    ap.add_argument(
+        "-g",
+        action="store",
+        default="ite",
+        help="outputs of the batch mode (-b), letters of i, t, p, e (default: ite)",
+    )
+
+    ap.add_argument(
+        "-d",
+        action="store",
+        help="output directory of the batch mode (-b), default: beside each verilog file, "
+        "or of the documentation site (-w)",
+    )
+
+    ap.add_argument(
+        "-j",
+        action="store",
+        type=int,
+        help="number of worker processes of the batch mode (-b), default: number of cores",
+    )
+
+    ap.add_argument(
+        "--index",
+        action="store",
+        help="project directory, its modules are indexed in INDEX/.hyhdl/index.db",
+    )
+
+    ap.add_argument(
+        "--depth",
+        action="store",
+        type=int,
+        help="levels of the design hierarchy (-y) to expand, default: all",
+    )
+
+    ap.add_argument(
+        "--skin",
+        action="store",
+        choices=WAVEDROM_SKINS,
+        help="skin of the wavedrom waves in the html (-p, -e, -b, -w), default: default",
+    )
+
+    ap.add_argument(
+        "--wave",
+        action="store",
+        choices=("svg", "js"),
+        default="svg",
+        help="render the wavedrom waves to svg when generating the html, or by wavedrom.min.js "
+        "in the browser (the waves not supported by the svg renderer), default: svg",
+    )
+
+    ap.add_argument(
+        "--diagram",
+        action="store",
+        choices=DIAGRAM_MODES,
+        help="block diagram of the module: one row per port (full), the ports grouped by bus "
+        "or interface (auto, if there are many ports), or only the groups (summary), default: auto",
+    )
+
+    ap.add_argument(
+        "--cache-dir",
+        action="store",
+        help="keep the parse results and the outputs in CACHE_DIR, shared by the calls",
+    )
+
+    ap.add_argument(
+        "-D",
+        action="append",
+        metavar="NAME[=VALUE]",
+        dest="defines",
+        help="define a macro for the preprocessor (`ifdef, `NAME), can be repeated",
+    )
+
+    ap.add_argument(
+        "-I",
+        action="append",
+        metavar="DIR",
+        dest="include_dirs",
+        help="directory searched for the `include files after the directory of the including file, "
+        "can be repeated",
+    )
+
+    ap.add_argument(
+        "--debounce",
+        action="store",
+        type=float,
+        default=30,
+        metavar="MS",
+        help="wait MS milliseconds for a newer request of the same document before rendering it "
+        "in server mode (-s), default: 30",
+    )
+
+    ap.add_argument(
+        "--metrics",
+        action="store_true",
+        help="print the timings and counts of each phase to stderr as json",
+    )
+
+    ap.add_argument(
+        "--dump",
+        action="store_true",
+        help="dump the parsed data and the source code to the temporary file hyhdl_dump (debug)",
+    )
+
+    arg_parsed = ap.parse_args()
+    # print(f"{arg_parsed.opt=}")
+    # print(f"{arg_parsed.verilog_file=}")
+    # print(f"{arg_parsed.T=}")
+
+    if arg_parsed.opt == 5 and not arg_parsed.index:
+        ap.error("-x requires --index")
+    if arg_parsed.opt == 6 and not arg_parsed.index:
+        ap.error("-y requires --index")
+    if arg_parsed.site and not arg_parsed.d:
+        ap.error("-w requires -d")
+    if arg_parsed.batch and (not arg_parsed.g or set(arg_parsed.g) - set(batch_outputs)):
+        ap.error("-g must be letters of i, t, p, e")
+    if arg_parsed.cache_dir:
+        set_cache_dir(arg_parsed.cache_dir)
+    set_preprocessor(arg_parsed.defines, arg_parsed.include_dirs)
+    wavedrom_skin = arg_parsed.skin
+    wave_render = arg_parsed.wave
+    diagram_mode = arg_parsed.diagram
+    if arg_parsed.batch:
+        batch(
+            arg_parsed.batch,
+            arg_parsed.g,
+            arg_parsed.T,
+            arg_parsed.d,
+            arg_parsed.j,
+            arg_parsed.cache_dir,
+        )
+    elif arg_parsed.site:
+        export_site(arg_parsed.site, arg_parsed.d, arg_parsed.metrics)
+    elif arg_parsed.opt == 0:
+        serve(arg_parsed.debounce / 1000)
+    else:
+        main(
+            arg_parsed.opt,
+            arg_parsed.verilog_file,
+            arg_parsed.T,
+            arg_parsed.to_stdout,
+            arg_parsed.metrics,
+            arg_parsed.dump,
+            arg_parsed.module,
+            arg_parsed.offset,
+            arg_parsed.index,
+            arg_parsed.depth,
+        )
@@ -0,0 +1,325 @@
+# ==============================================================================
+# AUTHOR: hid4net<hid4net@outlook.com>
+# DESCRIPTION:
+# * 使用
+# *     usage: hyhdl_bench.py [-h] [-c {small,medium,large,huge,custom} [...]] [-n N] [-o O] [-b B]
+# *                           [--tolerance TOLERANCE] [--corpus CORPUS]
+# *                           [--params P] [--ports P] [--docs D] [--tables T] [--waves W] [--size S] [--seed SEED]
+# *
+# *     Benchmark the parser and the renderers of hyhdl with a synthetic verilog corpus
+# *
+# *     options:
+# *       -c CASE       cases to run (default: small medium large), "custom" is defined by the generator options
+# *       -n N          number of runs of each phase, the min and the median are reported (default: 5)
+# *       -o O          write the results to the json file O
+# *       -b B          compare with the results in the json file B (e.g. of the previous version),
+# *                     exit with 1 if a phase is slower than (1 + tolerance) times
+# *       --tolerance   allowed slowdown when comparing (default: 0.2)
+# *       --corpus DIR  only write the generated verilog files into DIR
+# *       --params ...  generator options of the custom case: numbers of parameters, ports, //> doc lines,
+# *                     tables, waves, and the file size in MB (padded with code in the module body)
+# * 设计思路
+# *     1. 按配置生成 verilog 文件: module 声明 (parameter, 按总线分组的 port), //> 注释 (文字, 表格, wave)
+# *     2. 依次执行各阶段, 每次执行前清空内容缓存, 记录耗时 (多次执行) 和内存峰值 (tracemalloc, 单独执行一次)
+# *     3. 结果保存为 json, 与之前版本的结果比较, 找出变慢的阶段
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author | Date       | Changes
+#    :-----: | :----: | :--------: | -------------------------------------------
+#    0.1     | hid4net | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+#
+# ------------------------------------------------------------------------------
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from hyhdl_lib import VerilogDocumentor, VerilogInstTb, clear_caches
+from hyhdl_lib.util_cache import code_version
+from hyhdl_lib.VerilogParser import VerilogParser
+
+# %% ---------------------------------------------------------------------------
+# global variable
+# ------------------------------------------------------------------------------
+pyTool_dir = Path(__file__).absolute().parent
+# 预设的测试用例: 生成器的配置
+cases = {
+    "small": dict(params=4, ports=16, docs=20, tables=1, waves=1, size=0),
+    "medium": dict(params=16, ports=200, docs=500, tables=20, waves=20, size=0),
+    "large": dict(params=32, ports=2000, docs=5000, tables=200, waves=200, size=0),
+    "huge": dict(params=8, ports=64, docs=50, tables=2, waves=2, size=64),
+}
+default_cases = ["small", "medium", "large"]
+# 按总线分组的 port 的名称 (与常见的接口类似, 框图可以分组)
+bus_signals = ["valid", "ready", "data", "addr", "last", "user", "id", "resp"]
+
+
+# %% ---------------------------------------------------------------------------
+# 生成 verilog 代码
+# ------------------------------------------------------------------------------
+def gen_verilog(params=4, ports=16, docs=20, tables=1, waves=1, size=0, seed=0) -> str:
+    """
+    生成一个 module 的 verilog 代码\n
+    params: int => parameter 的数量\n
+    ports: int => port 的数量\n
+    docs: int => //> 文字行的数量 (章节标题, 列表, 普通文字)\n
+    tables: int => 表格的数量 (每个 8 行)\n
+    waves: int => wave 的数量\n
+    size: float => 文件的大小 (MB), 不足时在 module 中填充代码, 0 表示不填充\n
+    seed: int => 随机数种子, 相同的配置生成相同的代码\n
+    return: str => verilog 代码
+    """
+    rnd = random.Random(seed)
+    lines = []
+    # -------- //> 注释: 文字, 表格, wave 穿插排列 --------
+    blocks = max(tables, waves, 1)
+    for b in range(blocks):
+        for k in range(docs * (b + 1) // blocks - docs * b // blocks):
+            kind = rnd.random()
+            if k == 0:
+                lines.append(f"//> # chapter {b}")
+            elif kind < 0.2:
+                lines.append(f"//> - item {k} of chapter {b}")
+            else:
+                lines.append(f"//> text line {k}, the field {rnd.randrange(32)} is **updated** at `clk`")
+        if b < tables:
+            lines.append("//> | bit | name | access | description |")
+            lines.append("//> |:--|:-:|:-:|--:|")
+            for r in range(8):
+                lines.append(f"//> | {r} | f{b}_{r} | {rnd.choice(['RW', 'RO', 'W1C'])} | field {r} of reg {b} |")
+        if b < waves:
+            lines.append("//> <wave>")
+            lines.append(
+                f"//> {{signal: [{{name: 'clk', wave: 'p.....'}}, {{name: 'req{b}', wave: '01..0.'}},"
+                f" {{name: 'data{b}', wave: 'x.345x', data: ['a', 'b', 'c']}}]}}"
+            )
+            lines.append("//> </wave>")
+    # -------- module 声明 --------
+    lines.append("module bench_top")
+    if params:
+        lines.append("#(")
+        for k in range(params):
+            sep = "," if k < params - 1 else ""
+            lines.append(f"    parameter P{k} = {rnd.randrange(1, 64)}{sep}  // parameter {k}")
+        lines.append(")")
+    lines.append("(")
+    for k in range(ports):
+        if k < 2:
+            name, direction, width = ("clk", "rst")[k], "input", ""
+        else:
+            bus, sig = divmod(k - 2, len(bus_signals))
+            name = f"bus{bus}_{bus_signals[sig]}"
+            direction = "output" if sig in (1, 7) else "input"
+            width = f"[{rnd.choice([7, 31, 63])}:0] " if sig in (2, 3, 5, 6) else ""
+        sep = "," if k < ports - 1 else ""
+        lines.append(f"    {direction} wire {width}{name}{sep}  // port {k}")
+    lines.append(");")
+    # -------- module 中填充代码, 直到文件的大小 --------
+    code = "\n".join(lines) + "\n"
+    body = []
+    remain = int(size * (1 << 20)) - len(code)
+    k = 0
+    while remain > 0:
+        line = f"    assign w{k} = a{k % 97} ^ b{k % 89};  // filler {k}\n"
+        body.append(line)
+        remain -= len(line)
+        k += 1
+    return code + "".join(body) + "endmodule\n"
+
+
+# %% ---------------------------------------------------------------------------
+# 各阶段
+# ------------------------------------------------------------------------------
+def run_phases(verilog_file: str, measure) -> None:
+    """
+    依次执行各阶段\n
+    verilog_file: str => verilog 文件路径\n
+    measure: Callable[[str, Callable], object] => 执行并记录一个阶段, 返回该阶段的结果
+    """
+    preview_template = pyTool_dir.joinpath("previewTemplate.html")
+    export_template = pyTool_dir.joinpath("exportTemplate.html")
+    tb_template = pyTool_dir.joinpath("testbenchTemplate")
+    # -------- 解析 --------
+    parser = measure("read", lambda: VerilogParser(verilog_file))
+    measure("parse_module", parser.parse_module)
+    measure("parse_comment", parser.parse_comment)
+    # -------- 例化和 testbench --------
+    inst_tb = VerilogInstTb(verilog_file)
+    measure("get_inst", inst_tb.get_inst)
+    measure("get_testbench", lambda: inst_tb.get_testbench(tb_template))
+    # -------- 文档 --------
+    doc = measure("VerilogDocumentor", lambda: VerilogDocumentor(verilog_file, pyTool_dir))
+    measure("_draw_module_bd", doc._draw_module_bd)
+    measure("_get_notes_html (svg)", lambda: doc._get_notes_html(True))
+    measure("_get_notes_html (js)", lambda: doc._get_notes_html(False))
+    measure("get_preview_html", lambda: doc.get_preview_html(preview_template, wave_svg=True))
+    measure("get_export_html", lambda: doc.get_export_html(export_template, wave_svg=True))
+
+
+def bench_file(verilog_file: str, repeat: int) -> dict:
+    """
+    测试一个文件的各阶段, 每次执行前清空内容缓存\n
+    verilog_file: str => verilog 文件路径\n
+    repeat: int => 每个阶段执行的次数\n
+    return: dict => timings_ms: 阶段 -> {min, median}, peak_kb: 阶段 -> 内存峰值 (KB)
+    """
+    # -------- 耗时: 执行 repeat 次 --------
+    timings = {}
+
+    def measure_time(name, func):
+        clear_caches()
+        gc.collect()
+        t_start = time.perf_counter()
+        result = func()
+        timings.setdefault(name, []).append((time.perf_counter() - t_start) * 1000)
+        return result
+
+    for _ in range(repeat):
+        run_phases(verilog_file, measure_time)
+    # -------- 内存峰值: tracemalloc 会拖慢执行, 单独执行一次 --------
+    peaks = {}
+
+    def measure_memory(name, func):
+        clear_caches()
+        gc.collect()
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = func()
+        peaks[name] = round((tracemalloc.get_traced_memory()[1] - base) / 1024, 1)
+        return result
+
+    tracemalloc.start()
+    try:
+        run_phases(verilog_file, measure_memory)
+    finally:
+        tracemalloc.stop()
+    return {
+        "timings_ms": {
+            k: {"min": round(min(v), 3), "median": round(statistics.median(v), 3)} for k, v in timings.items()
+        },
+        "peak_kb": peaks,
+    }
+
+
+# %% ---------------------------------------------------------------------------
+# 比较
+# ------------------------------------------------------------------------------
+def compare(base: dict, results: dict, tolerance: float) -> list[str]:
+    """
+    与之前的结果比较 (使用耗时的 min, 受其他进程的干扰最小), 打印每个阶段的变化\n
+    base: dict => 之前的结果\n
+    results: dict => 本次的结果\n
+    tolerance: float => 允许变慢的比例\n
+    return: list[str] => 变慢的 "用例/阶段"
+    """
+    slower = []
+    print(f"{'case/phase':<40} {'base ms':>10} {'now ms':>10} {'ratio':>7}")
+    for case, result in results["cases"].items():
+        base_case = base.get("cases", {}).get(case)
+        if base_case is None:
+            continue
+        if base_case["config"] != result["config"]:
+            print(f"{case}: the generator config is changed, skipped")
+            continue
+        for phase, t in result["timings_ms"].items():
+            if (t_base := base_case["timings_ms"].get(phase)) is None:
+                continue
+            ratio = t["min"] / t_base["min"] if t_base["min"] else 1.0
+            mark = ""
+            if ratio > 1 + tolerance:
+                mark = " !"
+                slower.append(f"{case}/{phase}")
+            print(f"{case + '/' + phase:<40} {t_base['min']:>10.2f} {t['min']:>10.2f} {ratio:>7.2f}{mark}")
+    return slower
+
+
+# %% ---------------------------------------------------------------------------
+# main
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(
+        description="Benchmark the parser and the renderers of hyhdl with a synthetic verilog corpus"
+    )
+    ap.add_argument(
+        "-c",
+        nargs="+",
+        choices=[*cases, "custom"],
+        help="cases to run (default: small medium large), custom is defined by the generator options",
+    )
+    ap.add_argument("-n", type=int, default=5, help="number of runs of each phase (default: 5)")
+    ap.add_argument("-o", help="write the results to the json file O")
+    ap.add_argument(
+        "-b",
+        help="compare with the results in the json file B, exit with 1 if a phase is slower than (1 + tolerance) times",
+    )
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown when comparing (default: 0.2)")
+    ap.add_argument("--corpus", help="only write the generated verilog files into the directory CORPUS")
+    ap.add_argument("--params", type=int, default=4, help="custom case: number of parameters")
+    ap.add_argument("--ports", type=int, default=16, help="custom case: number of ports")
+    ap.add_argument("--docs", type=int, default=20, help="custom case: number of //> doc lines")
+    ap.add_argument("--tables", type=int, default=1, help="custom case: number of tables")
+    ap.add_argument("--waves", type=int, default=1, help="custom case: number of waves")
+    ap.add_argument("--size", type=float, default=0, help="custom case: file size in MB, 0 for no padding")
+    ap.add_argument("--seed", type=int, default=0, help="seed of the generator (default: 0)")
+    args = ap.parse_args()
+
+    cases["custom"] = dict(
+        params=args.params,
+        ports=args.ports,
+        docs=args.docs,
+        tables=args.tables,
+        waves=args.waves,
+        size=args.size,
+    )
+    selected = args.c or default_cases
+    # -------- 生成 verilog 文件 --------
+    with tempfile.TemporaryDirectory(prefix="hyhdl_bench_") as tmp_dir:
+        corpus_dir = Path(args.corpus or tmp_dir)
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+        files = {}
+        for case in selected:
+            files[case] = corpus_dir.joinpath(f"bench_{case}.v")
+            files[case].write_text(gen_verilog(**cases[case], seed=args.seed), encoding="utf-8")
+        if args.corpus:
+            for case, f in files.items():
+                print(f"{f}: {f.stat().st_size} bytes")
+            sys.exit(0)
+        # -------- 测试 --------
+        results = {
+            "version": code_version(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.n,
+            "seed": args.seed,
+            "cases": {},
+        }
+        for case in selected:
+            t_start = time.perf_counter()
+            result = bench_file(str(files[case]), args.n)
+            results["cases"][case] = {
+                "config": cases[case],
+                "file_bytes": files[case].stat().st_size,
+                **result,
+            }
+            print(f"{case}: {time.perf_counter() - t_start:.1f} s", file=sys.stderr)
+    # -------- 输出结果 --------
+    if args.o:
+        Path(args.o).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.b:
+        base = json.loads(Path(args.b).read_text(encoding="utf-8"))
+        slower = compare(base, results, args.tolerance)
+        if slower:
+            print(f"slower: {', '.join(slower)}")
+            sys.exit(1)
+    elif not args.o:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,330 @@
+# ==============================================================================
+# AUTHOR: hid4net<hid4net@outlook.com>
+# DESCRIPTION:
+# * 使用
+# *     usage: hyhdl_fuzz.py [-h] [-n N] [--seed SEED] [--budget-ms BUDGET_MS] [--perf] [--legacy]
+# *
+# *     Fuzz the module header parser against the legacy regular expressions, with a time budget per file
+# *
+# *     options:
+# *       -n N          number of generated files of each kind (default: 500)
+# *       --seed SEED   seed of the generator (default: 0)
+# *       --budget-ms   time budget of parsing one file in ms (default: 50)
+# *       --perf        also parse the pathological headers of growing size, check the time is linear
+# *       --legacy      time the legacy regular expressions on the pathological headers too (can be very slow)
+# * 设计思路
+# *     1. 生成合法的 ANSI module 声明 (旧的正则表达式能正确解析的写法), 新旧解析结果必须相同
+# *     2. 随机截断, 删除, 重复片段, 生成畸形的代码, 新的解析器不能出错, 且耗时不超过预算
+# *     3. 病态的声明 (未闭合, 很长的默认值, 大量嵌套的括号), 代码加倍时耗时也只能约加倍
+# *     旧的正则表达式的已知问题 (新的解析器已修正), 生成合法代码时避开:
+# *         以关键字开头的名称 (wire_en 被解析为 wire + _en), 一个方向声明多个 port (input a, b),
+# *         一个 parameter 声明多个赋值, 没有 port 时不解析 parameter, "signed" 之后的多余空格
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author | Date       | Changes
+#    :-----: | :----: | :--------: | -------------------------------------------
+#    0.1     | hid4net | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+#
+# ------------------------------------------------------------------------------
+import argparse
+import random
+import re
+import sys
+import time
+
+from hyhdl_lib import clear_caches
+from hyhdl_lib.VerilogLexer import VerilogLexer
+from hyhdl_lib.VerilogParser import VerilogParser
+from hyhdl_lib.util_code import shorten_spaces
+
+# %% ---------------------------------------------------------------------------
+# 旧的正则表达式 (用于比较)
+# ------------------------------------------------------------------------------
+legacy_re_module = re.compile(r"\bmodule\b\s*(?P<name>[a-zA-Z_]\w*)\b(?P<body>.*?;)", re.S)
+legacy_re_endmodule = re.compile(r"\bendmodule\b")
+legacy_re_param_port_text = re.compile(
+    r"(#\s*\((?P<param>.*?)\))?"
+    r"\s*\(\s*(?P<port>(input|output|inout).+?)\)\s*;",
+    re.S,
+)
+legacy_re_param_item = re.compile(
+    r"parameter"
+    r"\s*(?P<type>((?P<signed>signed)?\s*(?P<range>\[[^:]+:[^:]+\])?)|integer|real|realtime|time)?"
+    r"\s*(?P<var>[a-zA-Z_]\w*)"
+    r"\s*(=\s*(?P<value>.+?))?"
+    r"\s*(,(?=\s*parameter)|\Z)",
+    re.S,
+)
+legacy_re_port_item = re.compile(
+    r"(?P<direction>input|output|inout)"
+    r"\s*(?P<type>wire|wand|wor|tri|tri0|tri1|triand|trior|trireg|reg)?"
+    r"\s*(?P<signed>signed)?"
+    r"\s*(?P<range>\[[^:]+:[^:]+\])?"
+    r"\s*(?P<var>[a-zA-Z_]\w*)"
+    r"\s*(=\s*(?P<value>.+?))?"
+    r"\s*(,(?=\s*(input|output|inout))|\Z)",
+    re.S,
+)
+
+
+def legacy_parse_modules(code: str) -> list[dict]:
+    """
+    使用旧的正则表达式解析所有 module (与之前的 VerilogParser.parse_modules 相同)\n
+    code: str => verilog 代码\n
+    return: list[dict] => module 的列表
+    """
+    parser = VerilogParser(code=code)
+    code_stub = VerilogLexer(code).get_code()
+    modules = []
+    pos = 0
+    while m_module := legacy_re_module.search(code_stub, pos):
+        parameters = []
+        ports = []
+        body = m_module.group("body")
+        if m_text := legacy_re_param_port_text.search(body):
+            get_description = parser._index_header_comments(m_module.start(), m_module.end())
+            if param_text := m_text.group("param"):
+                param_offset = m_module.start("body") + m_text.start("param")
+                for m in legacy_re_param_item.finditer(param_text):
+                    parameters.append(
+                        {
+                            "name": m.group("var"),
+                            "type": shorten_spaces(m.group("type")),
+                            "value": m.group("value"),
+                            "description": get_description(param_offset + m.start("var")),
+                        }
+                    )
+            if port_text := m_text.group("port"):
+                port_offset = m_module.start("body") + m_text.start("port")
+                for m in legacy_re_port_item.finditer(port_text):
+                    p_type = m.group("type") or "(wire)"
+                    if t := m.group("signed"):
+                        p_type += f" {t}"
+                    if t := m.group("range"):
+                        p_type += f" {shorten_spaces(t)}"
+                    ports.append(
+                        {
+                            "name": m.group("var"),
+                            "direction": m.group("direction"),
+                            "type": p_type,
+                            "description": get_description(port_offset + m.start("var")),
+                        }
+                    )
+        m_end = legacy_re_endmodule.search(code_stub, m_module.end())
+        end = m_end.end() if m_end else len(code_stub)
+        modules.append(
+            {
+                "name": m_module.group("name"),
+                "parameters": parameters,
+                "ports": ports,
+                "offset": m_module.start(),
+                "header_end": m_module.end(),
+                "end": end,
+            }
+        )
+        pos = end
+    return modules
+
+
+def normalize(modules: list[dict]) -> list[dict]:
+    """
+    忽略旧的正则表达式的已知差异: parameter 类型末尾的空格
+    """
+    for module in modules:
+        for p in module["parameters"]:
+            p["type"] = p["type"].strip()
+    return modules
+
+
+# %% ---------------------------------------------------------------------------
+# 生成代码
+# ------------------------------------------------------------------------------
+def gen_name(rnd: random.Random, prefix: str) -> str:
+    # 避开以关键字开头的名称 (旧的正则表达式会把 wire_en 拆开)
+    return f"{prefix}{rnd.choice(['', 'x', 'data', 'cnt'])}{rnd.randrange(1000)}"
+
+
+def gen_comment(rnd: random.Random, nl: str) -> str:
+    if "\n" not in nl:  # 行注释之后必须换行
+        return rnd.choice(["", " /* blk */", " (* keep *)"])
+    return rnd.choice(["", "", f" // desc {rnd.randrange(99)}", " /* blk */", " // 中文 描述", " (* keep *)"])
+
+
+def gen_value(rnd: random.Random, depth: int = 0) -> str:
+    kind = rnd.randrange(6 if depth < 3 else 3)
+    if kind == 0:
+        return str(rnd.randrange(1, 256))
+    elif kind == 1:
+        return f"{rnd.randrange(1, 32)}'h{rnd.randrange(4096):x}"
+    elif kind == 2:
+        return rnd.choice(['"str"', "W", "$clog2(16)", "1.5"])
+    elif kind == 3:
+        return f"({gen_value(rnd, depth + 1)} + {gen_value(rnd, depth + 1)})"
+    elif kind == 4:
+        return f"{{{gen_value(rnd, depth + 1)}, {gen_value(rnd, depth + 1)}}}"
+    return f"{gen_value(rnd, depth + 1)} * /* c */ {gen_value(rnd, depth + 1)}"
+
+
+def gen_module(rnd: random.Random, name: str) -> str:
+    """
+    生成一个合法的 ANSI module (旧的正则表达式能正确解析的写法)
+    """
+    text = f"module {name}"
+    nl = rnd.choice(["\n", " ", "\n  "])
+    if rnd.random() < 0.6:
+        params = []
+        for _ in range(rnd.randint(1, 5)):
+            p_type = rnd.choice(["", "", "integer ", "signed [3:0] ", "[7 : 0] ", "real "])
+            params.append(f"parameter {p_type}{gen_name(rnd, 'P')} = {gen_value(rnd)}")
+        text += f"{nl}#({nl}" + f",{gen_comment(rnd, nl)}{nl}".join(params) + f"{gen_comment(rnd, nl)}{nl})"
+    ports = []
+    for _ in range(rnd.randint(1, 8)):
+        direction = rnd.choice(["input", "output", "inout"])
+        p_type = rnd.choice(["", "wire ", "reg ", "tri1 "]) if direction == "output" else rnd.choice(["", "wire "])
+        signed = rnd.choice(["", "", "signed "])
+        rng = rnd.choice(["", "", "[7:0] ", "[W-1 : 0] ", "[ (W*2)-1:0] "])
+        value = f" = {gen_value(rnd)}" if p_type == "reg " and rnd.random() < 0.3 else ""
+        ports.append(f"{direction} {p_type}{signed}{rng}{gen_name(rnd, 'p')}{value}")
+    text += f"{nl}({nl}" + f",{gen_comment(rnd, nl)}{nl}".join(ports) + f"{gen_comment(rnd, nl)}{nl});"
+    text += rnd.choice(["\n", f"  // tail\n"])
+    text += rnd.choice(["", "  assign a = b;\n", '  initial $display("endmodule;");\n'])
+    return text + "endmodule\n"
+
+
+def gen_file(rnd: random.Random) -> str:
+    parts = []
+    for k in range(rnd.randint(1, 4)):
+        parts.append(rnd.choice(["", "// module fake (input x);\n", "/* module y; */\n", "`timescale 1ns/1ps\n"]))
+        parts.append(gen_module(rnd, f"m{k}_{rnd.randrange(100)}"))
+    return "".join(parts)
+
+
+def mutate(rnd: random.Random, code: str) -> str:
+    """
+    随机破坏代码: 截断, 删除, 重复片段, 插入符号
+    """
+    for _ in range(rnd.randint(1, 4)):
+        if not code:
+            break
+        a = rnd.randrange(len(code))
+        b = min(len(code), a + rnd.randint(1, 40))
+        kind = rnd.randrange(5)
+        if kind == 0:
+            code = code[:a]
+        elif kind == 1:
+            code = code[:a] + code[b:]
+        elif kind == 2:
+            code = code[:b] + code[a:b] * rnd.randint(1, 50) + code[b:]
+        elif kind == 3:
+            code = code[:a] + rnd.choice(["(", ")", ";", ",", "#(", "[", '"', "/*", "module "]) * rnd.randint(1, 20) + code[a:]
+        else:
+            code = code[:a] + rnd.choice(["input ", "parameter ", "= ", "signed "]) * rnd.randint(1, 200) + code[a:]
+    return code
+
+
+# %% ---------------------------------------------------------------------------
+# 病态的声明
+# ------------------------------------------------------------------------------
+pathological = {
+    # 未闭合的声明: 旧的正则表达式对每个 module 都扫描到文件结尾
+    "unterminated": lambda n: "module m (input a\n" * n,
+    # 很长的默认值
+    "long value": lambda n: "module m #(parameter W = " + "1 + " * n + "1) (input a);\nendmodule\n",
+    # 大量 input 但没有结尾的 ";"
+    "ports without ';'": lambda n: "module m (" + "input a, " * n + "input b)\n",
+    # 大量嵌套的括号
+    "nested": lambda n: "module m #(parameter W = " + "(" * n + "1" + ")" * n + ") (input a);\nendmodule\n",
+    # parameter 之间没有 port
+    "params only": lambda n: "module m #(" + "parameter P = 1, " * n + "parameter Q = 2)\n",
+}
+
+
+def time_parse(parse, code: str) -> float:
+    """
+    return: float => 解析的耗时 (ms), 不使用缓存的解析结果
+    """
+    clear_caches()
+    t_start = time.perf_counter()
+    parse(code)
+    return (time.perf_counter() - t_start) * 1000
+
+
+def parse_new(code: str) -> list[dict]:
+    """
+    return: list[dict] => 解析的 module, 去掉旧的正则表达式没有的计算结果 (parameter 的值, port 的位宽)
+    """
+    return [
+        dict(
+            m,
+            parameters=[{k: v for k, v in x.items() if k != "resolved"} for x in m["parameters"]],
+            ports=[{k: v for k, v in x.items() if k not in ("width", "range")} for x in m["ports"]],
+        )
+        for m in VerilogParser(code=code).parse_modules()
+    ]
+
+
+# %% ---------------------------------------------------------------------------
+# main
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(
+        description="Fuzz the module header parser against the legacy regular expressions, with a time budget per file"
+    )
+    ap.add_argument("-n", type=int, default=500, help="number of generated files of each kind (default: 500)")
+    ap.add_argument("--seed", type=int, default=0, help="seed of the generator (default: 0)")
+    ap.add_argument("--budget-ms", type=float, default=50, help="time budget of parsing one file in ms (default: 50)")
+    ap.add_argument("--perf", action="store_true", help="parse the pathological headers of growing size")
+    ap.add_argument("--legacy", action="store_true", help="time the legacy regular expressions on them too")
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    failures = []
+    # -------- 合法的代码: 新旧结果相同 --------
+    for k in range(args.n):
+        code = gen_file(rnd)
+        if rnd.random() < 0.3:
+            code = code.replace("\n", "\r\n")
+        new = parse_new(code)
+        old = normalize(legacy_parse_modules(code))
+        if new != old:
+            failures.append(("differs", code))
+    print(f"valid: {args.n} files, {sum(x[0] == 'differs' for x in failures)} differ")
+    # -------- 畸形的代码: 不出错, 不超过时间预算 --------
+    slowest = 0.0
+    for k in range(args.n):
+        code = mutate(rnd, gen_file(rnd))
+        try:
+            t = time_parse(parse_new, code)
+        except Exception as e:
+            failures.append((f"{type(e).__name__}: {e}", code))
+            continue
+        slowest = max(slowest, t)
+        if t > args.budget_ms:
+            failures.append((f"{t:.1f} ms", code))
+    print(f"malformed: {args.n} files, slowest {slowest:.2f} ms")
+    # -------- 病态的声明: 耗时与代码的长度成正比 --------
+    if args.perf:
+        for name, gen in pathological.items():
+            times = []
+            for n in (500, 1000, 2000, 4000):
+                code = gen(n)
+                t = min(time_parse(parse_new, code) for _ in range(3))
+                times.append(t)
+                line = f"{name:<20} n={n:<5} {len(code):>8} chars  new {t:8.2f} ms"
+                if args.legacy:
+                    line += f"  legacy {time_parse(legacy_parse_modules, code):10.2f} ms"
+                print(line)
+            # 代码加倍时耗时不能明显超过加倍 (允许计时的误差)
+            if times[-1] > max(times[0], 0.5) * 8 * 2:
+                failures.append((f"{name}: not linear, {times}", ""))
+            if times[-1] > args.budget_ms * 4:
+                failures.append((f"{name}: {times[-1]:.1f} ms", ""))
+    # -------- 结果 --------
+    for reason, code in failures[:5]:
+        print(f"---- {reason}\n{code[:2000]}")
+    if failures:
+        print(f"{len(failures)} failures")
+        sys.exit(1)
+    print("ok")
@@ -0,0 +1,325 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     绘制 module 的框图 (svg)
+# *         端口很多时 (SoC 顶层), 按总线/接口分组 (相同的前缀, AXI 的通道, 位展开的端口),
+# *         每组只画一行, 框图的大小只与分组的数量有关; 分组的端口列在框图下方, 可以展开
+# *         summary 模式只画接口 (AXI 的各通道合并), 其余的端口合并为一行, 不列出各组的端口
+# *     svg 的各行写入列表, 最后一次性拼接
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import re
+from html import escape
+from typing import NamedTuple
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+DIAGRAM_MODES = ("auto", "full", "summary")  # auto: 端口较多时分组, full: 每个端口一行, summary: 只画分组
+DEFAULT_DIAGRAM_MODE = "auto"
+GROUP_MIN_PORTS = 64  # auto 模式下, 端口数超过该值时分组
+# AXI 各通道的信号 (去掉接口的前缀之后), 同一接口的同一通道分为一组
+re_axi_channel = re.compile(
+    r"(aw|ar)(id|addr|len|size|burst|lock|cache|prot|qos|region|user|valid|ready)"
+    r"|(w)(id|data|strb|last|user|valid|ready)"
+    r"|(r)(id|data|resp|last|user|valid|ready)"
+    r"|(b)(id|resp|user|valid|ready)",
+    re.I,
+)
+re_trailing_index = re.compile(r"_?\d+$")  # 位展开的端口的序号, 例如 gpio_0, d7
+
+
+# %% ---------------------------------------------------------------------------
+# 分组
+# ------------------------------------------------------------------------------
+class DiagramRow(NamedTuple):
+    """
+    框图中的一行: 一个端口或一组端口\n
+    name: str => 显示的名称\n
+    type: str => 显示的类型 (分组为端口数)\n
+    direction: str => 方向 ("input", "output", "inout")\n
+    ports: list => 分组中的端口, 单个端口时为 None
+    """
+
+    name: str
+    type: str
+    direction: str
+    ports: list = None
+
+
+def get_group_key(name: str, channel: bool = True) -> str:
+    """
+    端口的分组: 接口的前缀 (最后一个 "_" 之前), AXI 的通道 (例如 s_axi_aw), 位展开的端口去掉序号\n
+    name: str => 端口名\n
+    channel: bool => 是否按 AXI 的通道分组, False 时同一接口的各通道为一组\n
+    return: str => 分组的名称, 没有前缀时为端口名本身
+    """
+    if (stripped := re_trailing_index.sub("", name)) and stripped != name:
+        return stripped
+    prefix, sep, last = name.rpartition("_")
+    if not sep or not prefix:
+        return name
+    if channel and (m := re_axi_channel.fullmatch(last)):
+        return f"{prefix}_{next(x for x in m.groups() if x)}"
+    return prefix
+
+
+def _group_label(ports: list[dict]) -> str:
+    """
+    分组的说明: 端口数, 所有端口的位宽都能计算时加上总位数\n
+    ports: list[dict] => 分组中的端口\n
+    return: str => 例如 "5 ports, 42 bits"
+    """
+    widths = [x.get("width") for x in ports]
+    if None in widths:
+        return f"{len(ports)} ports"
+    return f"{len(ports)} ports, {sum(widths)} bits"
+
+
+def group_ports(ports: list[dict], summary: bool = False) -> list[DiagramRow]:
+    """
+    将同一侧的端口分组, 分组按其第一个端口的位置排列, 只有一个端口的分组仍画为端口\n
+    ports: list[dict] => 同一侧的端口 (name, direction, type)\n
+    summary: bool => 是否只保留分组 (按接口, 不再按 AXI 的通道), 其余的端口合并为一行\n
+    return: list[DiagramRow] => 框图中的各行
+    """
+    groups = {}
+    for port in ports:
+        groups.setdefault(get_group_key(port["name"], not summary), []).append(port)
+    rows = []
+    others = []
+    for key, members in groups.items():
+        if len(members) > 1:
+            directions = {x["direction"] for x in members}
+            direction = directions.pop() if len(directions) == 1 else "inout"
+            rows.append(DiagramRow(f"{key}*", _group_label(members), direction, members))
+        elif summary:
+            others += members
+        else:
+            port = members[0]
+            rows.append(DiagramRow(port["name"], port["type"], port["direction"]))
+    if others:
+        directions = {x["direction"] for x in others}
+        direction = directions.pop() if len(directions) == 1 else "inout"
+        rows.append(DiagramRow("others", _group_label(others), direction, others))
+    return rows
+
+
+# %% ---------------------------------------------------------------------------
+# ModuleDiagram
+# ------------------------------------------------------------------------------
+class ModuleDiagram:
+    """
+    绘制 module 的框图
+    """
+
+    def __init__(self, parameters: list[dict], ports: list[dict], mode: str = None) -> None:
+        """
+        parameters: list[dict] => module 的 parameters\n
+        ports: list[dict] => module 的 ports\n
+        mode: str => DIAGRAM_MODES 之一, None 表示 auto
+        """
+        mode = mode or DEFAULT_DIAGRAM_MODE
+        if mode not in DIAGRAM_MODES:
+            raise ValueError(f"unknown diagram mode: {mode}, choose from {', '.join(DIAGRAM_MODES)}")
+        self.parameters = parameters
+        self.summary = mode == "summary"
+        ports_left = [x for x in ports if x["direction"] == "input"]
+        ports_right = [x for x in ports if x["direction"] in ("output", "inout")]
+        self.grouped = mode == "summary" or (mode == "auto" and len(ports) > GROUP_MIN_PORTS)
+        if self.grouped:
+            self.rows_left = group_ports(ports_left, self.summary)
+            self.rows_right = group_ports(ports_right, self.summary)
+        else:
+            self.rows_left = [DiagramRow(x["name"], x["type"], x["direction"]) for x in ports_left]
+            self.rows_right = [DiagramRow(x["name"], x["type"], x["direction"]) for x in ports_right]
+
+    # ------------------------------------------------------------------------------
+    # 生成 html
+    # ------------------------------------------------------------------------------
+    def render(self) -> str:
+        """
+        生成框图 (分组时在框图之后列出各组的端口)\n
+        return: str => svg 代码 (和分组的 html)
+        """
+        out = []
+        self._draw(out)
+        if self.grouped and not self.summary:
+            self._list_groups(out)
+        return "".join(out)
+
+    def _list_groups(self, out: list) -> None:
+        """
+        列出各组的端口, 每组一个可以展开的 <details>\n
+        out: list => 输出的缓冲
+        """
+        for row in self.rows_left + self.rows_right:
+            if row.ports is None:
+                continue
+            names = ", ".join(f"{x['name']} {x['type']}".rstrip() for x in row.ports)
+            out.append(
+                f"<details>\n"
+                f"\t<summary>{escape(row.name)} ({row.type}, {row.direction})</summary>\n"
+                f"\t<p>{escape(names)}</p>\n"
+                f"</details>\n"
+            )
+
+    # ------------------------------------------------------------------------------
+    # 绘制框图
+    # ------------------------------------------------------------------------------
+    def _draw(self, out: list) -> None:
+        """
+        绘制框图\n
+        out: list => 输出的缓冲
+        """
+        parameters = self.parameters
+        rows_left, rows_right = self.rows_left, self.rows_right
+        # -------- 获取框图的基本参数 --------
+        max_chars_param = (
+            max([len(x["name"]) for x in parameters]) if parameters else 0
+        )  # parameters 中 name 的最大的字符宽度
+        max_chars_port_l = (
+            max([len(x.name) for x in rows_left]) if rows_left else 0
+        )  # 左侧 (in) 端口中 name 的最大字符宽度
+        max_chars_port_r = (
+            max([len(x.name) for x in rows_right]) if rows_right else 0
+        )  # 右侧 (out, inout) 端口中 name 的最大字符宽度
+        # 框图方框宽度
+        rect_width = 30 + 10 * max(max_chars_param, max_chars_port_l + max_chars_port_r)
+
+        max_chars_param = (
+            max([len(x["type"]) for x in parameters]) if parameters else 0
+        )  # parameters 中 type 的最大的字符宽度
+        max_chars_port_l = (
+            max([len(x.type) for x in rows_left]) if rows_left else 0
+        )  # 左侧 (in) 端口中 type 的最大字符宽度
+        max_chars_port_r = (
+            max([len(x.type) for x in rows_right]) if rows_right else 0
+        )  # 右侧 (out, inout) 端口中 type 的最大字符宽度
+        # 框图边界宽度
+        margin_width = 10 * max(max_chars_param, max_chars_port_l, max_chars_port_r) + 10
+
+        # 框图高度 (parameters)
+        rect1_height = len(parameters) * 20 + 10 if parameters else 0
+        # 框图高度 (ports)
+        rect2_height = 10 + 20 * max(len(rows_left), len(rows_right))
+        # 框图间距 (parameters vs ports)
+        rect2_offset = rect1_height + 10 if rect1_height > 0 else 0
+        # -------- 生成 svg 代码 --------
+        #   生成 svg 头
+        out.append(
+            f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+            f'viewBox="0 0 {rect_width + margin_width * 2} {rect2_offset + rect2_height}">\n'
+        )
+        # 绘制 parameters 的图
+        if rect1_height > 0:
+            # 绘制方框
+            out.append(
+                f'\t<rect x="{margin_width}" y="0" width="{rect_width}" height="{rect1_height}" '
+                f'fill="black"></rect>\n'
+            )
+            out.append(
+                f'\t<rect x="{margin_width + 2}" y="2" width="{rect_width - 4}" height="{rect1_height - 4}" '
+                f'fill="#bdecb6"></rect>\n'
+            )
+            # 绘制线和文字
+            for i, param in enumerate(parameters, 1):
+                text_y = i * 20
+                line_y = text_y - 5
+                out.append(
+                    f'\t<line x1="{margin_width - 10}" y1="{line_y}" x2="{margin_width}" y2="{line_y}" '
+                    f'stroke="black" stroke-width="2"></line>\n'
+                )
+                out.append(
+                    f'\t<text x="{margin_width + 5}" y="{text_y}" '
+                    f'font-size="18">{param["name"]}</text>\n'
+                )
+        # 绘制 ports 的图
+        #   绘制方框
+        out.append(
+            f'\t<rect x="{margin_width}" y="{rect2_offset}" width="{rect_width}" height="{rect2_height}" '
+            f'fill="black"></rect>\n'
+        )
+        out.append(
+            f'\t<rect x="{margin_width + 2}" y="{rect2_offset + 2}" width="{rect_width - 4}" height="{rect2_height - 4}" '
+            f'fill="#fdfd96"></rect>\n'
+        )
+        #   绘制左侧线和文字
+        for i, row in enumerate(rows_left, 1):
+            text_y = i * 20 + rect2_offset
+            line_y = text_y - 5
+            # 分组画为粗线, 名称为斜体
+            stroke_width, font_style = (2, "") if row.ports is None else (5, ' font-style="italic"')
+            out.append(
+                f'\t<line x1="{margin_width - 10}" y1="{line_y}" x2="{margin_width}" y2="{line_y}" '
+                f'stroke="black" stroke-width="{stroke_width}"></line>\n'
+            )
+            out.append(
+                f'\t<polyline points="'
+                f"{margin_width     },{line_y - 5} "
+                f"{margin_width + 10},{line_y - 5} "
+                f"{margin_width + 15},{line_y    } "
+                f"{margin_width + 10},{line_y + 5} "
+                f"{margin_width     },{line_y + 5}"
+                f'" style="fill:none; stroke:black; stroke-width:2"></polyline>\n'
+            )
+            out.append(
+                f'\t<text x="{margin_width + 20}" y="{text_y}" '
+                f'font-size="18"{font_style}>{row.name}</text>\n'
+            )
+            out.append(
+                f'\t<text x="{margin_width - 15}" y="{text_y}" '
+                f'text-anchor="end" font-size="18">{row.type}</text>\n'
+            )
+        #   绘制右侧线和文字
+        for i, row in enumerate(rows_right, 1):
+            x_right = margin_width + rect_width
+            text_y = i * 20 + rect2_offset
+            line_y = text_y - 5
+            stroke_width, font_style = (2, "") if row.ports is None else (5, ' font-style="italic"')
+            out.append(
+                f'\t<line x1="{x_right}" y1="{line_y}" x2="{x_right + 10}" y2="{line_y}" '
+                f'stroke="black" stroke-width="{stroke_width}"></line>\n'
+            )
+            if row.direction == "output":
+                out.append(
+                    f'\t<polyline points="'
+                    f"{x_right - 2     },{line_y    } "
+                    f"{x_right - 2 -  5},{line_y - 5} "
+                    f"{x_right - 2 - 15},{line_y - 5} "
+                    f"{x_right - 2 - 15},{line_y + 5} "
+                    f"{x_right - 2 -  5},{line_y + 5} "
+                    f"{x_right - 2     },{line_y    }"
+                    f'" style="fill:none; stroke:black; stroke-width:2"></polyline>\n'
+                )
+            elif row.direction == "inout":
+                out.append(
+                    f'\t<polyline points="'
+                    f"{x_right - 2     },{line_y    } "
+                    f"{x_right - 2 -  5},{line_y - 5} "
+                    f"{x_right - 2 - 10},{line_y - 5} "
+                    f"{x_right - 2 - 15},{line_y    } "
+                    f"{x_right - 2 - 10},{line_y + 5} "
+                    f"{x_right - 2 -  5},{line_y + 5} "
+                    f"{x_right - 2     },{line_y    }"
+                    f'" style="fill:none; stroke:black; stroke-width:2"></polyline>\n'
+                )
+            out.append(
+                f'\t<text x="{x_right - 22}" y="{text_y}" '
+                f'text-anchor="end" font-size="18"{font_style}>{row.name}</text>\n'
+            )
+            out.append(
+                f'\t<text x="{x_right + 15}" y="{text_y}" '
+                f'font-size="18">{row.type}</text>\n'
+            )
+        # 生成 svg 尾
+        out.append(f"</svg>\n")
@@ -0,0 +1,210 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     server 模式的请求调度 (asyncio): 读取请求不被处理阻塞, 请求在一个工作线程中依次处理
+# *         同一文档 (doc) 的同一命令防抖: 一段时间内没有更新的请求才开始处理
+# *         更新的请求取代等待中的请求 (编辑合并到更新的请求中), 被取代的请求返回 cancelled
+# *         更新的请求包含完整的代码时, 取消正在处理的请求 (在下一个阶段开始时停止)
+# *         内容相同的请求 (例如多个编辑器显示同一文件) 只处理一次, 结果返回给每个请求
+# *     只有文档的最新状态会被处理和显示
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from .util_cache import hash_text
+from .util_metrics import CancellableMetrics, RequestCancelled
+
+
+# %% ---------------------------------------------------------------------------
+# 工具函数
+# ------------------------------------------------------------------------------
+def apply_text_edits(code: str, edits: list) -> str:
+    """
+    依次应用编辑\n
+    code: str => 代码\n
+    edits: list => [[offset, removed, inserted], ...]\n
+    return: str => 编辑后的代码
+    """
+    for offset, removed, inserted in edits:
+        code = code[:offset] + inserted + code[offset + removed :]
+    return code
+
+
+def merge_requests(old: dict, new: dict) -> dict:
+    """
+    合并同一文档的两个请求 (old 未处理, 被 new 取代)\n
+    old: dict => 被取代的请求\n
+    new: dict => 更新的请求\n
+    return: dict => 合并后的请求: new 只有编辑时, 编辑以 old 的结果为基础, 需要合并 old 的代码或编辑
+    """
+    if "edits" not in new:
+        return new
+    merged = dict(new)
+    if "edits" in old:
+        merged["edits"] = old["edits"] + new["edits"]
+    elif "code" in old:
+        del merged["edits"]
+        merged["code"] = apply_text_edits(old["code"], new["edits"])
+        for key in ("file", "module"):
+            if key in old and key not in merged:
+                merged[key] = old[key]
+    return merged
+
+
+# %% ---------------------------------------------------------------------------
+# RequestScheduler
+# ------------------------------------------------------------------------------
+class _Job:
+    """
+    一个待处理的请求, ids 为内容相同的请求的 id
+    """
+
+    def __init__(self, req: dict, key: tuple, fingerprint: str) -> None:
+        self.req = req
+        self.key = key  # (cmd, doc), 不属于文档的请求为 None
+        self.fingerprint = fingerprint  # 请求内容的 hash, 不能合并的请求为 None
+        self.ids = [req.get("id")]
+        self.metrics = CancellableMetrics(enabled=bool(req.get("metrics")))
+        self.timer = None  # 防抖的计时器
+
+
+class RequestScheduler:
+    """
+    server 模式的请求调度, 在 asyncio 的事件循环中运行
+    """
+
+    def __init__(self, handle, respond, debounce: float = 0.03) -> None:
+        """
+        handle: Callable[[dict, CancellableMetrics], dict] => 处理请求 (在工作线程中执行), 返回响应 (不含 id)\n
+        respond: Callable[[dict], None] => 写出响应 (在事件循环中调用)\n
+        debounce: float => 同一文档的请求的防抖时间 (s)
+        """
+        self.handle = handle
+        self.respond = respond
+        self.debounce = debounce
+        self.__worker = ThreadPoolExecutor(1)  # 所有请求在同一线程中处理, 文档和缓存不需要加锁
+        self.__queue = asyncio.Queue()  # 可以开始处理的请求
+        self.__waiting = {}  # key -> 防抖中的请求
+        self.__running = None  # 正在处理的请求
+        self.__fingerprints = {}  # fingerprint -> 等待或正在处理的请求
+        self.__consumer = asyncio.ensure_future(self._consume())
+
+    # ------------------------------------------------------------------------------
+    # 提交请求
+    # ------------------------------------------------------------------------------
+    def submit(self, req: dict) -> None:
+        """
+        提交一个请求\n
+        req: dict => 请求 (id, cmd, doc, code/edits, ...)
+        """
+        # -------- 内容相同的请求只处理一次 (编辑不能重复应用, 不合并) --------
+        fingerprint = None
+        if "edits" not in req:
+            fingerprint = hash_text(json.dumps({k: v for k, v in req.items() if k != "id"}, sort_keys=True))
+            if (job := self.__fingerprints.get(fingerprint)) is not None and not job.metrics.cancelled:
+                job.ids.append(req.get("id"))
+                return
+        # -------- 关闭文档时丢弃其防抖中的请求 --------
+        if req.get("cmd") == "close_doc":
+            for key in [x for x in self.__waiting if x[1] == req.get("doc")]:
+                old = self.__waiting.pop(key)
+                old.timer.cancel()
+                self._cancel(old)
+        key = (req.get("cmd"), req["doc"]) if req.get("doc") is not None and req.get("cmd") != "close_doc" else None
+        if key is not None:
+            # -------- 取代防抖中的请求 --------
+            if (old := self.__waiting.pop(key, None)) is not None:
+                old.timer.cancel()
+                self._cancel(old)
+                req = merge_requests(old.req, req)
+                if "edits" in req:
+                    fingerprint = None
+            # -------- 取消正在处理的请求 (更新的请求不依赖其结果时) --------
+            running = self.__running
+            if running is not None and running.key == key and "edits" not in req:
+                running.metrics.cancel()
+        job = _Job(req, key, fingerprint)
+        if fingerprint is not None:
+            self.__fingerprints[fingerprint] = job
+        if key is None:
+            self.__queue.put_nowait(job)
+        else:
+            self.__waiting[key] = job
+            job.timer = asyncio.get_running_loop().call_later(self.debounce, self._ready, job)
+
+    def _ready(self, job: _Job) -> None:
+        """
+        防抖结束, 开始排队处理
+        """
+        if self.__waiting.get(job.key) is job:
+            del self.__waiting[job.key]
+            self.__queue.put_nowait(job)
+
+    def _cancel(self, job: _Job) -> None:
+        """
+        取消请求, 返回 cancelled
+        """
+        job.metrics.cancel()
+        self._forget(job)
+        for req_id in job.ids:
+            self.respond({"id": req_id, "cancelled": True})
+
+    def _forget(self, job: _Job) -> None:
+        if job.fingerprint is not None and self.__fingerprints.get(job.fingerprint) is job:
+            del self.__fingerprints[job.fingerprint]
+
+    # ------------------------------------------------------------------------------
+    # 处理请求
+    # ------------------------------------------------------------------------------
+    async def _consume(self) -> None:
+        """
+        依次处理队列中的请求
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.__queue.get()
+            if job.metrics.cancelled:
+                self.__queue.task_done()
+                continue
+            self.__running = job
+            try:
+                resp = await loop.run_in_executor(self.__worker, self._handle, job)
+            finally:
+                self.__running = None
+                self._forget(job)
+            for req_id in job.ids:
+                self.respond({"id": req_id, **resp})
+            self.__queue.task_done()
+
+    def _handle(self, job: _Job) -> dict:
+        """
+        在工作线程中处理请求
+        """
+        try:
+            return self.handle(job.req, job.metrics)
+        except RequestCancelled:
+            return {"cancelled": True}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    async def drain(self) -> None:
+        """
+        立即处理所有防抖中的请求, 等待全部处理完成 (退出前调用)
+        """
+        for job in list(self.__waiting.values()):
+            job.timer.cancel()
+            self._ready(job)
+        await self.__queue.join()
+        self.__consumer.cancel()
+        self.__worker.shutdown()
@@ -0,0 +1,430 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     计算 verilog 的常量表达式: parameter 的值, port 的位宽
+# *         支持数值 (8'hFF, 'd10, 1_000), 算术, 移位, 比较, 逻辑, 按位运算, 三目运算, $clog2,
+# *         以及对其他 parameter 的引用; 其他写法 (x/z, 实数, 拼接, 位选择, 函数调用) 视为不能计算
+# *     表达式解析一次后缓存, 计算结果按 "表达式 + 其中引用的 parameter 的值" 缓存,
+# *         parameter 不同的多次计算 (例如扫描参数的 batch) 只计算变化的表达式
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import re
+from functools import lru_cache
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+re_expr_token = re.compile(
+    r"\s*(?:"
+    r"(?P<based>(?:(?P<size>\d[\d_]*)\s*)?'(?P<signed>[sS])?(?P<base>[bBoOdDhH])\s*(?P<digits>[0-9a-fA-F_xXzZ?]+))|"
+    r"(?P<real>\d[\d_]*(?:\.\d[\d_]*[eE][+-]?\d+|\.\d[\d_]*|[eE][+-]?\d+))|"
+    r"(?P<num>\d[\d_]*)|"
+    r"(?P<id>\$?[a-zA-Z_][\w$]*)|"
+    r"(?P<op>\*\*|<<<|>>>|===|!==|<<|>>|<=|>=|==|!=|&&|\|\||~\^|\^~|~&|~\||[-+*/%<>!~&|^?:(),{}\[\]'])"
+    r")"
+)
+BASES = {"b": 2, "o": 8, "d": 10, "h": 16}
+# 二元运算符的优先级 (数值越大越先计算), 都是左结合
+BINARY_PRECEDENCE = {
+    "**": 11,
+    "*": 10, "/": 10, "%": 10,
+    "+": 9, "-": 9,
+    "<<": 8, ">>": 8, "<<<": 8, ">>>": 8,
+    "<": 7, "<=": 7, ">": 7, ">=": 7,
+    "==": 6, "!=": 6, "===": 6, "!==": 6,
+    "&": 5,
+    "^": 4, "~^": 4, "^~": 4,
+    "|": 3,
+    "&&": 2,
+    "||": 1,
+}
+UNARY_OPS = {"+", "-", "!", "~", "&", "|", "^", "~&", "~|", "~^", "^~"}
+MAX_BITS = 4096  # 计算结果的最大位数, 超过时视为不能计算 (例如 2 ** 100000)
+# 没有范围时的位宽
+TYPE_WIDTHS = {"integer": 32, "int": 32, "time": 64, "longint": 64, "shortint": 16, "byte": 8}
+
+
+class ConstEvalError(ValueError):
+    """
+    表达式不能计算
+    """
+
+
+# %% ---------------------------------------------------------------------------
+# 解析表达式
+# ------------------------------------------------------------------------------
+def _to_int(digits: str, base: int = 10) -> int:
+    """
+    数字转换为整数, 位数超过 python 的限制 (sys.set_int_max_str_digits) 时不能计算
+    """
+    try:
+        return int(digits, base)
+    except ValueError:
+        raise ConstEvalError(f"number too long: {digits[:16]}...") from None
+
+
+def _tokenize(text: str) -> list[tuple[str, object]]:
+    """
+    切分表达式\n
+    text: str => 表达式\n
+    return: list[tuple[str, object]] => (类型, 值) 的列表, 类型为 "num", "id" 或 "op"
+    """
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        if not (m := re_expr_token.match(text, pos)) or m.end() == pos:
+            raise ConstEvalError(f"unexpected character: {text[pos:pos + 1]}")
+        pos = m.end()
+        if m.group("based"):
+            digits = m.group("digits").replace("_", "")
+            if set(digits) & set("xXzZ?"):
+                raise ConstEvalError(f"unknown bits: {m.group()}")
+            value = _to_int(digits, BASES[m.group("base").lower()])
+            if m.group("size"):
+                size = _to_int(m.group("size").replace("_", ""))
+                if value.bit_length() > size:  # 位宽可能很大, 只在需要截断时生成掩码
+                    value &= (1 << size) - 1
+                if m.group("signed") and size and value >> (size - 1):
+                    value -= 1 << size
+            tokens.append(("num", value))
+        elif m.group("real"):
+            raise ConstEvalError(f"real number: {m.group('real')}")
+        elif m.group("num"):
+            tokens.append(("num", _to_int(m.group("num").replace("_", ""))))
+        elif m.group("id"):
+            tokens.append(("id", m.group("id")))
+        else:
+            tokens.append(("op", m.group("op")))
+    return tokens
+
+
+class _ExprParser:
+    """
+    递归下降 (优先级爬升) 解析表达式, 生成语法树\n
+    语法树的节点: ("num", value), ("id", name), ("unary", op, x), ("binary", op, x, y),
+    ("cond", c, x, y), ("call", name, [args])
+    """
+
+    def __init__(self, tokens: list) -> None:
+        self.tokens = tokens
+        self.pos = 0
+        self.refs = set()  # 引用的标识符
+
+    def _peek(self) -> tuple:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else ("end", None)
+
+    def _take(self, op: str = None) -> tuple:
+        token = self._peek()
+        if op is not None and token != ("op", op):
+            raise ConstEvalError(f"expected {op}")
+        self.pos += 1
+        return token
+
+    def parse(self) -> tuple:
+        node = self._parse_cond()
+        if self.pos != len(self.tokens):
+            raise ConstEvalError("unexpected token")
+        return node
+
+    def _parse_cond(self) -> tuple:
+        node = self._parse_binary(1)
+        if self._peek() == ("op", "?"):
+            self._take()
+            yes = self._parse_cond()
+            self._take(":")
+            no = self._parse_cond()
+            node = ("cond", node, yes, no)
+        return node
+
+    def _parse_binary(self, min_prec: int) -> tuple:
+        node = self._parse_unary()
+        while True:
+            kind, op = self._peek()
+            prec = BINARY_PRECEDENCE.get(op, 0) if kind == "op" else 0
+            if prec < min_prec:
+                return node
+            self._take()
+            node = ("binary", op, node, self._parse_binary(prec + 1))
+
+    def _parse_unary(self) -> tuple:
+        kind, value = self._take()
+        if kind == "op" and value in UNARY_OPS:
+            return ("unary", value, self._parse_unary())
+        if kind == "op" and value == "(":
+            node = self._parse_cond()
+            self._take(")")
+            return node
+        if kind == "num":
+            return ("num", value)
+        if kind == "id":
+            if value[0] == "$":
+                self._take("(")
+                args = [self._parse_cond()]
+                while self._peek() == ("op", ","):
+                    self._take()
+                    args.append(self._parse_cond())
+                self._take(")")
+                return ("call", value, args)
+            if self._peek()[0] == "op" and self._peek()[1] in "([":
+                raise ConstEvalError(f"function call or bit select: {value}")
+            self.refs.add(value)
+            return ("id", value)
+        raise ConstEvalError(f"unexpected token: {value}")
+
+
+@lru_cache(maxsize=4096)
+def compile_expr(text: str) -> tuple:
+    """
+    解析表达式 (结果会被缓存)\n
+    text: str => 表达式\n
+    return: tuple => (语法树, 引用的标识符 (排序后的 tuple)), 不能解析时语法树为 None
+    """
+    try:
+        parser = _ExprParser(_tokenize(text))
+        return parser.parse(), tuple(sorted(parser.refs))
+    except (ConstEvalError, RecursionError):
+        return None, ()
+
+
+# %% ---------------------------------------------------------------------------
+# 计算表达式
+# ------------------------------------------------------------------------------
+def _div(x: int, y: int) -> int:
+    """
+    整数除法, 向 0 取整 (与 verilog 相同)
+    """
+    if y == 0:
+        raise ConstEvalError("division by zero")
+    q = abs(x) // abs(y)
+    return q if (x >= 0) == (y >= 0) else -q
+
+
+def _check(value: int) -> int:
+    if value.bit_length() > MAX_BITS:
+        raise ConstEvalError("value too large")
+    return value
+
+
+def _pow(x: int, y: int) -> int:
+    """
+    乘方, 结果的位数超过 MAX_BITS 时在计算之前拒绝 (计算本身可能需要很长时间, 例如 3 ** (1 << 30))
+    """
+    if y < 0:
+        if x == 0:
+            raise ConstEvalError("division by zero")
+        return x**-y if x in (1, -1) else 0  # 1 / x ** -y 向 0 取整
+    # x ** y 至少有 (x.bit_length() - 1) * y + 1 位; 通过检查时计算的结果最多 2 * MAX_BITS 位
+    if x not in (0, 1, -1) and (x.bit_length() - 1) * y >= MAX_BITS:
+        raise ConstEvalError("value too large")
+    return _check(x**y)
+
+
+def _mul(x: int, y: int) -> int:
+    """
+    乘法, 结果的位数超过 MAX_BITS 时在计算之前拒绝 (x * y 至少有两个数的位数之和 - 1 位)
+    """
+    if x and y and x.bit_length() + y.bit_length() - 1 > MAX_BITS:
+        raise ConstEvalError("value too large")
+    return _check(x * y)
+
+
+BINARY_FUNCS = {
+    "**": _pow,
+    "*": _mul,
+    "/": _div,
+    "%": lambda x, y: x - _div(x, y) * y,
+    "+": lambda x, y: x + y,
+    "-": lambda x, y: x - y,
+    "<<": lambda x, y: _check(x << y) if 0 <= y <= MAX_BITS else (0 if y > MAX_BITS else x >> -y),
+    "<<<": lambda x, y: _check(x << y) if 0 <= y <= MAX_BITS else (0 if y > MAX_BITS else x >> -y),
+    ">>": lambda x, y: x >> y if y >= 0 else _check(x << -y),
+    ">>>": lambda x, y: x >> y if y >= 0 else _check(x << -y),
+    "<": lambda x, y: int(x < y),
+    "<=": lambda x, y: int(x <= y),
+    ">": lambda x, y: int(x > y),
+    ">=": lambda x, y: int(x >= y),
+    "==": lambda x, y: int(x == y),
+    "!=": lambda x, y: int(x != y),
+    "===": lambda x, y: int(x == y),
+    "!==": lambda x, y: int(x != y),
+    "&": lambda x, y: x & y,
+    "^": lambda x, y: x ^ y,
+    "~^": lambda x, y: ~(x ^ y),
+    "^~": lambda x, y: ~(x ^ y),
+    "|": lambda x, y: x | y,
+}
+
+
+def _clog2(x: int) -> int:
+    return 0 if x <= 1 else (x - 1).bit_length()
+
+
+FUNCTIONS = {
+    "$clog2": _clog2,
+    "$signed": lambda x: x,
+    "$unsigned": lambda x: x,
+}
+
+
+def _eval_node(node: tuple, env: dict) -> int:
+    """
+    计算语法树\n
+    node: tuple => 语法树的节点\n
+    env: dict => 标识符 -> 值\n
+    return: int => 计算结果
+    """
+    kind = node[0]
+    if kind == "num":
+        return node[1]
+    if kind == "id":
+        return env[node[1]]
+    if kind == "cond":
+        return _eval_node(node[2] if _eval_node(node[1], env) else node[3], env)
+    if kind == "unary":
+        op, x = node[1], _eval_node(node[2], env)
+        if op == "+":
+            return x
+        if op == "-":
+            return -x
+        if op == "!":
+            return int(not x)
+        if op == "~":
+            return ~x
+        raise ConstEvalError(f"reduction operator without width: {op}")  # 归约运算需要位宽
+    if kind == "binary":
+        op = node[1]
+        x = _eval_node(node[2], env)
+        # 逻辑运算短路, 未计算的一侧不能计算时也有结果
+        if op == "&&":
+            return int(bool(x) and bool(_eval_node(node[3], env)))
+        if op == "||":
+            return int(bool(x) or bool(_eval_node(node[3], env)))
+        return BINARY_FUNCS[op](x, _eval_node(node[3], env))
+    if kind == "call":
+        if (func := FUNCTIONS.get(node[1])) is None or len(node[2]) != 1:
+            raise ConstEvalError(f"unsupported function: {node[1]}")
+        return func(_eval_node(node[2][0], env))
+    raise ConstEvalError(f"unknown node: {kind}")
+
+
+@lru_cache(maxsize=65536)
+def _eval_memo(text: str, values: tuple) -> int:
+    """
+    计算表达式, 按 (表达式, 引用的标识符的值) 缓存\n
+    text: str => 表达式\n
+    values: tuple => 引用的标识符的值 (与 compile_expr 返回的标识符的顺序相同)\n
+    return: int => 计算结果, 不能计算时为 None
+    """
+    node, refs = compile_expr(text)
+    try:
+        return _eval_node(node, dict(zip(refs, values)))
+    except (ConstEvalError, RecursionError, OverflowError):
+        return None
+
+
+def eval_const(text: str, env: dict = None) -> int:
+    """
+    计算常量表达式\n
+    text: str => 表达式\n
+    env: dict => 标识符 (parameter) -> 值, 值为 None 表示不能计算\n
+    return: int => 计算结果, 不能计算时为 None
+    """
+    if text is None:
+        return None
+    node, refs = compile_expr(text)
+    if node is None:
+        return None
+    values = tuple(env.get(x) for x in refs) if env and refs else (None,) * len(refs)
+    if None in values:
+        return None
+    return _eval_memo(text, values)
+
+
+# %% ---------------------------------------------------------------------------
+# parameter 和 port
+# ------------------------------------------------------------------------------
+@lru_cache(maxsize=4096)
+def split_packed_ranges(port_type: str) -> tuple[tuple[str, str]]:
+    """
+    找出 port 类型中的范围 ([msb:lsb], 可以有多个; 结果会被缓存)\n
+    port_type: str => port 的类型, 例如 "wire signed [DW-1:0]"\n
+    return: tuple[tuple[str, str]] => (msb, lsb) 的表达式, 范围的写法不能识别时为 None
+    """
+    if "[" not in port_type:
+        return ()
+    ranges = []
+    depth = 0
+    start = colon = None
+    for k, ch in enumerate(port_type):
+        if ch in "([{":
+            if ch == "[" and depth == 0:
+                start, colon = k + 1, None
+            depth += 1
+        elif ch in ")]}":
+            depth -= 1
+            if ch == "]" and depth == 0:
+                if colon is None:
+                    return None
+                ranges.append((port_type[start:colon], port_type[colon + 1 : k]))
+        elif ch == ":" and depth == 1 and start is not None:
+            if colon is not None:
+                return None
+            colon = k
+    return tuple(ranges)
+
+
+def eval_port_range(port_type: str, env: dict = None) -> tuple[int, str]:
+    """
+    计算 port 的位宽和范围\n
+    port_type: str => port 的类型\n
+    env: dict => parameter -> 值\n
+    return: tuple[int, str] => (位宽, 计算后的范围, 例如 "[7:0]"; 没有范围时为 ""), 不能计算时为 (None, None)
+    """
+    ranges = split_packed_ranges(port_type)
+    if ranges is None:
+        return None, None
+    if not ranges:
+        words = port_type.split()
+        return TYPE_WIDTHS.get(words[0] if words else "", 1), ""
+    width = 1
+    texts = []
+    for msb_text, lsb_text in ranges:
+        msb, lsb = eval_const(msb_text, env), eval_const(lsb_text, env)
+        if msb is None or lsb is None:
+            return None, None
+        width *= abs(msb - lsb) + 1
+        texts.append(f"[{msb}:{lsb}]")
+    return width, "".join(texts)
+
+
+def resolve_module(parameters: list[dict], ports: list[dict], overrides: dict = None) -> tuple:
+    """
+    计算 parameter 的值和 port 的位宽 (parameter 按顺序计算, 可以引用之前的 parameter)\n
+    parameters: list[dict] => parameter 条目 (name, value, ...)\n
+    ports: list[dict] => port 条目 (name, type, ...)\n
+    overrides: dict => parameter -> 例化时指定的值 (数值或表达式), 代替 parameter 的默认值\n
+    return: tuple[list[dict], list[dict]] => 增加了 resolved (parameter 的值) 的 parameter 条目,
+        增加了 width (位宽) 和 range (计算后的范围) 的 port 条目; 不能计算时为 None
+    """
+    overrides = overrides or {}
+    env = {}
+    resolved_parameters = []
+    for p in parameters:
+        value = overrides.get(p["name"], p["value"])
+        env[p["name"]] = value if isinstance(value, int) else eval_const(value, env)
+        resolved_parameters.append(dict(p, resolved=env[p["name"]]))
+    resolved_ports = []
+    for p in ports:
+        width, rng = eval_port_range(p["type"], env)
+        resolved_ports.append(dict(p, width=width, range=rng))
+    return resolved_parameters, resolved_ports
@@ -1,379 +1,537 @@
-# ==============================================================================
-# COPYRIGHT(C) SIAT
-# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
-# DESCRIPTION:
-# *
-#
-# MODIFICATION HISTORY:---------------------------------------------------------
-#    Version | Author       | Date       | Changes
-#    :-----: | :----------: | :--------: | -------------------------------------
-#    0.1     | WangXH       | 2022-08-14 | start coding
-#
-# ==============================================================================
-# %% ---------------------------------------------------------------------------
-# import
-# ------------------------------------------------------------------------------
-from pathlib import Path
-from urllib.parse import quote
-
-from jinja2 import Environment, FileSystemLoader
-
-from .util_file import write_to_tmpfile
-from .VerilogParser import VerilogParser
-
-
-# %% ---------------------------------------------------------------------------
-# class: Documentor
-# ------------------------------------------------------------------------------
-class VerilogDocumentor(VerilogParser):
-    """
-    处理 verilog 文件
-    """
-
-    # ------------------------------------------------------------------------------
-    # 初始化 Documentor, 读取文件并提取需要出来的代码
-    # ------------------------------------------------------------------------------
-    def __init__(self, file: str, pytools_dir: str) -> None:
-        """
-        初始化 Documentor, 读取文件并提取需要出来的代码\n
-        pytools_dir:str => pyTools 的路径
-        file: str => verilog 文件路径
-        """
-        # -------- init --------
-        super().__init__(file)
-        self.parse_module()
-        self.parse_comment()
-        self.__pytools_dir = pytools_dir
-
-    # ------------------------------------------------------------------------------
-    # draw the block diagram
-    # ------------------------------------------------------------------------------
-    def _draw_module_bd(self) -> None:
-        """
-        绘制 module 的框图
-        """
-        # -------- 如果没有端口, 不画图 --------
-        if self.module_ports == []:
-            return ""
-        # -------- 整理数据 --------
-        parameters = self.module_parameters
-        ports_left = [x for x in self.module_ports if x["direction"] == "input"]
-        ports_right = [x for x in self.module_ports if x["direction"] in ("output", "inout")]
-        # -------- 获取框图的基本参数 --------
-        max_chars_param = (
-            max([len(x["name"]) for x in parameters]) if parameters else 0
-        )  # parameters 中 name 的最大的字符宽度
-        max_chars_port_l = (
-            max([len(x["name"]) for x in ports_left]) if ports_left else 0
-        )  # 左侧 (in) 端口中 name 的最大字符宽度
-        max_chars_port_r = (
-            max([len(x["name"]) for x in ports_right]) if ports_right else 0
-        )  # 右侧 (out, inout) 端口中 name 的最大字符宽度
-        # 框图方框宽度
-        rect_width = 30 + 10 * max(max_chars_param, max_chars_port_l + max_chars_port_r)
-
-        max_chars_param = (
-            max([len(x["type"]) for x in parameters]) if parameters else 0
-        )  # parameters 中 type 的最大的字符宽度
-        max_chars_port_l = (
-            max([len(x["type"]) for x in ports_left]) if ports_left else 0
-        )  # 左侧 (in) 端口中 type 的最大字符宽度
-        max_chars_port_r = (
-            max([len(x["type"]) for x in ports_right]) if ports_right else 0
-        )  # 右侧 (out, inout) 端口中 type 的最大字符宽度
-        # 框图边界宽度
-        margin_width = 10 * max(max_chars_param, max_chars_port_l, max_chars_port_r) + 10
-
-        # 框图高度 (parameters)
-        rect1_height = len(parameters) * 20 + 10 if parameters else 0
-        # 框图高度 (ports)
-        rect2_height = 10 + 20 * max(len(ports_left), len(ports_right))
-        # 框图间距 (parameters vs ports)
-        rect2_offset = rect1_height + 10 if rect1_height > 0 else 0
-        # -------- 生成 svg 代码 --------
-        #   生成 svg 头
-        svg_code = (
-            f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
-            f'viewBox="0 0 {rect_width + margin_width * 2} {rect2_offset + rect2_height}">\n'
-        )
-        # 绘制 parameters 的图
-        if rect1_height > 0:
-            # 绘制方框
-            svg_code += (
-                f'\t<rect x="{margin_width}" y="0" width="{rect_width}" height="{rect1_height}" '
-                f'fill="black"></rect>\n'
-            )
-            svg_code += (
-                f'\t<rect x="{margin_width + 2}" y="2" width="{rect_width - 4}" height="{rect1_height - 4}" '
-                f'fill="#bdecb6"></rect>\n'
-            )
-            # 绘制线和文字
-            for i, param in enumerate(parameters, 1):
-                text_y = i * 20
-                line_y = text_y - 5
-                svg_code += (
-                    f'\t<line x1="{margin_width - 10}" y1="{line_y}" x2="{margin_width}" y2="{line_y}" '
-                    f'stroke="black" stroke-width="2"></line>\n'
-                )
-                svg_code += (
-                    f'\t<text x="{margin_width + 5}" y="{text_y}" '
-                    f'font-size="18">{param["name"]}</text>\n'
-                )
-        # 绘制 ports 的图
-        #   绘制方框
-        svg_code += (
-            f'\t<rect x="{margin_width}" y="{rect2_offset}" width="{rect_width}" height="{rect2_height}" '
-            f'fill="black"></rect>\n'
-        )
-        svg_code += (
-            f'\t<rect x="{margin_width + 2}" y="{rect2_offset + 2}" width="{rect_width - 4}" height="{rect2_height - 4}" '
-            f'fill="#fdfd96"></rect>\n'
-        )
-        #   绘制左侧线和文字
-        for i, port in enumerate(ports_left, 1):
-            text_y = i * 20 + rect2_offset
-            line_y = text_y - 5
-            svg_code += (
-                f'\t<line x1="{margin_width - 10}" y1="{line_y}" x2="{margin_width}" y2="{line_y}" '
-                f'stroke="black" stroke-width="2"></line>\n'
-            )
-            svg_code += (
-                f'\t<polyline points="'
-                f"{margin_width     },{line_y - 5} "
-                f"{margin_width + 10},{line_y - 5} "
-                f"{margin_width + 15},{line_y    } "
-                f"{margin_width + 10},{line_y + 5} "
-                f"{margin_width     },{line_y + 5}"
-                f'" style="fill:none; stroke:black; stroke-width:2"></polyline>\n'
-            )
-            svg_code += (
-                f'\t<text x="{margin_width + 20}" y="{text_y}" '
-                f'font-size="18">{port["name"]}</text>\n'
-            )
-            svg_code += (
-                f'\t<text x="{margin_width - 15}" y="{text_y}" '
-                f'text-anchor="end" font-size="18">{port["type"]}</text>\n'
-            )
-        #   绘制右侧线和文字
-        for i, port in enumerate(ports_right, 1):
-            x_right = margin_width + rect_width
-            text_y = i * 20 + rect2_offset
-            line_y = text_y - 5
-            svg_code += (
-                f'\t<line x1="{x_right}" y1="{line_y}" x2="{x_right + 10}" y2="{line_y}" '
-                f'stroke="black" stroke-width="2"></line>\n'
-            )
-            if port["direction"] == "output":
-                svg_code += (
-                    f'\t<polyline points="'
-                    f"{x_right - 2     },{line_y    } "
-                    f"{x_right - 2 -  5},{line_y - 5} "
-                    f"{x_right - 2 - 15},{line_y - 5} "
-                    f"{x_right - 2 - 15},{line_y + 5} "
-                    f"{x_right - 2 -  5},{line_y + 5} "
-                    f"{x_right - 2     },{line_y    }"
-                    f'" style="fill:none; stroke:black; stroke-width:2"></polyline>\n'
-                )
-            elif port["direction"] == "inout":
-                # if port["direction"] == "output":
-                svg_code += (
-                    f'\t<polyline points="'
-                    f"{x_right - 2     },{line_y    } "
-                    f"{x_right - 2 -  5},{line_y - 5} "
-                    f"{x_right - 2 - 10},{line_y - 5} "
-                    f"{x_right - 2 - 15},{line_y    } "
-                    f"{x_right - 2 - 10},{line_y + 5} "
-                    f"{x_right - 2 -  5},{line_y + 5} "
-                    f"{x_right - 2     },{line_y    }"
-                    f'" style="fill:none; stroke:black; stroke-width:2"></polyline>\n'
-                )
-            svg_code += (
-                f'\t<text x="{x_right - 22}" y="{text_y}" '
-                f'text-anchor="end" font-size="18">{port["name"]}</text>\n'
-            )
-            svg_code += (
-                f'\t<text x="{x_right + 15}" y="{text_y}" '
-                f'font-size="18">{port["type"]}</text>\n'
-            )
-        # 生成 svg 尾
-        svg_code += f"</svg>\n"
-        # -------- 更新数据 --------
-        return svg_code
-
-    # ------------------------------------------------------------------------------
-    # 格式化注释 -> html
-    # ------------------------------------------------------------------------------
-    def _get_notes_html(self) -> str:
-        """
-        格式化注释, 生成 html\n
-        return: str => 由注释转换而来的 html 字符串
-        """
-        # -------- 如果没有需要处理的 comment_items --------
-        if self.comment_items == []:
-            return ""
-        comment_items = self.comment_items
-        notes_html = ""
-        # -------- 处理 comment_items --------
-        for item in comment_items:
-            # -------- 预处理 --------
-            cmtType = item["type"]
-            cmtData = item["data"]
-            html_indent = (item["indent"] - 1) // 2 if item["indent"] else 0
-            # -------- 转 html --------
-            match (cmtType):
-                case "WaveDrom":
-                    notes_html += (
-                        f'<div style="padding: 0 0 50px {html_indent}rem">\n'
-                        if html_indent
-                        else f'<div style="padding: 0 0 50px">\n'
-                    )
-                    notes_html += (
-                        f'\t<script type="WaveDrom">\n'
-                        f"\t\t{cmtData}\n"
-                        f"\t</script>\n"
-                        f"</div>\n"
-                    )
-                # 如果是 table
-                case "table":
-                    # <div>
-                    notes_html += (
-                        f'<div style="padding-left:{html_indent}rem">\n'
-                        if html_indent
-                        else f"<div>\n"
-                    )
-                    #   <table>
-                    notes_html += "<table>\n"
-                    #       <thead>
-                    notes_html += "\t<thead>\n\t\t<tr>\n"
-                    for td in cmtData["thead"]:
-                        notes_html += f"\t\t\t<th>{td}</th>\n"
-                    notes_html += "\t\t</tr>\n\t</thead>\n"
-                    #       <tbody>
-                    notes_html += "\t<tbody>\n"
-                    for tbody in cmtData["tbody"]:
-                        notes_html += "\t\t<tr>\n"
-                        for tAlign, td_item in zip(cmtData["align"], tbody):
-                            if tAlign == "left":
-                                notes_html += f"\t\t\t<td>{td_item}</td>\n"
-                            else:
-                                notes_html += (
-                                    f'\t\t\t<td style="text-align: {tAlign}">{td_item}</td>\n'
-                                )
-                        notes_html += "\t\t</tr>\n"
-                    notes_html += "\t</tbody>\n"
-                    #   </table>
-                    notes_html += "</table>\n"
-                    # </div>
-                    notes_html += "</div>\n"
-                # 如果是 normal
-                case _:
-                    tStr = cmtData.strip()
-                    if tStr:
-                        tStr = tStr.replace("<", "&lt;").replace(">", "&gt;")
-                        notes_html += (
-                            f'<p style="padding-left:{html_indent}rem">{tStr}</p>\n'
-                            if html_indent
-                            else f"<p>{tStr}</p>\n"
-                        )
-                    else:
-                        notes_html += f"<br>\n"
-        # -------- 返回数据 --------
-        return notes_html
-
-    # ------------------------------------------------------------------------------
-    # 生成预览用的 html
-    # ------------------------------------------------------------------------------
-    def get_preview_html(self, template_fname: str) -> str:
-        """
-        生成预览用的 html
-        template_fname: str => testbench template file
-        return: str => html 的路径
-        """
-        # -------- 初始化变量 --------
-        tmplt_path = Path(template_fname)
-        if not tmplt_path.exists():
-            return ""
-        # -------- 整理数据 --------
-        # VS_EXT_PATH_PREFIX = "vscode-resource:/"
-        # pytools_dir = Path(self.__pytools_dir)
-        # wavedrom_js_path = VS_EXT_PATH_PREFIX + quote(  # 需要使用 vscode 的安全协议
-        #     pytools_dir.joinpath("wavedrom", "wavedrom.min.js").as_posix()
-        # )
-        # wavedrom_theme_path = VS_EXT_PATH_PREFIX + quote(  # 需要使用 vscode 的安全协议
-        #     pytools_dir.joinpath("wavedrom", "default.js").as_posix()
-        # )
-        parameters = self.module_parameters
-        ports = self.module_ports
-        hasWavedrom = self.has_wavedrom
-        if hasWavedrom:
-            pytools_dir = Path(self.__pytools_dir)
-            with Path(pytools_dir).joinpath("wavedrom", "wavedrom.min.js").open("r",encoding="utf-8") as fp:
-                wavedrom_js_text = fp.read()
-            with Path(pytools_dir).joinpath("wavedrom", "default.js").open("r",encoding="utf-8") as fp:
-                wavedrom_theme_text = fp.read()
-        else:
-            wavedrom_js_text = ""
-            wavedrom_theme_text = ""
-        # -------- 替换模板 --------
-        env = Environment(loader=FileSystemLoader(tmplt_path.parent))
-        tmpl = env.get_template(tmplt_path.name)
-        text = tmpl.render(
-            hasWavedrom=hasWavedrom,
-            # wavedrom_js_path=wavedrom_js_path,
-            # wavedrom_theme_path=wavedrom_theme_path,
-            wavedrom_js_text=wavedrom_js_text,
-            wavedrom_theme_text=wavedrom_theme_text,
-            module_name=self.module_name,
-            module_diagram=self._draw_module_bd(),
-            parameters=parameters,
-            hasParameters=len(parameters) > 0,
-            ports=ports,
-            hasPorts=len(ports) > 0,
-            notes_html=self._get_notes_html(),
-        )
-        # -------- 写入临时文件 --------
-        return write_to_tmpfile("hyhdl_output", text)
-
-    # ------------------------------------------------------------------------------
-    # 生成导出用的 html
-    # ------------------------------------------------------------------------------
-    def get_export_html(self, template_fname: str) -> str:
-        """
-        生成导出用的 html\n
-        return: str => html 的路径
-        """
-        # -------- 初始化变量 --------
-        tmplt_path = Path(template_fname)
-        if not tmplt_path.exists():
-            return ""
-        # -------- 整理数据 --------
-        parameters = self.module_parameters
-        ports = self.module_ports
-        hasWavedrom = self.has_wavedrom
-        if hasWavedrom:
-            pytools_dir = Path(self.__pytools_dir)
-            with Path(pytools_dir).joinpath("wavedrom", "wavedrom.min.js").open("r",encoding="utf-8") as fp:
-                wavedrom_js_text = fp.read()
-            with Path(pytools_dir).joinpath("wavedrom", "default.js").open("r",encoding="utf-8") as fp:
-                wavedrom_theme_text = fp.read()
-        else:
-            wavedrom_js_text = ""
-            wavedrom_theme_text = ""
-
-        # -------- 替换模板 --------
-        env = Environment(loader=FileSystemLoader(tmplt_path.parent))
-        tmpl = env.get_template(tmplt_path.name)
-        text = tmpl.render(
-            hasWavedrom=hasWavedrom,
-            wavedrom_js_text=wavedrom_js_text,
-            wavedrom_theme_text=wavedrom_theme_text,
-            module_name=self.module_name,
-            module_diagram=self._draw_module_bd(),
-            parameters=parameters,
-            hasParameters=len(parameters) > 0,
-            ports=ports,
-            hasPorts=len(ports) > 0,
-            notes_html=self._get_notes_html(),
-        )
-        # -------- 写入临时文件 --------
-        return write_to_tmpfile("hyhdl_output", text)
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2022-08-14 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+from pathlib import Path
+
+from .ModuleDiagram import ModuleDiagram
+from .WaveRenderer import render_wave_svg
+from .util_asset import WavedromAssets, get_wavedrom_assets
+from .util_cache import code_version, hash_file, hash_text
+from .util_file import get_template
+from .util_metrics import Metrics
+from .VerilogParser import VerilogParser
+
+
+# %% ---------------------------------------------------------------------------
+# class: Documentor
+# ------------------------------------------------------------------------------
+class VerilogDocumentor(VerilogParser):
+    """
+    处理 verilog 文件
+    """
+
+    # ------------------------------------------------------------------------------
+    # 初始化 Documentor, 读取文件并提取需要出来的代码
+    # ------------------------------------------------------------------------------
+    def __init__(
+        self,
+        file: str,
+        pytools_dir: str,
+        code: str = None,
+        metrics: Metrics = None,
+        module: str = None,
+        offset: int = None,
+        diagram: str = None,
+    ) -> None:
+        """
+        初始化 Documentor, 读取文件并提取需要出来的代码\n
+        file: str => verilog 文件路径\n
+        pytools_dir:str => pyTools 的路径\n
+        code: str => verilog 代码, 不为 None 时不再读取 file\n
+        metrics: Metrics => 记录各阶段的耗时, None 表示不记录\n
+        module: str => 文件中有多个 module 时, 按名称选择\n
+        offset: int => 文件中有多个 module 时, 按光标的偏移选择\n
+        diagram: str => 框图的模式 ("auto", "full", "summary"), None 表示 auto
+        """
+        # -------- init --------
+        super().__init__(file, code, metrics)
+        self.parse_module(module, offset)
+        self.parse_comment()
+        self.__pytools_dir = pytools_dir
+        self.diagram = diagram  # 框图的模式 (DIAGRAM_MODES), None 表示 auto
+        self.__bd_cache = None  # 框图的缓存: (parameters, ports, diagram, svg)
+        self.__note_cache = ((False, None), {})  # 注释条目的缓存: ((wave_svg, skin), {id(item): (item, html, hash)})
+
+    # ------------------------------------------------------------------------------
+    # get the block diagram
+    # ------------------------------------------------------------------------------
+    def _get_module_bd(self) -> str:
+        """
+        获取 module 的框图, parameters, ports 和框图的模式未变化时 (例如增量解析之后) 复用上次的结果\n
+        return: str => svg 代码
+        """
+        key = (self.module_parameters, self.module_ports, self.diagram)
+        if self.__bd_cache is None or self.__bd_cache[:3] != key:
+            self.__bd_cache = (*key, self._draw_module_bd())
+        return self.__bd_cache[3]
+
+    # ------------------------------------------------------------------------------
+    # draw the block diagram
+    # ------------------------------------------------------------------------------
+    def _draw_module_bd(self) -> str:
+        """
+        绘制 module 的框图 (端口很多时按总线/接口分组, 见 ModuleDiagram)\n
+        return: str => svg 代码
+        """
+        # -------- 如果没有端口, 不画图 --------
+        if self.module_ports == []:
+            return ""
+        return ModuleDiagram(self.module_parameters, self.module_ports, self.diagram).render()
+
+    # ------------------------------------------------------------------------------
+    # 格式化注释 -> html
+    # ------------------------------------------------------------------------------
+    def _get_notes_html(self, wave_svg: bool = False, skin: str = None) -> str:
+        """
+        格式化注释, 生成 html\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg (不支持的 wave 仍由 wavedrom.min.js 渲染)\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        return: str => 由注释转换而来的 html 字符串
+        """
+        return "".join(self._get_note_html(item, wave_svg, skin) for item in self.comment_items)
+
+    def _get_note_html(self, item: dict, wave_svg: bool = False, skin: str = None) -> str:
+        """
+        将一个注释条目转换为 html\n
+        item: dict => comment_items 中的条目\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        return: str => html 字符串
+        """
+        # -------- 预处理 --------
+        cmtType = item["type"]
+        cmtData = item["data"]
+        html_indent = (item["indent"] - 1) // 2 if item["indent"] else 0
+        notes_html = ""
+        # -------- 转 html --------
+        match (cmtType):
+            case "WaveDrom":
+                notes_html += (
+                    f'<div style="padding: 0 0 50px {html_indent}rem">\n'
+                    if html_indent
+                    else f'<div style="padding: 0 0 50px">\n'
+                )
+                if wave_svg and (svg := render_wave_svg(cmtData, skin)):
+                    notes_html += f"{svg}\n</div>\n"
+                else:
+                    notes_html += (
+                        f'\t<script type="WaveDrom">\n'
+                        f"\t\t{cmtData}\n"
+                        f"\t</script>\n"
+                        f"</div>\n"
+                    )
+            # 如果是 table
+            case "table":
+                # <div>
+                notes_html += (
+                    f'<div style="padding-left:{html_indent}rem">\n'
+                    if html_indent
+                    else f"<div>\n"
+                )
+                #   <table>
+                notes_html += "<table>\n"
+                #       <thead>
+                notes_html += "\t<thead>\n\t\t<tr>\n"
+                for td in cmtData["thead"]:
+                    notes_html += f"\t\t\t<th>{td}</th>\n"
+                notes_html += "\t\t</tr>\n\t</thead>\n"
+                #       <tbody>
+                notes_html += "\t<tbody>\n"
+                for tbody in cmtData["tbody"]:
+                    notes_html += "\t\t<tr>\n"
+                    for tAlign, td_item in zip(cmtData["align"], tbody):
+                        if tAlign == "left":
+                            notes_html += f"\t\t\t<td>{td_item}</td>\n"
+                        else:
+                            notes_html += (
+                                f'\t\t\t<td style="text-align: {tAlign}">{td_item}</td>\n'
+                            )
+                    notes_html += "\t\t</tr>\n"
+                notes_html += "\t</tbody>\n"
+                #   </table>
+                notes_html += "</table>\n"
+                # </div>
+                notes_html += "</div>\n"
+            # 如果是 normal
+            case _:
+                tStr = cmtData.strip()
+                if tStr:
+                    tStr = tStr.replace("<", "&lt;").replace(">", "&gt;")
+                    notes_html += (
+                        f'<p style="padding-left:{html_indent}rem">{tStr}</p>\n'
+                        if html_indent
+                        else f"<p>{tStr}</p>\n"
+                    )
+                else:
+                    notes_html += f"<br>\n"
+        # -------- 返回数据 --------
+        return notes_html
+
+    # ------------------------------------------------------------------------------
+    # 生成的 html 的缓存
+    # ------------------------------------------------------------------------------
+    def _html_cache_key(
+        self,
+        kind: str,
+        template_fname: str,
+        assets: WavedromAssets,
+        asset_uri: str = None,
+        wave_svg: bool = False,
+    ) -> str:
+        """
+        生成的 html 的缓存的 key: 解析结果 + 模板 + 资源 (wavedrom) 的 hash\n
+        kind: str => "preview" 或 "export"\n
+        template_fname: str => 模板文件\n
+        assets: WavedromAssets => wavedrom 资源\n
+        asset_uri: str => 资源的引用地址, None 表示内嵌\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        return: str => 缓存的 key
+        """
+        return hash_text(
+            kind,
+            code_version(),
+            self.model_hash(with_comment=True),
+            hash_file(template_fname),
+            assets.version,
+            asset_uri or "",
+            "svg" if wave_svg else "js",
+            self.diagram or "",
+        )
+
+    def needs_wavedrom_js(self, wave_svg: bool = False, skin: str = None) -> bool:
+        """
+        生成的 html 是否需要 wavedrom.min.js: 有 wave, 且不转换为 svg 或有不支持转换的 wave\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        return: bool => 是否需要
+        """
+        if not wave_svg:
+            return self.has_wavedrom
+        return any(
+            x["type"] == "WaveDrom" and not render_wave_svg(x["data"], skin)
+            for x in self.comment_items
+        )
+
+    def _get_wavedrom_vars(
+        self, assets: WavedromAssets, asset_uri: str = None, wave_svg: bool = False, skin: str = None
+    ) -> dict:
+        """
+        模板中 wavedrom 相关的变量: 有资源地址时引用, 否则内嵌脚本; 不需要脚本时都为空\n
+        assets: WavedromAssets => wavedrom 资源\n
+        asset_uri: str => 资源的引用地址, None 表示内嵌\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        return: dict => 模板变量
+        """
+        needs_js = self.needs_wavedrom_js(wave_svg, skin)
+        variables = {
+            "hasWavedrom": needs_js,
+            "wavedrom_js_src": "",
+            "wavedrom_theme_src": "",
+            "wavedrom_js_text": "",
+            "wavedrom_theme_text": "",
+        }
+        if not needs_js:
+            pass
+        elif asset_uri:
+            js_src, theme_src = assets.get_src(asset_uri)
+            variables.update(wavedrom_js_src=js_src, wavedrom_theme_src=theme_src)
+        else:
+            variables.update(wavedrom_js_text=assets.js_text, wavedrom_theme_text=assets.theme_text)
+        return variables
+
+    # ------------------------------------------------------------------------------
+    # 生成预览用的 html
+    # ------------------------------------------------------------------------------
+    def get_preview_html(
+        self,
+        template_fname: str,
+        skin: str = None,
+        asset_uri: str = None,
+        wave_svg: bool = False,
+    ) -> str:
+        """
+        生成预览用的 html (解析结果, 模板和资源都未变化时使用缓存的结果)\n
+        template_fname: str => preview template file\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        asset_uri: str => wavedrom 目录在 webview 中的资源地址, None 表示将脚本内嵌到页面中\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        return: str => html 文本
+        """
+        if not Path(template_fname).exists():
+            return ""
+        assets = get_wavedrom_assets(self.__pytools_dir, skin)
+        key = self._html_cache_key("preview", template_fname, assets, asset_uri, wave_svg)
+        return self._render_cached(
+            key,
+            lambda: self._get_preview_html(template_fname, assets, asset_uri, wave_svg, skin),
+        )
+
+    def _get_preview_html(
+        self,
+        template_fname: str,
+        assets: WavedromAssets,
+        asset_uri: str = None,
+        wave_svg: bool = False,
+        skin: str = None,
+    ) -> str:
+        """
+        生成预览用的 html
+        template_fname: str => preview template file\n
+        assets: WavedromAssets => wavedrom 资源\n
+        asset_uri: str => 资源的引用地址, None 表示内嵌\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        return: str => html 文本
+        """
+        # -------- 整理数据 --------
+        wavedrom_vars = self._get_wavedrom_vars(assets, asset_uri, wave_svg, skin)
+        sections = self.get_preview_sections(template_fname, skin, wave_svg)
+        # -------- 替换模板 --------
+        with self.metrics.phase("template render"):
+            tmpl = get_template(template_fname)
+            text = tmpl.render(
+                **wavedrom_vars,
+                module_name=self.module_name,
+                sections=sections,
+            )
+        # -------- 返回数据 --------
+        return text
+
+    # ------------------------------------------------------------------------------
+    # 预览页面的各部分 (局部更新)
+    # ------------------------------------------------------------------------------
+    def get_preview_sections(
+        self, template_fname: str, skin: str = None, wave_svg: bool = False
+    ) -> list[dict]:
+        """
+        生成预览页面的各部分: module (框图), parameters, ports, notes 标题和每个注释条目\n
+        每部分的 id 由其 html 的 hash 生成, 内容不变时 id 不变\n
+        template_fname: str => preview template file (其中的宏 render_section 生成各部分的 html)\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        return: list[dict] =>\n
+            id: str => 该部分的 id,\n
+            html: str => 该部分的 html
+        """
+        assets = get_wavedrom_assets(self.__pytools_dir, skin)
+        key = self._html_cache_key("preview sections", template_fname, assets, None, wave_svg)
+        return self._render_cached(
+            key, lambda: self._get_preview_sections(template_fname, wave_svg, skin)
+        )
+
+    def _get_preview_sections(
+        self, template_fname: str, wave_svg: bool = False, skin: str = None
+    ) -> list[dict]:
+        """
+        生成预览页面的各部分\n
+        template_fname: str => preview template file\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        return: list[dict] => 各部分的 id 和 html
+        """
+        # -------- 生成框图 --------
+        with self.metrics.phase("svg diagram"):
+            module_diagram = self._get_module_bd()
+        # -------- 由模板中的宏生成各部分 --------
+        with self.metrics.phase("template render"):
+            render_section = get_template(template_fname).module.render_section
+            parts = [render_section("module", {"name": self.module_name, "diagram": module_diagram})]
+            if self.module_parameters:
+                parts.append(render_section("parameters", self.module_parameters))
+            if self.module_ports:
+                parts.append(render_section("ports", self.module_ports))
+            parts.append(render_section("notes", None))
+        parts = [(str(html), hash_text(html)) for html in parts]
+        # -------- 注释条目: 增量解析时未变化的条目 (同一对象) 复用上次的 html --------
+        with self.metrics.phase("notes html"):
+            old_key, old_notes = self.__note_cache
+            old_notes = old_notes if old_key == (wave_svg, skin) else {}
+            notes = {}
+            for item in self.comment_items:
+                cached = old_notes.get(id(item))
+                if cached is None or cached[0] is not item:
+                    html = self._get_note_html(item, wave_svg, skin)
+                    cached = (item, html, hash_text(html))
+                notes[id(item)] = cached
+                parts.append(cached[1:])
+            self.__note_cache = ((wave_svg, skin), notes)
+        # -------- 由内容生成 id, 内容相同的部分依次加上序号 --------
+        sections = []
+        seen = {}
+        for html, digest in parts:
+            sid = f"s{digest[:12]}"
+            if n := seen.get(sid, 0):
+                seen[sid] = n + 1
+                sid = f"{sid}-{n}"
+            else:
+                seen[sid] = 1
+            sections.append({"id": sid, "html": html})
+        return sections
+
+    def get_preview_update(
+        self,
+        template_fname: str,
+        skin: str = None,
+        asset_uri: str = None,
+        wave_svg: bool = False,
+        shown: dict = None,
+    ) -> tuple:
+        """
+        生成预览的更新: 页面 (模板, 资源, 是否需要 wavedrom.min.js, module 名) 与上次显示的相同时,\n
+        只返回各部分的 id 和新增的部分, 由预览页面在原处替换; 否则返回完整的 html\n
+        template_fname: str => preview template file\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        asset_uri: str => wavedrom 目录在 webview 中的资源地址, None 表示将脚本内嵌到页面中\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        shown: dict => 上次显示的预览 (本函数返回的 state), None 表示返回完整的 html\n
+        return: tuple => (update, state)\n
+            update: str 或 dict => 完整的 html, 或者\n
+                ids: list[str] => 各部分的 id (按顺序),\n
+                sections: dict => 新增的部分, id -> html\n
+            state: dict => 本次显示的预览, 下次调用时作为 shown
+        """
+        if not Path(template_fname).exists():
+            return "", None
+        assets = get_wavedrom_assets(self.__pytools_dir, skin)
+        page = hash_text(
+            code_version(),
+            hash_file(template_fname),
+            assets.version,
+            asset_uri or "",
+            "svg" if wave_svg else "js",
+            str(self.needs_wavedrom_js(wave_svg, skin)),
+            self.module_name,
+        )
+        sections = self.get_preview_sections(template_fname, skin, wave_svg)
+        state = {"page": page, "ids": [x["id"] for x in sections]}
+        if shown is None or shown["page"] != page:
+            return self.get_preview_html(template_fname, skin, asset_uri, wave_svg), state
+        known = set(shown["ids"])
+        update = {
+            "ids": state["ids"],
+            "sections": {x["id"]: x["html"] for x in sections if x["id"] not in known},
+        }
+        return update, state
+
+    # ------------------------------------------------------------------------------
+    # 生成导出用的 html
+    # ------------------------------------------------------------------------------
+    def get_export_html(self, template_fname: str, skin: str = None, wave_svg: bool = False) -> str:
+        """
+        生成导出用的 html (解析结果, 模板和资源都未变化时使用缓存的结果)\n
+        template_fname: str => export template file\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        return: str => html 文本
+        """
+        if not Path(template_fname).exists():
+            return ""
+        assets = get_wavedrom_assets(self.__pytools_dir, skin)
+        key = self._html_cache_key("export", template_fname, assets, None, wave_svg)
+        return self._render_cached(
+            key, lambda: self._get_export_html(template_fname, assets, wave_svg, skin)
+        )
+
+    def _get_export_html(
+        self, template_fname: str, assets: WavedromAssets, wave_svg: bool = False, skin: str = None
+    ) -> str:
+        """
+        生成导出用的 html (wavedrom 的脚本内嵌到页面中, 导出的文件可以单独打开)\n
+        template_fname: str => export template file\n
+        assets: WavedromAssets => wavedrom 资源\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        return: str => html 文本
+        """
+        # -------- 初始化变量 --------
+        tmplt_path = Path(template_fname)
+        # -------- 整理数据 --------
+        parameters = self.module_parameters
+        ports = self.module_ports
+        wavedrom_vars = self._get_wavedrom_vars(assets, None, wave_svg, skin)
+        # -------- 生成框图和注释 --------
+        with self.metrics.phase("svg diagram"):
+            module_diagram = self._get_module_bd()
+        with self.metrics.phase("notes html"):
+            notes_html = self._get_notes_html(wave_svg, skin)
+        # -------- 替换模板 --------
+        with self.metrics.phase("template render"):
+            tmpl = get_template(tmplt_path)
+            text = tmpl.render(
+                **wavedrom_vars,
+                module_name=self.module_name,
+                module_diagram=module_diagram,
+                parameters=parameters,
+                hasParameters=len(parameters) > 0,
+                ports=ports,
+                hasPorts=len(ports) > 0,
+                notes_html=notes_html,
+            )
+        # -------- 返回数据 --------
+        return text
+
+    # ------------------------------------------------------------------------------
+    # 生成静态站点中的页面
+    # ------------------------------------------------------------------------------
+    def get_site_html(
+        self,
+        template_fname: str,
+        asset_dir: str,
+        index_href: str,
+        linker=None,
+        skin: str = None,
+        wave_svg: bool = False,
+    ) -> str:
+        """
+        生成静态站点中的页面, wavedrom 资源引用站点中共享的文件, 不再内嵌到页面中\n
+        template_fname: str => export template file\n
+        asset_dir: str => 共享资源的目录 (相对于页面)\n
+        index_href: str => 首页的链接 (相对于页面)\n
+        linker: Callable[[str], str] => 为文本中出现的其他 module 添加链接, None 表示不添加\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg\n
+        return: str => html 文本
+        """
+        # -------- 初始化变量 --------
+        tmplt_path = Path(template_fname)
+        if not tmplt_path.exists():
+            return ""
+        linker = linker or (lambda text: text)
+        assets = get_wavedrom_assets(self.__pytools_dir, skin)
+        # -------- 整理数据 --------
+        parameters = [dict(x, description=linker(x["description"])) for x in self.module_parameters]
+        ports = [dict(x, description=linker(x["description"])) for x in self.module_ports]
+        # -------- 生成框图和注释 --------
+        with self.metrics.phase("svg diagram"):
+            module_diagram = self._get_module_bd()
+        with self.metrics.phase("notes html"):
+            notes_html = linker(self._get_notes_html(wave_svg, skin))
+        # -------- 替换模板 --------
+        with self.metrics.phase("template render"):
+            tmpl = get_template(tmplt_path)
+            text = tmpl.render(
+                **self._get_wavedrom_vars(assets, asset_dir, wave_svg, skin),
+                index_href=index_href,
+                module_name=self.module_name,
+                module_diagram=module_diagram,
+                parameters=parameters,
+                hasParameters=len(parameters) > 0,
+                ports=ports,
+                hasPorts=len(ports) > 0,
+                notes_html=notes_html,
+            )
+        # -------- 返回数据 --------
+        return text
@@ -0,0 +1,301 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     解析 ANSI 风格的 module 声明 (递归下降), 替代原来的正则表达式
+# *         module name [#(parameter 声明, ...)] [(port 声明, ...)] ;
+# *     由 token 驱动: 每个 token 只读取一次, 不回溯, 耗时与声明的长度成正比
+# *         未闭合的声明 (没有 ";" 就遇到下一个 module) 或畸形的条目不会导致长时间的回溯
+# *     输入为删除了注释和 attribute 的代码 (替换为等长的空白, 偏移不变), 字符串作为一个 token
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import re
+
+from .util_code import shorten_spaces
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+# -------- token --------
+# 各分支都不会回溯: 标识符 (含转义标识符), 字符串, 数值/系统函数等, 其他单个符号
+re_header_token = re.compile(
+    r"[a-zA-Z_][\w$]*|\\\S+|"  # 标识符和关键字
+    r'"(?:\\.|[^"\\\n])*"?|'  # 字符串 (未闭合的字符串到行尾为止)
+    r"[\w$'.]+|"  # 数值 (8'hff, 1.5), 系统函数 ($clog2) 等
+    r"\S"  # 其他符号
+)
+re_module_keyword = re.compile(r"\bmodule\b")
+# -------- 关键字 --------
+DIRECTIONS = {"input", "output", "inout"}
+PARAM_KEYWORDS = {"parameter", "localparam"}
+# port 的类型 (net_type, reg 和常用的 variable 类型)
+PORT_TYPES = {
+    "wire", "wand", "wor", "tri", "tri0", "tri1", "triand", "trior", "trireg",
+    "uwire", "supply0", "supply1", "reg", "logic", "integer", "time",
+}
+SIGNING = {"signed", "unsigned"}
+KEYWORDS = DIRECTIONS | PARAM_KEYWORDS | PORT_TYPES | SIGNING | {"module", "endmodule", "real", "realtime"}
+ID_START = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_\\")  # 标识符的首字符
+BRACKETS = {"(": 1, "[": 1, "{": 1, ")": -1, "]": -1, "}": -1}  # 括号 -> 层级的变化
+DECLARATION_ENDS = {";", "module", "endmodule"}  # 声明的结尾 (或声明没有以 ";" 结尾)
+# parameter_declaration ::= parameter [ signed ] [ range ] list_of_param_assignments
+#                         | parameter integer | real | realtime | time list_of_param_assignments
+# inout_declaration ::= inout [ net_type ] [ signed ] [ range ] list_of_port_identifiers
+# input_declaration ::= input [ net_type ] [ signed ] [ range ] list_of_port_identifiers
+# output_declaration ::= output [ net_type ] [ signed ] [ range ] list_of_port_identifiers
+#                      | output reg [ signed ] [ range ] list_of_variable_port_identifiers
+#                      | output output_variable_type list_of_variable_port_identifiers
+
+
+# %% ---------------------------------------------------------------------------
+# 查找 module 关键字
+# ------------------------------------------------------------------------------
+def find_module_keyword(code_stub: str, pos: int) -> int:
+    """
+    查找 module 关键字\n
+    code_stub: str => 删除了所有注释和 attribute 的代码\n
+    pos: int => 起始偏移\n
+    return: int => module 关键字的偏移, 没有时为 -1
+    """
+    m = re_module_keyword.search(code_stub, pos)
+    return m.start() if m else -1
+
+
+# %% ---------------------------------------------------------------------------
+# VerilogHeaderParser
+# ------------------------------------------------------------------------------
+class VerilogHeaderParser:
+    """
+    解析一个 module 声明, 只向前读取 token, 不回溯
+    """
+
+    def __init__(self, code_stub: str, pos: int) -> None:
+        """
+        code_stub: str => 删除了所有注释和 attribute 的代码\n
+        pos: int => module 关键字的偏移
+        """
+        self.code = code_stub
+        self.__tokens = re_header_token.finditer(code_stub, pos)
+        self.tok = None  # 当前的 token (re.Match), None 表示代码结尾
+        self.text = ""  # 当前的 token 的文本
+        self._advance()
+
+    def _advance(self) -> None:
+        self.tok = next(self.__tokens, None)
+        self.text = self.tok.group() if self.tok else ""
+
+    def _at_stop(self) -> bool:
+        """
+        是否到达声明之外: 代码结尾, 下一个 module 或 endmodule (声明没有以 ";" 结尾)
+        """
+        return self.tok is None or self.text in DECLARATION_ENDS and self.text != ";"
+
+    # ------------------------------------------------------------------------------
+    # module 声明
+    # ------------------------------------------------------------------------------
+    def parse(self) -> tuple[dict, int]:
+        """
+        解析 module 声明\n
+        return: tuple[dict, int] => (name, parameters, ports, 声明不完整时为 None;
+            声明之后 (";" 之后) 的偏移, 声明不完整时为停止解析处的偏移)\n
+        parameter 条目: dict(name, type, value, offset: 名称的偏移)\n
+        port 条目: dict(name, direction, type, offset: 名称的偏移)
+        """
+        self._advance()  # module
+        if self.tok is None or self.text[0] not in ID_START or self.text in KEYWORDS:
+            return None, self._stop_offset()
+        header = {"name": self.text, "parameters": [], "ports": []}
+        self._advance()
+        parsed_ports = False
+        while not self._at_stop():
+            if self.text == ";":
+                return header, self.tok.end()
+            if self.text == "#":
+                self._advance()
+                if self.text == "(":
+                    self._advance()
+                    header["parameters"] = self._parse_list(self._parse_param_item)
+            elif self.text == "(" and not parsed_ports:
+                self._advance()
+                header["ports"] = self._parse_list(self._parse_port_item)
+                parsed_ports = True
+            else:
+                self._advance()
+        return None, self._stop_offset()
+
+    def _stop_offset(self) -> int:
+        return self.tok.start() if self.tok else len(self.code)
+
+    # ------------------------------------------------------------------------------
+    # 列表: 逗号分隔的条目, 到 ")" 为止
+    # ------------------------------------------------------------------------------
+    def _parse_list(self, parse_item) -> list[dict]:
+        """
+        解析逗号分隔的声明列表, 当前 token 为 "(" 之后的第一个 token\n
+        parse_item: Callable[[list[re.Match], list[str], dict], dict] => 解析一个条目, 参数为条目的 token,
+            token 的文本和上一个条目\n
+        return: list[dict] => 条目的列表 (不能解析的条目被跳过)
+        """
+        items = []
+        prev = None
+        while True:
+            tokens, texts = self._read_item()
+            if tokens and (item := parse_item(tokens, texts, prev)) is not None:
+                if item is False:  # 不是 ANSI 风格的列表, 跳过其余的条目
+                    while self._read_item()[0] is not None and self.text == ",":
+                        self._advance()
+                    items = []
+                else:
+                    items.append(item)
+                    prev = item
+            if tokens is None or self.text != ",":
+                break
+            self._advance()
+        if self.text == ")":
+            self._advance()
+        return items
+
+    def _read_item(self) -> tuple[list[re.Match], list[str]]:
+        """
+        读取一个条目的 token, 到同一层级的 "," 或 ")" 为止 (不读取该 token)\n
+        return: tuple[list[re.Match], list[str]] => token 和 token 的文本,
+            声明在条目中结束 (";", 代码结尾, 下一个 module) 时为 (None, None)
+        """
+        # 每个 token 都经过这里, 使用局部变量, 不调用其他方法
+        tokens = []
+        texts = []
+        depth = 0
+        tok, text = self.tok, self.text
+        next_token = self.__tokens.__next__
+        while tok is not None:
+            if text in BRACKETS:
+                if depth == 0 and text == ")":
+                    break
+                depth = max(depth + BRACKETS[text], 0)
+            elif text in DECLARATION_ENDS:
+                tokens = texts = None
+                break
+            elif depth == 0 and text == ",":
+                break
+            tokens.append(tok)
+            texts.append(text)
+            try:
+                tok = next_token()
+                text = tok.group()
+            except StopIteration:
+                tok, text = None, ""
+        if tok is None:
+            tokens = texts = None
+        self.tok, self.text = tok, text
+        return tokens, texts
+
+    # ------------------------------------------------------------------------------
+    # 条目
+    # ------------------------------------------------------------------------------
+    def _split_item(self, tokens: list[re.Match], texts: list[str]) -> tuple[list[re.Match], list[str], str, re.Match]:
+        """
+        在同一层级的 "=" 处分开条目, 并找出名称 (同一层级的最后一个标识符)\n
+        tokens: list[re.Match] => 条目的 token\n
+        texts: list[str] => token 的文本\n
+        return: tuple => (名称之前的 token, 名称之前的 token 的文本, 值的文本 (没有 "=" 时为 None),
+            名称的 token (没有时为 None))
+        """
+        depth = 0
+        eq = len(texts)
+        name_idx = None
+        for k, text in enumerate(texts):
+            if text in BRACKETS:
+                depth = max(depth + BRACKETS[text], 0)
+            elif depth == 0:
+                if text == "=":
+                    eq = k
+                    break
+                if text[0] in ID_START and text not in KEYWORDS:
+                    name_idx = k
+        value = None
+        if eq + 1 < len(tokens):
+            value = self.code[tokens[eq + 1].start() : tokens[-1].end()]
+        if name_idx is None:
+            return tokens[:eq], texts[:eq], value, None
+        return tokens[:name_idx], texts[:name_idx], value, tokens[name_idx]
+
+    def _raw_text(self, tokens: list[re.Match]) -> str:
+        """
+        token 在代码中的原文 (连续的空白缩短为一个空格)
+        """
+        if not tokens:
+            return ""
+        if len(tokens) == 1:
+            return tokens[0].group()
+        return shorten_spaces(self.code[tokens[0].start() : tokens[-1].end()])
+
+    def _parse_param_item(self, tokens: list[re.Match], texts: list[str], prev: dict) -> dict:
+        """
+        解析一个 parameter 条目: [parameter] [type] name [= value]\n
+        没有 parameter 关键字时 (parameter A = 1, B = 2) 与上一个条目的类型相同\n
+        return: dict => parameter 条目, 不能解析时为 None
+        """
+        has_keyword = texts[0] in PARAM_KEYWORDS
+        if has_keyword:
+            tokens, texts = tokens[1:], texts[1:]
+        type_tokens, type_texts, value, name = self._split_item(tokens, texts)
+        if name is None:
+            return None
+        if has_keyword or prev is None or type_tokens:
+            p_type = self._raw_text(type_tokens)
+        else:
+            p_type = prev["type"]
+        return {"name": name.group(), "type": p_type, "value": value, "offset": name.start()}
+
+    def _parse_port_item(self, tokens: list[re.Match], texts: list[str], prev: dict) -> dict:
+        """
+        解析一个 port 条目: [direction] [net_type] [signed] [range] name [= value]\n
+        没有方向时 (input a, b) 与上一个条目的方向和类型相同\n
+        return: dict => port 条目, 不能解析时为 None, 不是 ANSI 风格 (第一个条目没有方向) 时为 False
+        """
+        direction = texts[0]
+        has_direction = direction in DIRECTIONS
+        if has_direction:
+            tokens, texts = tokens[1:], texts[1:]
+        elif prev is None:
+            return False
+        else:
+            direction = prev["direction"]
+        type_tokens, type_texts, value, name = self._split_item(tokens, texts)
+        if name is None:
+            return None
+        if has_direction or type_tokens:
+            p_type = self._format_port_type(type_tokens, type_texts)
+        else:
+            p_type = prev["type"]
+        return {"name": name.group(), "direction": direction, "type": p_type, "offset": name.start()}
+
+    def _format_port_type(self, type_tokens: list[re.Match], texts: list[str]) -> str:
+        """
+        格式化 port 的类型: [net_type] [signed] [range], 没有 net_type 时为 (wire)\n
+        其他写法 (例如 interface) 使用原文\n
+        type_tokens: list[re.Match] => 名称之前的 token\n
+        texts: list[str] => token 的文本\n
+        return: str => 类型
+        """
+        k = 0
+        p_type = "(wire)"
+        if k < len(texts) and texts[k] in PORT_TYPES:
+            p_type = texts[k]
+            k += 1
+        if k < len(texts) and texts[k] in SIGNING:
+            p_type += f" {texts[k]}"
+            k += 1
+        if k < len(texts):
+            if texts[k] != "[" or texts[-1] != "]":
+                return self._raw_text(type_tokens)
+            p_type += f" {self._raw_text(type_tokens[k:])}"
+        return p_type
@@ -0,0 +1,151 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     只扫描 module 声明: 内存映射 verilog 文件, 在字节上按需扫描, 不读取整个文件
+# *         找到 module 关键字后, 扫描到声明结尾的 ";" 为止, 只解码这一段代码
+# *         跳过注释, 字符串和 attribute 的规则与 VerilogLexer 一致
+# *     用于超大的文件 (例如门级网表) 的例化和 testbench, 内存占用与文件大小无关
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import mmap
+import re
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+# 代码以外的部分 (与 VerilogLexer.re_token_split 相同), 之后是需要查找的关键字
+_SKIP = (
+    rb'"(?:\\.|[^"\\\n])*"?|'  # 字符串 (未闭合的字符串到行尾为止)
+    rb"//[^\n]*|"  # 行注释
+    rb"/\*.*?(?:\*/|\Z)|"  # 块注释
+    rb"\(\*(?!\s*\)).*?(?:\*\)|\Z)|"  # attribute, 排除 @(*)
+)
+re_scan_module = re.compile(_SKIP + rb"\bmodule\b", re.S)  # module 之外: 查找 module
+re_scan_header = re.compile(_SKIP + rb";", re.S)  # module 声明中: 查找 ";"
+# module 之中: 每次匹配跳过最多 SKIP_REPEAT 段, 到 endmodule 之前为止 (网表中有大量 attribute, 不在 python 中逐个跳过)
+# 重复次数有上限: 不使用 python 3.11 的占有量词时, 正则引擎为每次重复保存回溯状态, 无上限时内存随文件大小增长
+SKIP_REPEAT = 1024
+re_skip_body = re.compile(
+    rb"(?:[^\"/(e]+|" + _SKIP + rb"(?!\bendmodule\b)[/(e]){0,%d}" % SKIP_REPEAT, re.S
+)
+UTF8_CONTINUATION = bytes(range(0x80, 0xC0))  # utf-8 多字节字符的后续字节, 不计入字符数
+CHUNK_SIZE = 1 << 20  # 计算字符偏移时每次处理的字节数
+
+
+# %% ---------------------------------------------------------------------------
+# VerilogHeaderScanner
+# ------------------------------------------------------------------------------
+class VerilogHeaderScanner:
+    """
+    内存映射 verilog 文件, 逐个找出 module 声明的代码片段\n
+    偏移均为字符偏移, 与按文本模式读取 (utf-8, 换行符转换为 "\\n") 的代码一致
+    """
+
+    def __init__(self, file: str) -> None:
+        """
+        file: str => verilog 文件路径
+        """
+        self.file = file
+        self.__fp = open(file, "rb")
+        try:
+            self.__mm = mmap.mmap(self.__fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空文件不能映射
+            self.__mm = b""
+        if hasattr(self.__mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self.__mm.madvise(mmap.MADV_SEQUENTIAL)
+        # 字节偏移 -> 字符偏移的换算进度 (偏移只会递增, 每个字节只统计一次)
+        self.__byte_pos = 0
+        self.__char_pos = 0
+        self.__last_cr = False
+
+    # -------- 关闭 --------
+    def close(self) -> None:
+        if isinstance(self.__mm, mmap.mmap):
+            self.__mm.close()
+        self.__fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------------------
+    # 逐个找出 module 声明
+    # ------------------------------------------------------------------------------
+    def iter_headers(self):
+        """
+        逐个找出 module 声明, 停止迭代时不再扫描文件的其余部分\n
+        yield: tuple[int, str, Callable[[], int]] => (module 关键字的偏移, 从 module 关键字到声明结尾
+            所在行的行尾的代码, 查找 endmodule 的函数: 返回 endmodule 之后的偏移, 没有时为代码结尾)\n
+        继续迭代时从 endmodule 之后开始查找下一个 module
+        """
+        mm = self.__mm
+        pos = 0
+        while m_module := self._search(re_scan_module, pos):
+            # -------- module 声明: 到 ";" 为止 (字符串中的 ";" 也视为结尾) --------
+            m_stop = self._search(re_scan_header, m_module.end(), b";")
+            stop = m_stop.end() if m_stop else len(mm)
+            eol = mm.find(b"\n", stop)
+            eol = len(mm) if eol < 0 else eol + 1
+            text = mm[m_module.start() : eol].decode("utf-8")
+            offset = self._char_offset(m_module.start())
+            # -------- endmodule: 需要时才查找, 结果复用 --------
+            end = []
+
+            def find_end() -> int:
+                if not end:
+                    end_pos = stop
+                    while (skip_end := re_skip_body.match(mm, end_pos).end()) > end_pos:
+                        end_pos = skip_end
+                    if end_pos < len(mm):
+                        end_pos += len(b"endmodule")
+                    end.append((end_pos, self._char_offset(end_pos)))
+                return end[0][1]
+
+            yield offset, text.replace("\r\n", "\n").replace("\r", "\n"), find_end
+            find_end()
+            pos = end[0][0]
+
+    def _search(self, re_scan: re.Pattern, pos: int, stop_char: bytes = None) -> re.Match:
+        """
+        跳过注释, 字符串和 attribute, 查找关键字\n
+        re_scan: re.Pattern => re_scan_module 或 re_scan_header\n
+        pos: int => 起始的字节偏移\n
+        stop_char: bytes => 字符串中包含该字符时也视为找到 (返回该字符串的匹配结果)\n
+        return: re.Match => 关键字的匹配结果, 没有找到时为 None
+        """
+        while m := re_scan.search(self.__mm, pos):
+            token = m.group()
+            if token[:1] not in b'"/(':
+                return m
+            if stop_char and token[:1] == b'"' and stop_char in token:
+                return m
+            pos = m.end()
+        return None
+
+    def _char_offset(self, pos: int) -> int:
+        """
+        将字节偏移换算为字符偏移 (pos 不能小于上次换算的偏移)\n
+        pos: int => 字节偏移\n
+        return: int => 字符偏移
+        """
+        mm = self.__mm
+        while self.__byte_pos < pos:
+            chunk = mm[self.__byte_pos : min(pos, self.__byte_pos + CHUNK_SIZE)]
+            n = len(chunk.translate(None, UTF8_CONTINUATION)) - chunk.count(b"\r\n")
+            if self.__last_cr and chunk[:1] == b"\n":
+                n -= 1
+            self.__last_cr = chunk[-1:] == b"\r"
+            self.__byte_pos += len(chunk)
+            self.__char_pos += n
+        return self.__char_pos
@@ -0,0 +1,406 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     工程中所有 verilog 文件的 module 索引, 保存在 sqlite 中
+# *     以 (路径, mtime, size) 判断文件是否变化, 以内容的 hash 判断是否需要重新解析
+# *         预处理的配置 (宏定义, include 目录) 或 include 的文件变化时, 内容未变化的文件也重新解析
+# *     同时记录 module 内部的例化 (parent -> child), 组成整个工程的层次结构
+# *         例化按文件保存, 文件变化时只替换该文件的例化, 层次结构在查询时由例化组成
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .VerilogParser import VerilogParser
+from .VerilogPreprocessor import deps_unchanged, get_preprocessor, set_preprocessor
+from .util_cache import hash_bytes
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+VERILOG_SUFFIXES = (".v", ".sv")  # 需要索引的文件类型
+PARALLEL_THRESHOLD = 64  # 需要解析的文件数超过该值时, 使用多进程解析
+DB_VERSION = 3  # 数据库的版本, 与已有的数据库不同时重建索引 (2: 增加 instances, 3: 增加 fingerprint, deps)
+DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    deps TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS modules (
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS modules_name ON modules (name);
+CREATE INDEX IF NOT EXISTS modules_path ON modules (path);
+CREATE TABLE IF NOT EXISTS instances (
+    parent TEXT NOT NULL,
+    child TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS instances_parent ON instances (parent);
+CREATE INDEX IF NOT EXISTS instances_child ON instances (child);
+CREATE INDEX IF NOT EXISTS instances_path ON instances (path);
+"""
+DB_DROP = """
+DROP TABLE IF EXISTS files;
+DROP TABLE IF EXISTS modules;
+DROP TABLE IF EXISTS instances;
+"""
+
+
+# %% ---------------------------------------------------------------------------
+# 工具函数
+# ------------------------------------------------------------------------------
+def iter_verilog_files(root: str):
+    """
+    遍历目录下所有的 verilog 文件 (跳过以 "." 开头的目录)\n
+    root: str => 目录\n
+    yield: os.DirEntry => 文件
+    """
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            stack.append(entry.path)
+                    elif entry.name.endswith(VERILOG_SUFFIXES):
+                        yield entry
+        except OSError:
+            continue
+
+
+def parse_file(path: str, old_hash: str = None) -> tuple:
+    """
+    读取并解析一个文件 (可在子进程中执行)\n
+    path: str => 文件路径\n
+    old_hash: str => 索引中记录的 hash, 内容未变化时不再解析\n
+    return: tuple => (路径, hash, module 列表 (包含 instances), include 的文件);
+        内容未变化时 module 列表和 include 的文件为 None; 文件不存在时 hash 为 None
+    """
+    try:
+        with open(path, "rb") as fp:
+            data = fp.read()
+    except FileNotFoundError:
+        return path, None, None, None
+    new_hash = hash_bytes(data)
+    if new_hash == old_hash:
+        return path, new_hash, None, None
+    code = data.decode("utf-8", errors="replace")
+    parser = VerilogParser(path, code)
+    modules = parser.parse_instances()
+    return path, new_hash, modules, parser.deps
+
+
+# %% ---------------------------------------------------------------------------
+# VerilogIndexer
+# ------------------------------------------------------------------------------
+class VerilogIndexer:
+    """
+    工程中所有 verilog 文件的 module 索引 (name, parameters, ports, descriptions, 文件, 偏移)
+    """
+
+    def __init__(self, db_file: str) -> None:
+        """
+        db_file: str => sqlite 数据库文件路径, 不存在时自动创建
+        """
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(db_file)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != DB_VERSION:
+            self.db.executescript(DB_DROP)
+            self.db.execute(f"PRAGMA user_version={DB_VERSION}")
+        self.db.executescript(DB_SCHEMA)
+
+    # ------------------------------------------------------------------------------
+    # 更新索引
+    # ------------------------------------------------------------------------------
+    def update(self, root: str, jobs: int = None) -> dict:
+        """
+        遍历目录, 只重新解析新增或变化的文件, 删除已不存在的文件的索引\n
+        root: str => 工程目录\n
+        jobs: int => 解析文件的进程数, None 表示 CPU 核数, 1 表示不使用多进程\n
+        return: dict => 统计信息 (scanned, parsed, unchanged, removed)
+        """
+        root = str(Path(root).absolute())
+        prefix = os.path.join(root, "")
+        # -------- 读取已有的索引 --------
+        known = {
+            path: row
+            for path, *row in self.db.execute(
+                "SELECT path, mtime_ns, size, hash, fingerprint, deps FROM files WHERE path >= ? AND path < ?",
+                (prefix, prefix + "\uffff"),
+            )
+        }
+        # -------- 根据 mtime 和 size (及预处理的配置, include 的文件) 找出变化的文件 --------
+        stats = {"scanned": 0, "parsed": 0, "unchanged": 0, "removed": 0}
+        changed = []  # (path, mtime_ns, size, old_hash)
+        seen = set()
+        fingerprint = get_preprocessor().fingerprint
+        for entry in iter_verilog_files(root):
+            st = entry.stat()
+            seen.add(entry.path)
+            stats["scanned"] += 1
+            if (item := self._check_file(entry.path, st, known.get(entry.path), fingerprint)) is None:
+                stats["unchanged"] += 1
+            else:
+                changed.append(item)
+        removed = [path for path in known if path not in seen]
+        # -------- 解析变化的文件 --------
+        results = self._parse_files(changed, jobs)
+        # -------- 写入数据库 --------
+        self._write(changed, results, removed, stats)
+        stats["removed"] = len(removed)
+        return stats
+
+    def update_files(self, paths: list[str]) -> dict:
+        """
+        只更新指定的文件 (例如保存后的文件), 不遍历目录; 已不存在的文件从索引中删除\n
+        paths: list[str] => 文件路径\n
+        return: dict => 统计信息 (scanned, parsed, unchanged, removed)
+        """
+        stats = {"scanned": 0, "parsed": 0, "unchanged": 0, "removed": 0}
+        changed = []
+        removed = []
+        fingerprint = get_preprocessor().fingerprint
+        for path in dict.fromkeys(str(Path(x).absolute()) for x in paths):
+            row = self.db.execute(
+                "SELECT mtime_ns, size, hash, fingerprint, deps FROM files WHERE path = ?", (path,)
+            ).fetchone()
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                if row:
+                    removed.append(path)
+                continue
+            stats["scanned"] += 1
+            if (item := self._check_file(path, st, row, fingerprint)) is None:
+                stats["unchanged"] += 1
+            else:
+                changed.append(item)
+        self._write(changed, self._parse_files(changed, 1), removed, stats)
+        stats["removed"] = len(removed)
+        return stats
+
+    @staticmethod
+    def _check_file(path: str, st: os.stat_result, row: tuple, fingerprint: str) -> tuple:
+        """
+        判断文件是否需要重新解析\n
+        path: str => 文件路径\n
+        st: os.stat_result => 文件的状态\n
+        row: tuple => 索引中的记录 (mtime_ns, size, hash, fingerprint, deps), 没有记录时为 None\n
+        fingerprint: str => 当前的预处理配置的 fingerprint\n
+        return: tuple => (path, mtime_ns, size, old_hash), 不需要重新解析时为 None;
+            预处理的配置或 include 的文件变化时 old_hash 为 None (内容未变化也要重新解析)
+        """
+        old_hash = None
+        if row is not None and row[3] == fingerprint and deps_unchanged(json.loads(row[4])):
+            if row[0] == st.st_mtime_ns and row[1] == st.st_size:
+                return None
+            old_hash = row[2]
+        return path, st.st_mtime_ns, st.st_size, old_hash
+
+    def _parse_files(self, changed: list[tuple], jobs: int = None) -> list[tuple]:
+        """
+        解析变化的文件\n
+        changed: list[tuple] => (path, mtime_ns, size, old_hash) 的列表\n
+        jobs: int => 解析文件的进程数, None 表示 CPU 核数, 1 表示不使用多进程\n
+        return: list[tuple] => parse_file 的结果
+        """
+        paths = [x[0] for x in changed]
+        old_hashes = [x[3] for x in changed]
+        if len(changed) > PARALLEL_THRESHOLD and jobs != 1:
+            # 子进程中使用相同的预处理配置
+            preprocessor = get_preprocessor()
+            with ProcessPoolExecutor(
+                jobs, initializer=set_preprocessor, initargs=(preprocessor.defines, preprocessor.include_dirs)
+            ) as pool:
+                return list(pool.map(parse_file, paths, old_hashes, chunksize=16))
+        return list(map(parse_file, paths, old_hashes))
+
+    def _write(self, changed: list[tuple], results: list[tuple], removed: list[str], stats: dict) -> None:
+        """
+        写入解析结果, 删除已不存在的文件的索引 (module 和例化)\n
+        changed: list[tuple] => (path, mtime_ns, size, old_hash) 的列表\n
+        results: list[tuple] => parse_file 的结果, 与 changed 一一对应\n
+        removed: list[str] => 已不存在的文件\n
+        stats: dict => 统计信息, 更新 parsed 和 unchanged
+        """
+        fingerprint = get_preprocessor().fingerprint
+        with self.db:
+            for table in ("files", "modules", "instances"):
+                self.db.executemany(f"DELETE FROM {table} WHERE path = ?", ((x,) for x in removed))
+            for (path, mtime_ns, size, _), (_, new_hash, modules, deps) in zip(changed, results):
+                if new_hash is None:  # 遍历之后被删除
+                    for table in ("files", "modules", "instances"):
+                        self.db.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+                    continue
+                if modules is None:  # 只有 mtime 变化, 内容未变化 (预处理的配置和 include 的文件也未变化)
+                    self.db.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?", (mtime_ns, size, path)
+                    )
+                    stats["unchanged"] += 1
+                    continue
+                self.db.execute(
+                    "INSERT OR REPLACE INTO files (path, mtime_ns, size, hash, fingerprint, deps)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, mtime_ns, size, new_hash, fingerprint, json.dumps(deps)),
+                )
+                stats["parsed"] += 1
+                self.db.execute("DELETE FROM modules WHERE path = ?", (path,))
+                self.db.execute("DELETE FROM instances WHERE path = ?", (path,))
+                self.db.executemany(
+                    "INSERT INTO modules (name, path, offset, data) VALUES (?, ?, ?, ?)",
+                    (
+                        (
+                            m["name"],
+                            path,
+                            m["offset"],
+                            json.dumps({k: v for k, v in m.items() if k != "instances"}, ensure_ascii=False),
+                        )
+                        for m in modules
+                    ),
+                )
+                self.db.executemany(
+                    "INSERT INTO instances (parent, child, name, path, offset, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        (m["name"], x["module"], x["name"], path, x["offset"], json.dumps(x, ensure_ascii=False))
+                        for m in modules
+                        for x in m["instances"]
+                    ),
+                )
+
+    # ------------------------------------------------------------------------------
+    # 查询 module
+    # ------------------------------------------------------------------------------
+    def find(self, name: str) -> list[dict]:
+        """
+        按名称查询 module\n
+        name: str => module 的名称\n
+        return: list[dict] => module 的列表 (同名 module 可能位于多个文件中), 每项增加 path
+        """
+        modules = []
+        for path, data in self.db.execute(
+            "SELECT path, data FROM modules WHERE name = ? ORDER BY path", (name,)
+        ):
+            module = json.loads(data)
+            module["path"] = path
+            modules.append(module)
+        return modules
+
+    def names(self) -> list[str]:
+        """
+        return: list[str] => 索引中所有 module 的名称
+        """
+        return [x for (x,) in self.db.execute("SELECT DISTINCT name FROM modules ORDER BY name")]
+
+    # ------------------------------------------------------------------------------
+    # 层次结构
+    # ------------------------------------------------------------------------------
+    def instances(self, name: str) -> list[dict]:
+        """
+        查询 module 内部的例化\n
+        name: str => module 的名称\n
+        return: list[dict] => 例化的条目 (见 VerilogInstanceScanner.scan), 每项增加 parent, path
+        """
+        instances = []
+        for parent, path, data in self.db.execute(
+            "SELECT parent, path, data FROM instances WHERE parent = ? ORDER BY path, offset", (name,)
+        ):
+            instance = json.loads(data)
+            instance["parent"] = parent
+            instance["path"] = path
+            instances.append(instance)
+        return instances
+
+    def parents(self, name: str) -> list[dict]:
+        """
+        查询例化了 module 的位置\n
+        name: str => module 的名称\n
+        return: list[dict] => (parent: 所在的 module, name: 例化名, path, offset) 的列表
+        """
+        return [
+            {"parent": parent, "name": inst, "path": path, "offset": offset}
+            for parent, inst, path, offset in self.db.execute(
+                "SELECT parent, name, path, offset FROM instances WHERE child = ? ORDER BY parent, path, offset",
+                (name,),
+            )
+        ]
+
+    def tops(self) -> list[str]:
+        """
+        return: list[str] => 没有被例化的 module (层次结构的顶层) 的名称
+        """
+        return [
+            x
+            for (x,) in self.db.execute(
+                "SELECT DISTINCT name FROM modules WHERE name NOT IN (SELECT child FROM instances) ORDER BY name"
+            )
+        ]
+
+    def hierarchy(self, top: str = None, depth: int = None) -> list[dict]:
+        """
+        组成层次结构 (只读取一次例化的表, 同一 module 的子树只组成一次)\n
+        top: str => 顶层 module 的名称, None 表示所有没有被例化的 module\n
+        depth: int => 展开的最大层数, None 表示不限制\n
+        return: list[dict] => 顶层的节点, 每个节点为\n
+            module: str => module 的名称\n
+            instance: str => 例化名 (顶层为 None)\n
+            defined: bool => module 是否在索引中 (不在时为外部的 IP, 原语等)\n
+            recursive: bool => (只在为 True 时存在) module 例化了自身 (直接或间接), 不再展开\n
+            children: list[dict] => 例化的子节点, 超过 depth 时不展开 (为 None)
+        """
+        edges = {}
+        for parent, child, inst in self.db.execute("SELECT parent, child, name FROM instances ORDER BY path, offset"):
+            edges.setdefault(parent, []).append((child, inst))
+        defined = {x for (x,) in self.db.execute("SELECT DISTINCT name FROM modules")}
+        subtrees = {}  # (module, 剩余层数) -> 子节点
+        expanding = set()  # 正在展开的 module, 用于检测递归的例化
+
+        def expand(module, remaining):
+            if remaining == 0:
+                return None
+            key = (module, remaining)
+            if key not in subtrees:
+                expanding.add(module)
+                children = []
+                for child, inst in edges.get(module, []):
+                    node = {"module": child, "instance": inst, "defined": child in defined}
+                    if child in expanding:
+                        node["recursive"] = True
+                        node["children"] = []
+                    else:
+                        node["children"] = expand(child, None if remaining is None else remaining - 1)
+                    children.append(node)
+                expanding.discard(module)
+                subtrees[key] = children
+            return subtrees[key]
+
+        tops = [top] if top is not None else self.tops()
+        return [{"module": x, "instance": None, "defined": x in defined, "children": expand(x, depth)} for x in tops]
+
+    def close(self) -> None:
+        self.db.close()
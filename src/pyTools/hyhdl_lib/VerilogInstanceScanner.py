@@ -0,0 +1,254 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     找出 module 内部例化的 module (module 名, 例化名, parameter 的指定值, port 的连接)
+# *         module_name [#(.P(v), ...)] inst_name [range] (.port(signal), ...) [, inst_name2 (...)] ;
+# *     先用一次正则搜索定位 "标识符 标识符 (" 或 "标识符 #(" 形式的候选位置, 只在语句的开头处
+# *         从候选位置按 token 解析, 其余的代码 (assign, always 等) 不逐个 token 处理
+# *     候选位置在反转的代码中搜索: 正则以 "(" 开头, 可以快速跳过其他字符, 不会在每个标识符的
+# *         每个字符处尝试匹配 (注释替换后的大段空白也很快)
+# *     输入为删除了注释和 attribute 的代码 (替换为等长的空白, 偏移不变)
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import re
+
+from .VerilogHeaderParser import BRACKETS, ID_START, re_header_token
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+# 候选位置 (在反转的代码中搜索): module 名之后是 "#(" 或 "例化名 [范围] (", 例化名可以是转义标识符
+# 反转前为 module_name #(  或  module_name inst_name [msb:lsb] (
+re_inst_candidate_reversed = re.compile(
+    r"\(\s*(?:#\s*|(?:\][^\[\];]*\[\s*)*(?:[\w$]*[a-zA-Z_]|\S*\\)\s+)([\w$]*[a-zA-Z_]|\S*\\)(?![\w$.'`\\])"
+)
+re_prev_word = re.compile(r"(:\s*)?([\w$]+)$")
+# 不是 module 名的关键字 (声明, 语句, 门级原语等)
+KEYWORDS = {
+    "always", "always_comb", "always_ff", "always_latch", "and", "assert", "assign", "assume",
+    "automatic", "begin", "buf", "bufif0", "bufif1", "case", "casex", "casez", "cmos", "cover",
+    "deassign", "default", "defparam", "disable", "do", "else", "end", "endcase", "endfunction",
+    "endgenerate", "endmodule", "endtask", "event", "final", "for", "force", "forever", "fork",
+    "function", "generate", "genvar", "if", "import", "initial", "inout", "input", "integer", "join",
+    "join_any", "join_none", "localparam", "logic", "module", "nand", "nmos", "nor", "not", "notif0",
+    "notif1", "or", "output", "parameter", "pmos", "pulldown", "pullup", "rcmos", "real", "realtime",
+    "reg", "release", "repeat", "return", "rnmos", "rpmos", "rtran", "rtranif0", "rtranif1", "signed",
+    "specify", "supply0", "supply1", "task", "time", "tran", "tranif0", "tranif1", "tri", "tri0",
+    "tri1", "triand", "trior", "trireg", "typedef", "unique", "unsigned", "uwire", "var", "wait",
+    "wand", "while", "wire", "wor", "xnor", "xor", "bit", "byte", "int", "longint", "shortint",
+    "struct", "union", "enum", "string", "priority", "static", "const",
+}
+# 之后可以是新语句的关键字 (例化位于 generate 块, if/else, begin/end 中)
+STATEMENT_WORDS = {"begin", "end", "else", "generate", "endgenerate", "endcase"}
+
+
+# %% ---------------------------------------------------------------------------
+# VerilogInstanceScanner
+# ------------------------------------------------------------------------------
+class VerilogInstanceScanner:
+    """
+    找出 module 内部的例化, 只在候选位置按 token 解析, 不回溯
+    """
+
+    def __init__(self, code_stub: str) -> None:
+        """
+        code_stub: str => 删除了所有注释和 attribute 的代码
+        """
+        self.code = code_stub
+        self.__reversed = None  # 反转的代码, 用于查找候选位置
+        self.__tokens = None
+        self.tok = None  # 当前的 token (re.Match), None 表示范围的结尾
+        self.text = ""  # 当前的 token 的文本
+
+    def _advance(self) -> None:
+        self.tok = next(self.__tokens, None)
+        self.text = self.tok.group() if self.tok else ""
+
+    # ------------------------------------------------------------------------------
+    # 扫描
+    # ------------------------------------------------------------------------------
+    def scan(self, start: int, end: int) -> list[dict]:
+        """
+        找出代码范围内的例化\n
+        start: int => 起始偏移 (module 声明之后)\n
+        end: int => 结束偏移 (endmodule 之后)\n
+        return: list[dict] => 例化的条目\n
+            module: str => 例化的 module 的名称\n
+            name: str => 例化名\n
+            range: str => 例化数组的范围, 不是数组时为 ""\n
+            parameters: list[dict] => parameter 的指定值 (name, value), 按位置指定时 name 为 None\n
+            ports: list[dict] => port 的连接 (name, value), 按位置连接时 name 为 None, .* 的 name 为 "*"\n
+            offset: int => module 名称的偏移
+        """
+        if self.__reversed is None:
+            self.__reversed = self.code[::-1]
+        size = len(self.code)
+        # 反转的代码中的匹配按倒序排列, 换算为原代码中 module 名的偏移
+        candidates = [
+            (size - m.end(1), m.group(1)[::-1])
+            for m in re_inst_candidate_reversed.finditer(self.__reversed, size - end, size - start)
+        ]
+        instances = []
+        pos = start
+        for offset, module in reversed(candidates):
+            if offset < pos or module in KEYWORDS or not self._at_statement_start(offset, start):
+                continue
+            self.__tokens = re_header_token.finditer(self.code, offset, end)
+            self._advance()
+            found = self._parse_statement()
+            if found:
+                instances += found
+                pos = self.tok.end() if self.tok else end
+        return instances
+
+    def _at_statement_start(self, offset: int, start: int) -> bool:
+        """
+        候选位置是否位于语句的开头 (之前是范围的起点, ";", ")", ":", begin, end, else 等)
+        """
+        # 向前查找非空白的字符 (注释已替换为空白, 可能很长, 每次扩大一倍的窗口)
+        size = 64
+        while True:
+            prefix = self.code[max(start, offset - size) : offset].rstrip()
+            if prefix or offset - size <= start:
+                break
+            size *= 2
+        if not prefix or prefix[-1] in ";):":
+            return True
+        # begin, end 等关键字, 或 begin 之后的标签 (begin : name)
+        m = re_prev_word.search(prefix)
+        return m is not None and (m.group(1) is not None or m.group(2) in STATEMENT_WORDS)
+
+    def _parse_statement(self) -> list[dict]:
+        """
+        解析一条例化语句, 当前 token 为 module 名\n
+        return: list[dict] => 例化的条目, 不是例化语句时为 None
+        """
+        module = self.text
+        offset = self.tok.start()
+        self._advance()
+        parameters = []
+        if self.text == "#":
+            self._advance()
+            if self.text != "(":
+                return None  # 门级的延迟 (#5) 等
+            self._advance()
+            if (parameters := self._parse_connections()) is None:
+                return None
+        instances = []
+        while True:
+            if self.tok is None or self.text[0] not in ID_START or self.text in KEYWORDS:
+                return None
+            name = self.text
+            self._advance()
+            rng_start = self.tok.start() if self.tok else 0
+            rng_end = rng_start
+            while self.text == "[":
+                if self._skip_group() < 0:
+                    return None
+                rng_end = self.tok.start() if self.tok else rng_end
+            if self.text != "(":
+                return None
+            self._advance()
+            if (ports := self._parse_connections()) is None:
+                return None
+            instances.append(
+                {
+                    "module": module,
+                    "name": name,
+                    "range": " ".join(self.code[rng_start:rng_end].split()),
+                    "parameters": parameters,
+                    "ports": ports,
+                    "offset": offset,
+                }
+            )
+            if self.text == ";":
+                return instances
+            if self.text != ",":
+                return None
+            self._advance()
+
+    def _skip_group(self) -> int:
+        """
+        跳过括号中的内容, 当前 token 为左括号\n
+        return: int => 匹配的右括号的偏移 (当前 token 为其后的 token), 没有找到时为 -1
+        """
+        depth = 0
+        while self.tok is not None:
+            if self.text in BRACKETS:
+                depth += BRACKETS[self.text]
+                if depth <= 0:
+                    close = self.tok.start()
+                    self._advance()
+                    return close
+            elif self.text == ";":
+                return -1
+            self._advance()
+        return -1
+
+    def _parse_connections(self) -> list[dict]:
+        """
+        解析逗号分隔的连接列表, 当前 token 为 "(" 之后的第一个 token\n
+        return: list[dict] => 连接的条目 (name, value), 列表没有闭合时为 None (当前 token 为 ")" 之后的 token)
+        """
+        items = []
+        code = self.code
+        while True:
+            if self.tok is None:
+                return None
+            if self.text == ")" and not items:
+                break
+            # -------- 按名称连接: .name(value), .name, .* (".name" 为一个 token) --------
+            if self.text[0] == ".":
+                if self.text == ".":
+                    self._advance()
+                    if self.text != "*":
+                        return None
+                    name, value = "*", ""
+                    self._advance()
+                elif self.text[1] in ID_START:
+                    name = self.text[1:]
+                    self._advance()
+                    if self.text == "(":
+                        value_start = self.tok.end()
+                        if (close := self._skip_group()) < 0:
+                            return None
+                        value = " ".join(code[value_start:close].split())
+                    else:
+                        value = name  # SystemVerilog 的 .name, 连接同名的信号
+                else:
+                    return None
+            # -------- 按位置连接 --------
+            else:
+                name = None
+                value_start = self.tok.start()
+                depth = 0
+                while self.tok is not None:
+                    if self.text in BRACKETS:
+                        if depth == 0 and self.text == ")":
+                            break
+                        depth += BRACKETS[self.text]
+                    elif self.text == ";":
+                        return None
+                    elif depth == 0 and self.text == ",":
+                        break
+                    self._advance()
+                if self.tok is None:
+                    return None
+                value = " ".join(code[value_start : self.tok.start()].split())
+            items.append({"name": name, "value": value})
+            if self.text == ")":
+                break
+            if self.text != ",":
+                return None
+            self._advance()
+        self._advance()
+        return items
@@ -0,0 +1,287 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     单次扫描 verilog 代码, 将其切分为 token 流 (代码, 字符串, 各类注释, attribute)
+# *     module 解析和注释解析都基于同一个 token 流, 不再对整个文件做多次正则替换
+# *     token 流保存为交替排列的文本片段: 偶数项为代码, 奇数项为字符串/注释/attribute
+# *     编辑代码时只重新扫描编辑附近的片段, 与原片段重新同步后复用其余的片段
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import re
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from operator import methodcaller
+from typing import NamedTuple
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+# -------- token 类型 --------
+TK_CODE = "code"  # 代码
+TK_STRING = "string"  # 字符串
+TK_CMT_DOC = "cmt_doc"  # 全行注释: 需要 documentation (//>)
+TK_CMT_LINE = "cmt_line"  # 全行注释
+TK_CMT_EOL = "cmt_eol"  # 行尾注释
+TK_CMT_BLK = "cmt_blk"  # 块注释
+TK_ATTR = "attr"  # attribute
+
+# -------- 切分 token 的正则表达式 --------
+# 匹配到的是代码以外的部分, 代码位于它们之间, 匹配顺序不能随意调换
+re_token_split = re.compile(
+    r'("(?:\\.|[^"\\\n])*"?|'  # 字符串 (未闭合的字符串到行尾为止)
+    r"//[^\n]*|"  # 行注释, 再根据位置区分 doc/全行/行尾
+    r"/\*.*?(?:\*/|\Z)|"  # 块注释
+    r"\(\*(?!\s*\)).*?(?:\*\)|\Z))",  # attribute, 排除 @(*)
+    re.S,
+)
+re_doc_prefix = re.compile(r"//+>")  # 需要 documentation 的注释的前缀
+re_not_newline = re.compile(r"[^\n]")
+count_newline = methodcaller("count", "\n")
+
+
+# %% ---------------------------------------------------------------------------
+# Token
+# ------------------------------------------------------------------------------
+class Token(NamedTuple):
+    """
+    kind: str => token 类型 (TK_*)\n
+    text: str => token 文本\n
+    start: int => token 在代码中的偏移\n
+    line: int => token 起始处的行号 (从 0 开始)
+    """
+
+    kind: str
+    text: str
+    start: int
+    line: int
+
+
+# %% ---------------------------------------------------------------------------
+# 工具函数
+# ------------------------------------------------------------------------------
+def blank(text: str) -> str:
+    """
+    将文本替换为等长的空白 (保留换行), 使处理后的代码与原代码的偏移和行号一致\n
+    text: str => 文本\n
+    return: str => 空白
+    """
+    if "\n" in text:
+        return re_not_newline.sub(" ", text)
+    return " " * len(text)
+
+
+def get_doc_text(text: str) -> str:
+    """
+    获取需要 documentation 的注释的文本 (删除 "//>")\n
+    text: str => 注释文本\n
+    return: str => 删除前缀后的文本
+    """
+    return text[re_doc_prefix.match(text).end() :]
+
+
+# %% ---------------------------------------------------------------------------
+# VerilogLexer
+# ------------------------------------------------------------------------------
+class VerilogLexer:
+    """
+    verilog 代码的 token 流, 只扫描一次, 供 module 解析和注释解析共用
+    """
+
+    def __init__(self, code: str) -> None:
+        """
+        code: str => verilog 代码
+        """
+        self.code = code
+        # 交替排列的文本片段: parts[0::2] 为代码, parts[1::2] 为字符串/注释/attribute
+        self.parts = re_token_split.split(code)
+        # 每个片段的起始偏移和起始行号 (多出的最后一项为代码的总长度和总行数)
+        self.starts = list(accumulate(map(len, self.parts), initial=0))
+        self.lines = list(accumulate(map(count_newline, self.parts), initial=0))
+        # 缓存: 需要 documentation 的注释的片段索引, 删除注释后的代码片段
+        self.__doc_idx = None
+        self.__code_parts = None
+
+    # -------- token 类型 --------
+    def kind(self, idx: int) -> str:
+        """
+        获取片段的类型\n
+        idx: int => 片段的索引\n
+        return: str => token 类型 (TK_*)
+        """
+        if idx % 2 == 0:
+            return TK_CODE
+        text = self.parts[idx]
+        if text[0] == '"':
+            return TK_STRING
+        elif text[0] == "(":
+            return TK_ATTR
+        elif text[1] == "*":
+            return TK_CMT_BLK
+        # 行注释: 同一行中注释之前只有空白时为全行注释
+        prev = self.parts[idx - 1]
+        if (eol := prev.rfind("\n")) >= 0:
+            is_full_line = not prev[eol + 1 :].strip()
+        else:
+            is_full_line = idx == 1 and not prev.strip()
+        if not is_full_line:
+            return TK_CMT_EOL
+        elif re_doc_prefix.match(text):
+            return TK_CMT_DOC
+        return TK_CMT_LINE
+
+    # -------- 偏移 -> 行号 --------
+    def line_of(self, offset: int) -> int:
+        """
+        获取偏移所在的行号\n
+        offset: int => 偏移\n
+        return: int => 行号 (从 0 开始)
+        """
+        idx = max(bisect_right(self.starts, offset) - 1, 0)
+        return self.lines[idx] + self.code.count("\n", self.starts[idx], offset)
+
+    # -------- 遍历 token --------
+    def iter_tokens(self, start: int = 0, stop: int = None):
+        """
+        遍历偏移范围内的 token (空的代码片段会被跳过)\n
+        start: int => 起始偏移\n
+        stop: int => 结束偏移, None 表示到代码结尾\n
+        yield: Token
+        """
+        parts = self.parts
+        idx_start = max(bisect_right(self.starts, start) - 1, 0)
+        idx_stop = len(parts) if stop is None else bisect_right(self.starts, stop - 1)
+        for idx in range(idx_start, min(idx_stop, len(parts))):
+            if parts[idx]:
+                yield Token(self.kind(idx), parts[idx], self.starts[idx], self.lines[idx])
+
+    # -------- 删除注释和 attribute 后的代码 --------
+    def get_code(self, keep_eol: bool = False) -> str:
+        """
+        获取删除注释和 attribute 后的代码 (替换为等长的空白, 与原代码的偏移和行号一致)\n
+        keep_eol: bool => 是否保留行尾注释\n
+        return: str => 处理后的代码
+        """
+        if not keep_eol:
+            return "".join(self._get_code_parts())
+        parts = self.parts[:]
+        parts[1::2] = [
+            text if text[0] == '"' or self.kind(2 * k + 1) == TK_CMT_EOL else blank(text)
+            for k, text in enumerate(self.parts[1::2])
+        ]
+        return "".join(parts)
+
+    def _get_code_parts(self) -> list[str]:
+        """
+        获取删除注释和 attribute 后的代码片段 (结果会被缓存, 编辑时只更新变化的片段)\n
+        return: list[str] => 代码片段的列表
+        """
+        if self.__code_parts is None:
+            self.__code_parts = self.parts[:]
+            self.__code_parts[1::2] = [
+                text if text[0] == '"' else blank(text) for text in self.parts[1::2]
+            ]
+        return self.__code_parts
+
+    # -------- 需要 documentation 的注释 --------
+    def get_doc_lines(self) -> list[str]:
+        """
+        获取需要 documentation 的整行注释 (删除 "//>")\n
+        return: list[str] => 注释文本的列表
+        """
+        parts = self.parts
+        return [get_doc_text(parts[idx]) for idx in self._get_doc_idx()]
+
+    def _get_doc_idx(self, start: int = 1, stop: int = None) -> list[int]:
+        """
+        获取需要 documentation 的注释的片段索引 (整个代码的结果会被缓存)\n
+        start: int => 起始的片段索引\n
+        stop: int => 结束的片段索引, None 表示到最后\n
+        return: list[int] => 片段索引的列表
+        """
+        whole = start <= 1 and stop is None
+        if whole and self.__doc_idx is not None:
+            return self.__doc_idx
+        parts = self.parts
+        doc_idx = [
+            idx
+            for idx in range(start | 1, len(parts) if stop is None else stop, 2)
+            if parts[idx].startswith("//") and self.kind(idx) == TK_CMT_DOC
+        ]
+        if whole:
+            self.__doc_idx = doc_idx
+        return doc_idx
+
+    # -------- 编辑代码 --------
+    def apply_edit(self, offset: int, removed: int, inserted: str) -> None:
+        """
+        在代码中应用一次编辑, 只重新扫描编辑附近的片段\n
+        offset: int => 编辑的起始偏移\n
+        removed: int => 删除的字符数\n
+        inserted: str => 插入的文本
+        """
+        old_parts, old_starts, old_lines = self.parts, self.starts, self.lines
+        code = self.code[:offset] + inserted + self.code[offset + removed :]
+        delta = len(inserted) - removed
+        edit_end = offset + len(inserted)  # 编辑结束处在新代码中的偏移
+        # -------- 确定重新扫描的起点 --------
+        # 起始于编辑位置之前的最后一个字符串/注释/attribute 可能被编辑改变 (例如在行注释末尾输入),
+        # 因此从它之前的代码片段开始扫描, 代码片段的起点一定不在字符串/注释/attribute 之内
+        idx = bisect_left(old_starts, offset) - 1
+        if idx % 2 == 0:
+            idx -= 1
+        first = max(idx - 1, 0)
+        # -------- 重新扫描, 直到与原片段同步 --------
+        pos = old_starts[first]
+        new_parts = []
+        old_stop = len(old_parts)  # 原片段中被替换的片段的结束索引
+        for m in re_token_split.finditer(code, pos):
+            new_parts += (code[pos : m.start()], m.group())
+            pos = m.end()
+            if m.start() < edit_end:
+                continue
+            # 编辑之后, 与原片段中起始位置和文本都相同的片段之后的扫描结果一定相同
+            old_start = m.start() - delta
+            j = bisect_left(old_starts, old_start)
+            while j < len(old_parts) and j % 2 == 0 and old_starts[j] == old_start:
+                j += 1  # 跳过空的代码片段
+            if j < len(old_parts) and old_starts[j] == old_start and old_parts[j] == m.group():
+                old_stop = j + 1
+                break
+        else:
+            new_parts.append(code[pos:])
+        new_stop = first + len(new_parts)  # 新片段在 parts 中的结束索引
+        # -------- 更新片段, 偏移和行号 --------
+        new_starts = list(accumulate(map(len, new_parts), initial=old_starts[first]))
+        new_lines = list(accumulate(map(count_newline, new_parts), initial=old_lines[first]))
+        line_delta = new_lines[-1] - old_lines[old_stop]
+        self.code = code
+        self.parts = old_parts[:first] + new_parts + old_parts[old_stop:]
+        self.starts = (
+            old_starts[:first] + new_starts[:-1] + [x + delta for x in old_starts[old_stop:]]
+        )
+        self.lines = (
+            old_lines[:first] + new_lines[:-1] + [x + line_delta for x in old_lines[old_stop:]]
+        )
+        # -------- 更新缓存 --------
+        if self.__code_parts is not None:
+            code_parts = new_parts[:]
+            code_parts[1::2] = [text if text[0] == '"' else blank(text) for text in new_parts[1::2]]
+            self.__code_parts[first:old_stop] = code_parts
+        if self.__doc_idx is not None:
+            k0 = bisect_left(self.__doc_idx, first)
+            k1 = bisect_left(self.__doc_idx, old_stop)
+            idx_delta = new_stop - old_stop
+            self.__doc_idx = (
+                self.__doc_idx[:k0]
+                + self._get_doc_idx(first + 1, new_stop)
+                + [x + idx_delta for x in self.__doc_idx[k1:]]
+            )
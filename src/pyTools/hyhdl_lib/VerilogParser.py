@@ -1,486 +1,817 @@
-# ==============================================================================
-# COPYRIGHT(C) SIAT
-# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
-# DESCRIPTION:
-# *
-#
-# MODIFICATION HISTORY:---------------------------------------------------------
-#    Version | Author       | Date       | Changes
-#    :-----: | :----------: | :--------: | -------------------------------------
-#    0.1     | WangXH       | 2022-08-14 | start coding
-#
-# ==============================================================================
-# %% ---------------------------------------------------------------------------
-# import
-# ------------------------------------------------------------------------------
-import json
-import re
-
-import yaml
-
-from .util_code import *
-from .util_file import write_to_tmpfile
-
-
-# %% ---------------------------------------------------------------------------
-# VerilogParser
-# ------------------------------------------------------------------------------
-class VerilogParser:
-    """
-    处理 verilog 文件
-    """
-
-    # ------------------------------------------------------------------------------
-    # 初始化 VerilogParser, 读取文件并提取需要出来的代码
-    # ------------------------------------------------------------------------------
-    def __init__(self, vlg_file: str) -> None:
-        """
-        初始化 VerilogParser, 读取文件并提取需要出来的代码\n
-        vlg_file: str => verilog 文件路径
-        """
-        # -------- 读取代码 --------
-        with open(vlg_file, "r", encoding="utf-8") as fp:
-            code = fp.read()
-        # -------- variables --------
-        self.__code = code
-
-    # ------------------------------------------------------------------------------
-    # 解析代码, 提取 module (name, parameters, ports, descriptions)
-    # ------------------------------------------------------------------------------
-    def parse_module(self) -> None:
-        """
-        解析代码, 提取 module (name, parameters, ports, descriptions)
-        """
-        # -------- 思路 --------
-        # 需要的信息: module name, parameter 信息, port 信息
-        #   parameters: list[dict] => 所有必要的信息
-        #       parameter 条目: dict(name:str = xx, type:str = xx, value:str = xx, description:str = xx)
-        #   ports: list[dict] => 所有必要的信息
-        #       port 条目: dict(name:str = xx, direction:str = xx, type:str = xx, description:str = xx)
-        # 处理方法
-        #   1. 删除注释, 以避免干涉解析
-        #   2. 分离 module name 和 body
-        #   3. 从 body 中提取 parameters declaration 和 ports declaration
-        #   4. 提取 parameter item
-        #   5. 提取 ports item
-
-        # -------- 简化 code --------
-        code_m = clean_comment_keep_eol(self.__code)
-        code_m = clean_attribute(code_m)
-        code_m_stub = clean_comment_all(code_m)
-        # -------- 提取 module name 和 body --------
-        re_module = re.compile(
-            r"module\s*(?P<name>[a-zA-Z_]\w*)\b(?P<body>.*?;)", re.S
-        )  # module statement 文本, 需先删除所有注释和属性
-        if m := re_module.search(code_m_stub):
-            module_name = m.group("name")
-            module_body = m.group("body")
-        # -------- 判断 module 声明的有效性 --------
-        if not m or not module_name:  # 没有匹配到 module 或 module 没有 name
-            self.module_name = ""
-            self.module_parameters = []
-            self.module_ports = []
-            return
-        elif not module_body:  # 如果没有匹配到 body
-            self.module_name = module_name
-            self.module_parameters = []
-            self.module_ports = []
-            return
-        # -------- 提取 parameters and ports --------
-        parameters = []
-        ports = []
-        # -------- re --------
-        re_param_port_text = re.compile(
-            # r"#\s*\((?P<param_text>.*?)\)(?:\s*\(\s*.+?\)\s*;)",
-            r"(#\s*\((?P<param>.*?)\))?"  # parameter declarations
-            r"\s*\(\s*(?P<port>(input|output|inout).+?)\)\s*;",  # port declarations
-            re.S,
-        )  # parameters statement 文本, 需先删除所有注释和属性
-        re_param_item = re.compile(
-            r"parameter"  # keyword
-            r"\s*(?P<type>((?P<signed>signed)?\s*(?P<range>\[[^:]+:[^:]+\])?)|integer|real|realtime|time)?"  # type
-            r"\s*(?P<var>[a-zA-Z_]\w*)"  # variable
-            r"\s*(=\s*(?P<value>.+?))?"  # value
-            r"\s*(,(?=\s*parameter)|\Z)",  # separator
-            re.S,
-        )
-        # parameter_declaration ::= parameter [ signed ] [ range ] list_of_param_assignments ;
-        #                         | parameter integer list_of_param_assignments ;
-        #                         | parameter real list_of_param_assignments ;
-        #                         | parameter realtime list_of_param_assignments ;
-        #                         | parameter time list_of_param_assignments ;
-        re_port_item = re.compile(
-            r"(?P<direction>input|output|inout)"  # direction
-            r"\s*(?P<type>wire|wand|wor|tri|tri0|tri1|triand|trior|trireg|reg)?"  # type
-            r"\s*(?P<signed>signed)?"  # singed
-            r"\s*(?P<range>\[[^:]+:[^:]+\])?"  # range
-            r"\s*(?P<var>[a-zA-Z_]\w*)"  # variable
-            r"\s*(=\s*(?P<value>.+?))?"  # value
-            r"\s*(,(?=\s*(input|output|inout))|\Z)",  # separator
-            re.S,
-        )
-        # inout_declaration ::= inout [ net_type ] [ signed ] [ range ] list_of_port_identifiers
-        # input_declaration ::= input [ net_type ] [ signed ] [ range ] list_of_port_identifiers
-        # output_declaration ::= output [ net_type ] [ signed ] [ range ] list_of_port_identifiers
-        #                      | output [ reg ] [ signed ] [ range ] list_of_port_identifiers
-        #                      | output reg [ signed ] [ range ] list_of_variable_port_identifiers
-        #                      | output [ output_variable_type ] list_of_port_identifiers
-        #                      | output output_variable_type list_of_variable_port_identifiers
-        # -------- 提取参数和端口的文本 --------
-        if m := re_param_port_text.search(module_body):
-            param_text = m.group("param")
-            port_text = m.group("port")
-            # -------- 提取 parameters --------
-            if param_text:
-                # 获取 parameter 的 [name, type, value]
-                for m in re_param_item.finditer(param_text):
-                    parameters.append(
-                        {
-                            "name": m.group("var"),
-                            "type": shorten_spaces(m.group("type")),
-                            "value": m.group("value"),
-                            "description": "",
-                        }
-                    )
-                # 获取 parameter 的 [description]
-                for param in parameters:
-                    if m := re.search(
-                        r"parameter\b.+\b" + param["name"] + r"\b.*//\s*(?P<d>.*)\s*\n", code_m
-                    ):
-                        param["description"] = m.group("d")
-            # -------- 提取 ports --------
-            if port_text:
-                # 获取 port 的 [name, direction, type]
-                for m in re_port_item.finditer(port_text):
-                    if t := m.group("type"):
-                        p_type = t
-                    else:
-                        p_type = "(wire)"
-                    if t := m.group("signed"):
-                        p_type += f" {t}"
-                    if t := m.group("range"):
-                        t = shorten_spaces(t)
-                        p_type += f" {t}"
-                    #
-                    ports.append(
-                        {
-                            "name": m.group("var"),
-                            "direction": m.group("direction"),
-                            "type": p_type,
-                            "description": "",
-                        }
-                    )
-                # 获取 port 的 [description]
-                for port in ports:
-                    if m := re.search(
-                        r"\b" + port["direction"] + r"\b"  # direction
-                        r".*"
-                        r"\b" + port["name"] + r"\b"  # name
-                        r".*//\s*(?P<d>.*)\s*\n",
-                        code_m,
-                    ):
-                        port["description"] = m.group("d")
-        # -------- 更新数据 --------
-        self.module_name = module_name
-        self.module_parameters = parameters
-        self.module_ports = ports
-
-    # ------------------------------------------------------------------------------
-    # parse_comment
-    # ------------------------------------------------------------------------------
-    def parse_comment(self) -> None:
-        """
-        解析注释, 从中提取 [wavedrom 数据, table 数据, 普通文字行]
-        """
-        # -------- 提取需要 documentation 的注释 --------
-        cmt_lines = get_comment_doc(self.__code)  # 需要文档化的整行注释
-        if not cmt_lines:
-            self.comment_items = []
-            self.has_wavedrom = False
-            return
-        # -------- 处理注释 --------
-        # -------- variable --------
-        comment_items = []
-        has_wavedrom = False
-        cmt_line_tot = len(cmt_lines)
-        # -------- re --------
-        re_wave_token_start = re.compile(r"<(?P<token>wave(drom|_ya?ml)?)>")
-        re_wave_token_end = re.compile(r"</(?P<token>wave\w*)>")
-        re_table_head = re.compile(r"^[ \t]*(\|)?(.+?(?<!\\)\|)+.*$", re.M)
-        re_table_align = re.compile(r"^[ \t]*(\|)?(\s*[:-]-+[-:]\s*(?<!\\)\|)+.*$", re.M)
-        re_table_body = re.compile(r"^[ \t]*(\|)?(.+?(?<!\\)\|)+.*$", re.M)
-        re_table_item_split = re.compile(r"(?<!\\)\|")
-        re_line_chapter = re.compile(r"\s*#\s+.*$")
-        re_line_list = re.compile(r"\s*([\*\+-]|\d+\.)\s+.*$")
-        re_line_empty = re.compile(r"\s*$")
-        # -------- 计算缩进 --------
-        def get_doc_indent(text):
-            return get_indent(text, 3) - 3
-
-        # -------- 寻找 wavedrom 数据 --------
-        def get_wave(cmt_lines: list[str], start: int = 0, stop: int = cmt_line_tot) -> tuple:
-            """
-            从注释中提取 wavedrom 数据\n
-            cmt_lines: list[str] => 需要 previes 的注释行\n
-            start: int => 搜索的起始索引\n
-            stop: int => 搜索的结束索引\n
-            return: tuple =>\n
-                wavedrom 数据在列表中的起始索引,\n
-                wavedrom 数据在列表中的结束索引,\n
-                wavedrom 数据: dict =>\n
-                    type: str => "WaveDrom",\n
-                    data: str of json => 字符表示的 json 数据,\n
-                    indent: int => 缩进
-            """
-            # -------- variable --------
-            wave_start = -1
-            wave_end = -1
-            wave_text = ""
-            # -------- 查找 wavedrom --------
-            # 找 wave 开头
-            for i in range(start, stop):
-                text = cmt_lines[i]
-                if m := re_wave_token_start.search(text):
-                    wave_start = i
-                    wave_token = m.group("token")
-                    indent = get_doc_indent(text)
-                    wave_text += text[m.end() :]
-                    break
-            else:
-                return None
-            # 找 wave 文本和结尾
-            for i in range(wave_start + 1, stop):
-                text = cmt_lines[i]
-                if m := re_wave_token_end.search(text):
-                    wave_end = i
-                    wave_text += text[indent : m.start()]
-                    break
-                else:
-                    wave_text += text[indent:] + "\n"
-            else:
-                return None
-            # -------- 处理 wavedrom --------
-            # 如果找到 <wavedrom> ... </wavedrom>
-            if wave_token in ("wave", "wavedrom"):
-                wave_text = wave_text.strip()
-                try:
-                    wave_dict = json.loads(wave_text)
-                except json.JSONDecodeError:
-                    try:
-                        wave_dict = eval(
-                            wave_text,
-                            type("Dummy", (dict,), dict(__getitem__=lambda s, n: n))(),
-                        )
-                    except:
-                        return None
-                except:
-                    return None
-            # 如果找到 <wave_yaml> ... </wave_yaml>
-            elif wave_token in ("wave_yaml", "wave_yml"):
-                try:
-                    wave_dict = yaml.load(wave_text, yaml.Loader)
-                except:
-                    return None
-            # -------- 返回数据 --------
-            return (
-                wave_start,
-                wave_end,
-                {
-                    "type": "WaveDrom",
-                    "data": json.dumps(wave_dict, ensure_ascii=False),
-                    "indent": indent,
-                },
-            )
-
-        # -------- 寻找 table 数据 --------
-        def get_table(cmt_lines: list[str], start: int = 0, stop: int = cmt_line_tot) -> tuple:
-            """
-            从注释中提取 table 数据\n
-            cmt_lines: list[str] => 需要 preview 的注释行\n
-            start: int => 搜索的起始索引\n
-            stop: int => 搜索的结束索引\n
-            return: tuple =>\n
-                table 数据在列表中的起始索引,\n
-                table 数据在列表中的结束索引,\n
-                table 数据: dict =>\n
-                    type: str => "table",\n
-                    data: dict => table 数据的各个要素,\n
-                        thead: list of str => 表头文本,\n
-                        align: list of str => 对齐方式 ("left", "center", "right" 之一),\n
-                        tbody: list of list of str => 表格文本\n
-                    indent: int => 缩进
-            """
-            # -------- variable --------
-            table_start = -1
-            table_end = -1
-            # -------- 查找 table --------
-            # 找 table 开头
-            for i in range(start, stop):
-                text = cmt_lines[i]
-                # 找 table head
-                if re_table_head.search(text):
-                    indent = get_doc_indent(text)
-                else:
-                    continue
-                # 找 table align
-                text = cmt_lines[i + 1]
-                if re_table_align.search(text) and get_doc_indent(text) == indent:
-                    pass
-                else:
-                    continue
-                # 找 table body
-                text = cmt_lines[i + 2]
-                if re_table_body.search(text) and get_doc_indent(text) == indent:
-                    table_start = i
-                    table_end = table_start + 2
-                    break
-                else:
-                    continue
-            if table_start == -1:
-                return None
-            # 找 table 剩余的 body
-            for i in range(table_start + 3, stop):
-                text = cmt_lines[i]
-                if re_table_body.search(text) and get_doc_indent(text) == indent:
-                    table_end = i
-                else:
-                    break
-            # -------- 处理 table --------
-            # 获取表格对齐方式
-            def get_align(x):
-                if re.fullmatch(r":-+:$", x):
-                    return "center"
-                elif re.fullmatch(r"-{2,}:$", x):
-                    return "right"
-                else:
-                    return "left"
-
-            thead = [x.strip(" ") for x in re_table_item_split.split(cmt_lines[table_start])]  # 表头项
-            talign = [
-                get_align(x.strip(" "))  # 获取对齐方式
-                for x in re_table_item_split.split(cmt_lines[table_start + 1])
-            ]  # 对齐方式
-            tbody = []
-            for i in range(table_start + 2, table_end + 1):
-                tbody.append([x.strip(" ") for x in re_table_item_split.split(cmt_lines[i])])
-            # -------- 返回数据 --------
-            return (
-                table_start,
-                table_end,
-                {
-                    "type": "table",
-                    "data": {
-                        "thead": thead,
-                        "align": talign,
-                        "tbody": tbody,
-                    },
-                    "indent": indent,
-                },
-            )
-
-        # -------- 将每行注释转换成列表 --------
-        def get_lines(cmt_lines: list[str], start: int = 0, stop: int = cmt_line_tot) -> list[dict]:
-            """
-            从注释中提取普通行\n
-            cmt_lines: list[str] => 需要 preview 的注释行\n
-            start: int => 搜索的起始索引\n
-            stop: int => 搜索的结束索引\n
-            return: list[dict] =>\n
-                type: str => 章节标题 ("header"), 条目 ("list"), 普通文本 ("normal"),\n
-                data: str => 文本,\n
-                indent: int => 缩进
-            """
-            # -------- variable --------
-            tList = []
-            # -------- 处理 --------
-            for line in cmt_lines[start:stop]:
-                indent = get_doc_indent(line)
-                tList.append(
-                    {
-                        "type": "normal",
-                        "data": line,
-                        "indent": indent,
-                    }
-                )
-            # -------- return --------
-            return tList
-
-        # -------- 解析 cmt_lines --------
-        cmt_line_idx = 0
-        while wave_dat := get_wave(cmt_lines, cmt_line_idx):
-            has_wavedrom = True
-            # 处理 wave 之前的数据
-            while table_dat := get_table(cmt_lines, cmt_line_idx, wave_dat[0]):
-                # 处理 table 之前的数据
-                if tList := get_lines(cmt_lines, cmt_line_idx, table_dat[0]):
-                    comment_items += tList
-                # 处理 table 数据
-                comment_items.append(table_dat[2])
-                # 更新 cmt_line_idx
-                cmt_line_idx = table_dat[1] + 1
-            # 处理 table 之前的数据
-            else:
-                if tList := get_lines(cmt_lines, cmt_line_idx, wave_dat[0]):
-                    comment_items += tList
-            # 处理 wave 数据
-            comment_items.append(wave_dat[2])
-            # 更新 cmt_line_idx
-            cmt_line_idx = wave_dat[1] + 1
-        else:
-            # 处理 wave 之后的数据
-            while table_dat := get_table(cmt_lines, cmt_line_idx):
-                # 处理 table 之前的数据
-                if tList := get_lines(cmt_lines, cmt_line_idx, table_dat[0]):
-                    comment_items += tList
-                # 处理 table 数据
-                comment_items.append(table_dat[2])
-                # 更新 cmt_line_idx
-                cmt_line_idx = table_dat[1] + 1
-            else:
-                if tList := get_lines(cmt_lines, cmt_line_idx):
-                    comment_items += tList
-
-        # -------- 更新数据 cmt_lines --------
-        self.comment_items = comment_items
-        self.has_wavedrom = has_wavedrom
-
-    # ------------------------------------------------------------------------------
-    # dump 解析数据
-    # ------------------------------------------------------------------------------
-    def dump_parsed(self, dump_module=True, dump_comment=False):
-        text = ""
-        # dump module
-        if dump_module:
-            text += (
-                "# ------------------------------------------------------------------------------\n"
-            )
-            text += f"module::name = {self.module_name}\n"
-            text += (
-                "# ------------------------------------------------------------------------------\n"
-            )
-            text += f"module::parameters = (see below)\n"
-            for p in self.module_parameters:
-                text += f"\t{p}\n"
-            text += (
-                "# ------------------------------------------------------------------------------\n"
-            )
-            text += f"module::ports = (see below)\n"
-            for p in self.module_ports:
-                text += f"\t{p}\n"
-        # dump commenmts
-        if dump_comment:
-            text += (
-                "# ------------------------------------------------------------------------------\n"
-            )
-            text += f"cmt_lines = (see below)\n"
-            for c in self.comment_items:
-                text += f"\t{c}\n"
-            text += f"cmt_lines::has_wavedrom = {self.has_wavedrom}\n"
-        # dump raw::code
-        text += "\n\n"
-        text += "# ------------------------------------------------------------------------------\n"
-        text += f"raw::verilog_code = (see below)\n"
-        text += f"{self.__code}\n"
-
-        # 写入临时文件
-        return write_to_tmpfile("hyhdl_dump", text)
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2022-08-14 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import json
+import os
+import re
+import sys
+from bisect import bisect_left, bisect_right
+from contextlib import closing
+
+import yaml
+
+from .util_cache import ContentCache, hash_text, model_cache, render_cache
+from .util_code import *
+from .util_file import write_to_tmpfile
+from .util_json5 import loads_relaxed
+from .VerilogConstEval import resolve_module
+from .VerilogHeaderParser import VerilogHeaderParser, find_module_keyword
+from .VerilogHeaderScanner import VerilogHeaderScanner
+from .VerilogInstanceScanner import VerilogInstanceScanner
+from .VerilogLexer import TK_CMT_EOL, VerilogLexer
+from .VerilogPreprocessor import deps_unchanged, get_preprocessor
+from .util_metrics import NULL_METRICS, Metrics
+
+
+# %% ---------------------------------------------------------------------------
+# 正则表达式常量 (预编译, 常驻模式下只编译一次)
+# ------------------------------------------------------------------------------
+# -------- module --------
+re_endmodule = re.compile(r"\bendmodule\b")
+# -------- description --------
+re_eol_comment_prefix = re.compile(r"^//+\s*")  # 行尾注释的前缀
+re_newline = re.compile(r"\n")
+# -------- comment --------
+re_wave_token_start = re.compile(r"<(?P<token>wave(drom|_ya?ml)?)>")
+re_wave_token_end = re.compile(r"</(?P<token>wave\w*)>")
+re_table_head = re.compile(r"^[ \t]*(\|)?(.+?(?<!\\)\|)+.*$", re.M)
+re_table_align = re.compile(r"^[ \t]*(\|)?(\s*[:-]-+[-:]\s*(?<!\\)\|)+.*$", re.M)
+re_table_body = re.compile(r"^[ \t]*(\|)?(.+?(?<!\\)\|)+.*$", re.M)
+re_table_item_split = re.compile(r"(?<!\\)\|")
+re_line_chapter = re.compile(r"\s*#\s+.*$")
+re_line_list = re.compile(r"\s*([\*\+-]|\d+\.)\s+.*$")
+re_line_empty = re.compile(r"\s*$")
+# yaml 格式的 wave: 只构造基本类型, 优先使用 libyaml 的 C 实现
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+# %% ---------------------------------------------------------------------------
+# VerilogParser
+# ------------------------------------------------------------------------------
+class VerilogParser:
+    """
+    处理 verilog 文件
+    """
+
+    # ------------------------------------------------------------------------------
+    # 初始化 VerilogParser, 读取文件并提取需要出来的代码
+    # ------------------------------------------------------------------------------
+    def __init__(
+        self, vlg_file: str = None, code: str = None, metrics: Metrics = None, header_only: bool = False
+    ) -> None:
+        """
+        初始化 VerilogParser, 读取文件并提取需要出来的代码\n
+        vlg_file: str => verilog 文件路径, "-" 表示从 stdin 读取\n
+        code: str => verilog 代码, 不为 None 时不再读取 vlg_file\n
+        metrics: Metrics => 记录各阶段的耗时, None 表示不记录\n
+        header_only: bool => 只解析 module 声明: 不读取整个文件, 内存映射文件后按需扫描
+            (只用于 vlg_file, 不能解析注释和应用编辑)
+        """
+        self.metrics = metrics or NULL_METRICS
+        # 代码所在的文件, 用于查找 include 的文件
+        self.__file = None if vlg_file is None or str(vlg_file) == "-" else str(vlg_file)
+        # 只解析 module 声明时的文件路径
+        self.__header_file = vlg_file if header_only and code is None and str(vlg_file) != "-" else None
+        if self.__header_file is not None:
+            code = ""
+        # -------- 读取代码 --------
+        with self.metrics.phase("read"):
+            if code is None:
+                if str(vlg_file) == "-":
+                    sys.stdin.reconfigure(encoding="utf-8")
+                    code = sys.stdin.read()
+                else:
+                    with open(vlg_file, "r", encoding="utf-8") as fp:
+                        code = fp.read()
+        if self.metrics.enabled:
+            self.metrics.count("source_bytes", len(code.encode("utf-8")))
+        # -------- variables --------
+        self.__code = code
+        self.__source_hash = None  # 代码的 hash, 作为解析结果的缓存的 key
+        self.__lexer = None
+        self.__modules = None
+        self.__selection = None  # parse_module 选择 module 的参数 (name, offset)
+        self.__source_map = None  # 预处理后的代码 -> 原代码的偏移, 没有预处理时为 None
+        self.__preprocessed = False  # module 的解析结果是否受预处理 (宏定义, 条件编译等) 的影响
+        self.deps = []  # 最近一次解析 include 的文件 (路径, mtime_ns, size), 见 PreprocessedCode.deps
+        # 注释的解析结果, 编辑后用于复用未变化的部分
+        self.__cmt_lines = None  # 需要 documentation 的注释行
+        self.__cmt_stops = []  # 每一段 (以 wave 结尾) 的结束行索引
+        self.__cmt_counts = []  # 每一段结束时 comment_items 的条目数
+
+    # ------------------------------------------------------------------------------
+    # 缓存
+    # ------------------------------------------------------------------------------
+    def source_hash(self) -> str:
+        """
+        return: str => 代码的 hash
+        """
+        if self.__source_hash is None:
+            with self.metrics.phase("hash"):
+                self.__source_hash = hash_text(self.__code)
+        return self.__source_hash
+
+    def _cache_key(self, kind: str) -> str:
+        """
+        解析结果的缓存的 key: 代码的 hash 和预处理的配置, 代码中有 ` 时加上文件的路径
+        (include 的查找和 `__FILE__ 与文件所在的位置有关, 内容相同的文件的预处理结果可能不同)\n
+        kind: str => 解析结果的种类 (modules, instances)\n
+        return: str => 缓存的 key
+        """
+        key = f"{kind}:{self.source_hash()}:{get_preprocessor().fingerprint}"
+        if "`" in self.__code:
+            key += ":" + os.path.abspath(self.__file or ".")
+        return key
+
+    def model_hash(self, with_comment: bool = False) -> str:
+        """
+        选择的 module (和注释) 的 hash, 作为生成的文本的缓存的 key\n
+        with_comment: bool => 是否包含注释的解析结果\n
+        return: str => hash 字符串
+        """
+        model = [self.module_name, self.module_parameters, self.module_ports]
+        if with_comment:
+            model += [self.comment_items, self.has_wavedrom]
+        return hash_text(json.dumps(model, ensure_ascii=False))
+
+    def _cache_get(self, cache: ContentCache, key: str):
+        """
+        读取缓存, 并在 metrics 中记录命中或未命中\n
+        cache: ContentCache => 缓存\n
+        key: str => 缓存的 key\n
+        return: object => 缓存的对象, 未命中时为 None
+        """
+        value = cache.get(key)
+        self.metrics.count(f"cache.{cache.name}.{'miss' if value is None else 'hit'}", 1)
+        return value
+
+    def _render_cached(self, key: str, render) -> str:
+        """
+        生成文本, key 相同时直接返回缓存的结果\n
+        key: str => 缓存的 key (由 model_hash, 模板的 hash, 资源的版本等计算)\n
+        render: Callable[[], str] => 生成文本的函数\n
+        return: str => 生成的文本
+        """
+        if (text := self._cache_get(render_cache, key)) is None:
+            text = render()
+            render_cache.put(key, text)
+        return text
+
+    # ------------------------------------------------------------------------------
+    # 获取 token 流 (只扫描一次代码)
+    # ------------------------------------------------------------------------------
+    def _get_lexer(self) -> VerilogLexer:
+        """
+        获取代码的 token 流, 第一次调用时扫描代码, 之后复用\n
+        return: VerilogLexer => token 流
+        """
+        if self.__lexer is None:
+            with self.metrics.phase("lex"):
+                self.__lexer = VerilogLexer(self.__code)
+            self.metrics.count("tokens", len(self.__lexer.parts))
+        return self.__lexer
+
+    # ------------------------------------------------------------------------------
+    # 解析代码, 提取 module (name, parameters, ports, descriptions)
+    # ------------------------------------------------------------------------------
+    def parse_module(self, name: str = None, offset: int = None) -> None:
+        """
+        解析代码, 提取 module (name, parameters, ports, descriptions)\n
+        文件中有多个 module 时, 按 name 或 offset 选择其中一个, 都为 None 时选择第一个\n
+        name: str => module 的名称\n
+        offset: int => 光标在代码中的偏移, 选择包含该偏移的 module (没有则选择之前最近的)
+        """
+        # -------- 思路 --------
+        # 需要的信息: module name, parameter 信息, port 信息
+        #   parameters: list[dict] => 所有必要的信息
+        #       parameter 条目: dict(name:str = xx, type:str = xx, value:str = xx, description:str = xx)
+        #   ports: list[dict] => 所有必要的信息
+        #       port 条目: dict(name:str = xx, direction:str = xx, type:str = xx, description:str = xx)
+        # 处理方法
+        #   1. 删除注释 (替换为等长的空白), 以避免干涉解析
+        #   2. 分离 module name 和 body
+        #   3. 从 body 中提取 parameters declaration 和 ports declaration
+        #   4. 提取 parameter item
+        #   5. 提取 ports item
+
+        # -------- 选择 module --------
+        self.__selection = (name, offset)
+        if self.__header_file is None or self.__modules is not None:
+            module = self._select_module(self.parse_modules(), name, offset)
+        else:
+            # 只扫描到选中的 module 为止
+            with closing(self._iter_header_modules()) as modules:
+                module = self._select_module(modules, name, offset)
+        self.load_module(module)
+
+    @staticmethod
+    def _select_module(modules, name: str, offset: int) -> dict:
+        """
+        按 name 或 offset 选择 module, 都为 None 时选择第一个\n
+        modules: Iterable[dict] => module 的列表或迭代器 (选中后不再继续迭代)\n
+        name: str => module 的名称\n
+        offset: int => 选择包含该偏移的 module (没有则选择之前最近的, 都在之后时选择第一个)\n
+        return: dict => 选中的 module, 没有时为 None
+        """
+        module = None
+        if name is not None:
+            module = next((x for x in modules if x["name"] == name), None)
+        elif offset is not None:
+            for x in modules:
+                if x["offset"] > offset:
+                    module = module or x
+                    break
+                module = x
+        else:
+            module = next(iter(modules), None)
+        return module
+
+    # ------------------------------------------------------------------------------
+    # 使用已解析的 module
+    # ------------------------------------------------------------------------------
+    def load_module(self, module: dict) -> None:
+        """
+        使用已解析的 module (例如来自 module 索引), 不再解析代码\n
+        module: dict => parse_modules 返回的条目, None 表示没有 module
+        """
+        self.module_name = module["name"] if module else ""
+        self.module_parameters = module["parameters"] if module else []
+        self.module_ports = module["ports"] if module else []
+        self.metrics.count("parameters", len(self.module_parameters))
+        self.metrics.count("ports", len(self.module_ports))
+
+    # ------------------------------------------------------------------------------
+    # 解析代码, 提取所有 module
+    # ------------------------------------------------------------------------------
+    def parse_modules(self) -> list[dict]:
+        """
+        解析代码, 一次扫描提取文件中所有的 module (结果会被缓存)\n
+        return: list[dict] => module 的列表, 每项为\n
+            name: str => module 的名称\n
+            parameters: list[dict] => parameter 条目\n
+            ports: list[dict] => port 条目\n
+            offset: int => module 关键字在代码中的偏移\n
+            header_end: int => module 声明 (到第一个 ";") 之后的偏移\n
+            end: int => endmodule 之后的偏移 (没有 endmodule 时为代码结尾)
+        """
+        if self.__modules is not None:
+            return self.__modules
+        # -------- 只解析 module 声明: 扫描整个文件, 不读取到内存中 --------
+        if self.__header_file is not None:
+            with closing(self._iter_header_modules()) as modules:
+                self.__modules = list(modules)
+            return self.__modules
+        # -------- 代码 (及预处理的配置, include 的文件) 未变化时使用缓存的结果 --------
+        cache_key = self._cache_key("modules")
+        if (cached := self._cache_get(model_cache, cache_key)) is not None and deps_unchanged(cached[1]):
+            self.__modules, self.deps = cached
+            self.__preprocessed = "`" in self.__code  # 不能确定时按受影响处理
+            return self.__modules
+        # -------- 简化 code --------
+        code_stub, deps = self._get_code_stub()
+        # -------- 逐个解析 module 声明 --------
+        with self.metrics.phase("module parse"):
+            modules = self._scan_modules(code_stub, 0)
+        self.metrics.count("modules", len(modules))
+        self.__modules = modules
+        self.deps = deps
+        model_cache.put(cache_key, (modules, deps))
+        return modules
+
+    def parse_instances(self) -> list[dict]:
+        """
+        解析代码, 提取所有 module 及其内部的例化 (结果会被缓存; 不能用于 header_only)\n
+        return: list[dict] => module 的列表, 与 parse_modules 的条目相同, 每项增加\n
+            instances: list[dict] => 例化的条目 (module, name, range, parameters, ports, offset),
+                见 VerilogInstanceScanner.scan
+        """
+        cache_key = self._cache_key("instances")
+        if (cached := self._cache_get(model_cache, cache_key)) is not None and deps_unchanged(cached[1]):
+            modules, self.deps = cached
+            return modules
+        code_stub, deps = self._get_code_stub()
+        scanner = VerilogInstanceScanner(code_stub)
+        with self.metrics.phase("instance scan"):
+            modules = self._scan_modules(code_stub, 0, scan_body=scanner.scan)
+        self.metrics.count("instances", sum(len(x["instances"]) for x in modules))
+        self.deps = deps
+        model_cache.put(cache_key, (modules, deps))
+        return modules
+
+    def _get_code_stub(self) -> tuple[str, list]:
+        """
+        获取删除注释后的代码, 其中有预处理指令或宏时进行预处理 (保持行结构)\n
+        return: tuple[str, list] => (代码, include 的文件)
+        """
+        lexer = self._get_lexer()
+        with self.metrics.phase("comment stripping"):
+            code_stub = lexer.get_code()
+        self.__source_map = None
+        self.__preprocessed = False
+        if "`" not in code_stub:
+            return code_stub, []
+        with self.metrics.phase("preprocess"):
+            result = get_preprocessor().process(code_stub, self.__file)
+        self.metrics.count("includes", len(result.deps))
+        self.__source_map = result.source_map
+        self.__preprocessed = result.effective
+        return result.code, result.deps
+
+    def _source_offset(self, offset: int) -> int:
+        """
+        offset: int => 预处理后的代码中的偏移\n
+        return: int => 原代码中的偏移
+        """
+        return offset if self.__source_map is None else self.__source_map.to_source(offset)
+
+    def _scan_modules(self, code_stub: str, pos: int, resync=None, scan_body=None) -> list[dict]:
+        """
+        从 pos 开始逐个解析 module 声明\n
+        code_stub: str => 删除了所有注释和 attribute 的代码\n
+        pos: int => 起始偏移\n
+        resync: Callable[[int], list[dict]] => 根据 module 的偏移返回可以复用的其余 module, 没有则返回 None\n
+        scan_body: Callable[[int, int], list[dict]] => 找出 module 内部 (声明之后到 endmodule) 的例化,
+            结果保存在 module 的 instances 中, None 表示不扫描 module 内部\n
+        return: list[dict] => module 的列表
+        """
+        modules = []
+        while (start := find_module_keyword(code_stub, pos)) >= 0:
+            if resync and (rest := resync(start)) is not None:
+                return modules + rest
+            module, header_end = self._parse_module_header(code_stub, start)
+            if module is None:
+                # 声明不完整, 从停止解析处继续查找 (不会重复扫描)
+                pos = max(header_end, start + len("module"))
+                continue
+            pos = self._find_endmodule(code_stub, header_end)
+            if scan_body is not None:
+                module["instances"] = [
+                    dict(x, offset=self._source_offset(x["offset"])) for x in scan_body(header_end, pos)
+                ]
+            module["offset"] = self._source_offset(start)
+            module["header_end"] = self._source_offset(header_end)
+            module["end"] = self._source_offset(pos)
+            modules.append(module)
+        return modules
+
+    def _iter_header_modules(self):
+        """
+        内存映射文件, 逐个解析 module 声明, 只解码声明所在的代码片段\n
+        yield: dict => module, 与 parse_modules 返回的条目相同\n
+        (end 在继续迭代时才查找并填入, 选中 module 后停止迭代时不再扫描文件的其余部分)
+        """
+        with VerilogHeaderScanner(self.__header_file) as scanner:
+            for offset, text, find_end in scanner.iter_headers():
+                # 代码片段以 module 关键字开头, 使用与完整解析相同的方法解析
+                with self.metrics.phase("module parse"):
+                    parser = VerilogParser(self.__header_file, text)
+                    module, header_end = parser._parse_module_header(parser._get_code_stub()[0], 0)
+                    if module is None:
+                        continue
+                module["offset"] = offset
+                module["header_end"] = offset + parser._source_offset(header_end)
+                self.metrics.count("modules", 1)
+                yield module
+                module["end"] = find_end()
+
+    @staticmethod
+    def _find_endmodule(code_stub: str, pos: int) -> int:
+        """
+        查找 endmodule\n
+        code_stub: str => 删除了所有注释和 attribute 的代码\n
+        pos: int => 起始偏移\n
+        return: int => endmodule 之后的偏移 (没有 endmodule 时为代码结尾)
+        """
+        # 先用 str.find 定位 (比带 \b 的正则搜索快得多), 再检查单词边界
+        while (idx := code_stub.find("endmodule", pos)) >= 0:
+            if m_end := re_endmodule.match(code_stub, idx):
+                return m_end.end()
+            pos = idx + 1
+        return len(code_stub)
+
+    # ------------------------------------------------------------------------------
+    # 增量解析: 应用编辑, 只重新解析受影响的部分
+    # ------------------------------------------------------------------------------
+    def apply_edits(self, edits) -> None:
+        """
+        在代码中应用编辑, 只重新解析受影响的 module 声明和注释, 其余部分复用之前的解析结果\n
+        edits: list[tuple] => (offset, removed, inserted) 的列表, 按顺序应用,
+            每个编辑的偏移基于应用了之前的编辑的代码
+        """
+        lexer = self._get_lexer()
+        for offset, removed, inserted in edits:
+            if not 0 <= offset <= offset + removed <= len(lexer.code):
+                raise ValueError(f"edit out of range: ({offset}, {removed})")
+            with self.metrics.phase("lex"):
+                lexer.apply_edit(offset, removed, inserted)
+            if self.__modules is not None:
+                # 宏定义和条件编译可能影响其后的所有代码, 之后重新完整解析
+                # 删除注释或字符串的定界符也可能使原有的 `define, `ifdef 等变为代码, 因此检查编辑后的整个代码
+                code_stub = lexer.get_code()
+                if self.__preprocessed or "`" in code_stub:
+                    self.__modules = None
+                else:
+                    with self.metrics.phase("module parse"):
+                        self.__modules = self._update_modules(code_stub, offset, removed, len(inserted))
+        self.__code = lexer.code
+        self.__source_hash = None
+        self.metrics.count("edits", len(edits))
+        # -------- 重新选择 module, 更新注释 --------
+        if self.__selection is not None:
+            self.parse_module(*self.__selection)
+        if self.__cmt_lines is not None:
+            self.parse_comment()
+
+    def _update_modules(self, code_stub: str, offset: int, removed: int, inserted_len: int) -> list[dict]:
+        """
+        应用一次编辑后更新 module 列表, 编辑之前和之后的 module 直接复用\n
+        code_stub: str => 编辑后删除了注释和 attribute 的代码\n
+        offset: int => 编辑的起始偏移\n
+        removed: int => 删除的字符数\n
+        inserted_len: int => 插入的字符数\n
+        return: list[dict] => module 的列表
+        """
+        old = self.__modules
+        delta = inserted_len - removed
+        # -------- 编辑之前结束的 module 不受影响 --------
+        i = 0
+        while i < len(old) and old[i]["end"] < offset:
+            i += 1
+        modules = old[:i]
+        pos = old[i - 1]["end"] if i else 0
+        # -------- 编辑位于 module 声明之后时, 复用声明的解析结果, 只重新查找 endmodule --------
+        # 编辑位置之前不会出现新的 endmodule, 因此从编辑位置前一个单词的长度处开始查找
+        if i < len(old) and old[i]["header_end"] <= offset:
+            pos = max(old[i]["header_end"], offset - len("endmodule"))
+            module = dict(old[i], end=self._find_endmodule(code_stub, pos))
+            modules.append(module)
+            pos = module["end"]
+        # -------- 重新解析, 遇到编辑之后的原 module 时复用其余的 module --------
+        old_idx = {x["offset"]: k for k, x in enumerate(old)}
+
+        def resync(start: int) -> list[dict]:
+            old_start = start - delta
+            if old_start <= offset + removed or (k := old_idx.get(old_start)) is None:
+                return None
+            return [
+                dict(x, offset=x["offset"] + delta, header_end=x["header_end"] + delta, end=x["end"] + delta)
+                for x in old[k:]
+            ]
+
+        return modules + self._scan_modules(code_stub, pos, resync)
+
+    # ------------------------------------------------------------------------------
+    # 从简化后的代码中提取 module 声明
+    # ------------------------------------------------------------------------------
+    def _parse_module_header(self, code_stub: str, start: int) -> tuple[dict, int]:
+        """
+        从简化后的代码中提取 module (name, parameters, ports, descriptions)\n
+        code_stub: str => 删除了所有注释和 attribute 的代码\n
+        start: int => module 关键字的偏移\n
+        return: tuple[dict, int] => (name, parameters, ports, 声明不完整时为 None;
+            声明之后的偏移, 声明不完整时为停止解析处的偏移)
+        """
+        # -------- 解析声明 (递归下降, 不回溯) --------
+        header, header_end = VerilogHeaderParser(code_stub, start).parse()
+        if header is None:
+            return None, header_end
+        # -------- 根据 parameter/port 名称所在的行获取 description (预处理时换算为原代码的偏移) --------
+        to_source = self._source_offset
+        get_description = self._index_header_comments(to_source(start), to_source(header_end))
+        parameters = [
+            {
+                "name": x["name"],
+                "type": x["type"],
+                "value": x["value"],
+                "description": get_description(to_source(x["offset"])),
+            }
+            for x in header["parameters"]
+        ]
+        ports = [
+            {
+                "name": x["name"],
+                "direction": x["direction"],
+                "type": x["type"],
+                "description": get_description(to_source(x["offset"])),
+            }
+            for x in header["ports"]
+        ]
+        # -------- 计算 parameter 的值和 port 的位宽 --------
+        parameters, ports = resolve_module(parameters, ports)
+        # -------- 返回数据 --------
+        return {
+            "name": header["name"],
+            "parameters": parameters,
+            "ports": ports,
+        }, header_end
+
+    # ------------------------------------------------------------------------------
+    # 建立 module 声明区域内 "行号 -> 行尾注释" 的索引
+    # ------------------------------------------------------------------------------
+    def _index_header_comments(self, start: int, stop: int):
+        """
+        建立 module 声明区域内 "行号 -> 行尾注释" 的索引, 只扫描一次声明区域\n
+        start: int => 声明区域的起始偏移\n
+        stop: int => 声明区域的结束偏移\n
+        return: Callable[[int], str] => 根据偏移获取该行的行尾注释 (即 description)
+        """
+        lexer = self._get_lexer()
+        # 行尾注释: 行号 -> 注释文本
+        comments = {
+            t.line: re_eol_comment_prefix.sub("", t.text).rstrip()
+            for t in lexer.iter_tokens(start, stop)
+            if t.kind == TK_CMT_EOL
+        }
+        # 声明区域内的换行符的偏移, 用于将偏移转换为行号
+        line_start = lexer.line_of(start)
+        newlines = [m.start() for m in re_newline.finditer(lexer.code, start, stop)]
+
+        def get_description(offset: int) -> str:
+            return comments.get(line_start + bisect_left(newlines, offset), "")
+
+        return get_description
+
+    # ------------------------------------------------------------------------------
+    # parse_comment
+    # ------------------------------------------------------------------------------
+    def parse_comment(self) -> None:
+        """
+        解析注释, 从中提取 [wavedrom 数据, table 数据, 普通文字行]
+        """
+        # -------- 代码未变化时使用缓存的结果 (增量解析时不使用) --------
+        cache_key = None
+        if self.__cmt_lines is None:
+            cache_key = f"comments:{self.source_hash()}"
+            if (cached := self._cache_get(model_cache, cache_key)) is not None:
+                self.__cmt_lines, self.__cmt_stops, self.__cmt_counts, self.comment_items = cached
+                self.has_wavedrom = any(x["type"] == "WaveDrom" for x in self.comment_items)
+                return
+        with self.metrics.phase("comment parse"):
+            self._parse_comment()
+        if cache_key is not None:
+            cached = (self.__cmt_lines, self.__cmt_stops, self.__cmt_counts, self.comment_items)
+            model_cache.put(cache_key, cached)
+        if self.metrics.enabled:
+            self.metrics.count("comment_items", len(self.comment_items))
+            for item in self.comment_items:
+                self.metrics.count(f"comment_items.{item['type']}", 1)
+
+    def _parse_comment(self) -> None:
+        """
+        解析注释, 从中提取 [wavedrom 数据, table 数据, 普通文字行]\n
+        注释按 wave 分段解析, 再次解析时 (编辑之后) 复用未变化的注释行所在的段
+        """
+        # -------- 提取需要 documentation 的注释 --------
+        cmt_lines = self._get_lexer().get_doc_lines()  # 需要文档化的整行注释
+        self.metrics.count("doc_lines", len(cmt_lines))
+        # -------- 找出与上次解析相同的开头和结尾 --------
+        old_lines = self.__cmt_lines or []
+        old_stops, old_counts = self.__cmt_stops, self.__cmt_counts
+        old_items = self.comment_items if self.__cmt_lines is not None else []
+        n_min = min(len(old_lines), len(cmt_lines))
+        prefix = 0  # 相同的开头的行数
+        while prefix < n_min and old_lines[prefix] == cmt_lines[prefix]:
+            prefix += 1
+        suffix = 0  # 相同的结尾的行数
+        while suffix < n_min - prefix and old_lines[-1 - suffix] == cmt_lines[-1 - suffix]:
+            suffix += 1
+        shift = len(cmt_lines) - len(old_lines)
+        # -------- 复用开头的段 (只依赖于其中的注释行) --------
+        # 最后一段不以 wave 结尾, 在其后增加注释行会改变它的解析结果, 因此不复用
+        k = bisect_right(old_stops, prefix, hi=max(len(old_stops) - 1, 0))
+        start = old_stops[k - 1] if k else 0
+        comment_items = old_items[: old_counts[k - 1]] if k else []
+        stops, counts = old_stops[:k], old_counts[:k]
+        # 位于结尾的段的起点: 从这些位置开始的解析结果与上次相同
+        resync = {x: i for i, x in enumerate(old_stops) if x >= len(old_lines) - suffix}
+        # -------- 解析其余的段 --------
+        for stop, items in self._iter_comment_segments(cmt_lines, start):
+            self.metrics.count("comment_segments", 1)
+            comment_items += items
+            stops.append(stop)
+            counts.append(len(comment_items))
+            if (i := resync.get(stop - shift)) is not None:
+                base = len(comment_items) - old_counts[i]
+                comment_items += old_items[old_counts[i] :]
+                stops += [x + shift for x in old_stops[i + 1 :]]
+                counts += [x + base for x in old_counts[i + 1 :]]
+                break
+        # -------- 更新数据 --------
+        self.__cmt_lines = cmt_lines
+        self.__cmt_stops, self.__cmt_counts = stops, counts
+        self.comment_items = comment_items
+        self.has_wavedrom = any(x["type"] == "WaveDrom" for x in comment_items)
+
+    def _iter_comment_segments(self, cmt_lines: list[str], start: int = 0):
+        """
+        从 start 开始逐段解析注释, 每段以 wave 结尾 (最后一段除外)\n
+        逐行的状态机, 每行只判断常数次, 耗时与注释行数成正比\n
+        cmt_lines: list[str] => 需要 documentation 的注释行\n
+        start: int => 起始行索引 (必须是某一段的起点)\n
+        yield: tuple => (该段的结束行索引, 该段的 comment_items 条目)
+        """
+        cmt_line_tot = len(cmt_lines)
+        # -------- 计算缩进 --------
+        def get_doc_indent(text):
+            return get_indent(text, 3) - 3
+
+        # -------- 解析 wavedrom 数据 --------
+        def get_wave(wave_token: str, wave_text: str, indent: int) -> dict:
+            """
+            解析 wavedrom 数据\n
+            wave_token: str => wave 的标记 ("wave", "wavedrom", "wave_yaml", "wave_yml")\n
+            wave_text: str => wave 的文本\n
+            indent: int => 缩进\n
+            return: dict => 解析失败时为 None\n
+                type: str => "WaveDrom",\n
+                data: str of json => 字符表示的 json 数据,\n
+                indent: int => 缩进
+            """
+            # 如果找到 <wavedrom> ... </wavedrom>
+            if wave_token in ("wave", "wavedrom"):
+                wave_text = wave_text.strip()
+                try:
+                    wave_dict = json.loads(wave_text)
+                except json.JSONDecodeError:
+                    # 不是严格的 json 时按宽松的 json 解析 (不加引号的 key, 单引号, 多余的逗号)
+                    try:
+                        wave_dict = loads_relaxed(wave_text)
+                    except (ValueError, RecursionError):
+                        return None
+                except:
+                    return None
+            # 如果找到 <wave_yaml> ... </wave_yaml>
+            else:
+                try:
+                    wave_dict = yaml.load(wave_text, YamlLoader)
+                except:
+                    return None
+            # -------- 返回数据 --------
+            return {
+                "type": "WaveDrom",
+                "data": json.dumps(wave_dict, ensure_ascii=False),
+                "indent": indent,
+            }
+
+        # -------- 解析 table 数据 --------
+        def get_align(x):
+            if len(x) > 2 and x[-1] == ":" and not x[1:-1].strip("-"):
+                if x[0] == ":":
+                    return "center"
+                elif x[0] == "-":
+                    return "right"
+            return "left"
+
+        def get_table(rows: list[str], indent: int) -> dict:
+            """
+            解析 table 数据\n
+            rows: list[str] => 表格的行 (表头, 对齐方式, 表格内容)\n
+            indent: int => 缩进\n
+            return: dict =>\n
+                type: str => "table",\n
+                data: dict => table 数据的各个要素,\n
+                    thead: list of str => 表头文本,\n
+                    align: list of str => 对齐方式 ("left", "center", "right" 之一),\n
+                    tbody: list of list of str => 表格文本\n
+                indent: int => 缩进
+            """
+            thead = [x.strip(" ") for x in re_table_item_split.split(rows[0])]  # 表头项
+            talign = [get_align(x.strip(" ")) for x in re_table_item_split.split(rows[1])]  # 对齐方式
+            tbody = [[x.strip(" ") for x in re_table_item_split.split(row)] for row in rows[2:]]
+            return {
+                "type": "table",
+                "data": {
+                    "thead": thead,
+                    "align": talign,
+                    "tbody": tbody,
+                },
+                "indent": indent,
+            }
+
+        # -------- 普通行 --------
+        def get_line(text: str) -> dict:
+            """
+            text: str => 注释行\n
+            return: dict =>\n
+                type: str => "normal",\n
+                data: str => 文本,\n
+                indent: int => 缩进
+            """
+            return {"type": "normal", "data": text, "indent": get_doc_indent(text)}
+
+        # -------- 状态机 --------
+        # NORMAL: 遇到 wave 开头进入 WAVE, 遇到可能的表头进入 ALIGN, 其余为普通行
+        # ALIGN, BODY: 表头之后应为对齐方式和第一行表格 (缩进与表头相同), 否则表头作为普通行, 从下一行重新判断
+        # TABLE: 表格其余的行, 遇到不是表格的行时结束
+        # WAVE: 收集 wave 文本直到结尾, 没有结尾或解析失败时 wave 中的行作为普通行重新判断
+        NORMAL, ALIGN, BODY, TABLE, WAVE = range(5)
+        state = NORMAL
+        mark = indent = 0  # 当前 table 或 wave 的起始行, 缩进
+        wave_token, wave_lines, rows = "", [], []
+        wave_from = start  # 从此行开始查找 wave 开头 (重新判断的行中不再查找)
+        comment_items = []
+        i = start
+        while True:
+            text = cmt_lines[i] if i < cmt_line_tot else None
+            # -------- wave --------
+            if state == WAVE:
+                if text is None:
+                    # 没有结尾: 其后的行中也没有结尾, 不再查找 wave
+                    state, wave_from, i = NORMAL, cmt_line_tot, mark
+                elif m := re_wave_token_end.search(text):
+                    wave_lines.append(text[indent : m.start()])
+                    state, i = NORMAL, i + 1
+                    if wave_dat := get_wave(wave_token, "".join(wave_lines), indent):
+                        comment_items.append(wave_dat)
+                        yield i, comment_items
+                        comment_items = []
+                    else:
+                        wave_from, i = i, mark
+                else:
+                    wave_lines.append(text[indent:] + "\n")
+                    i += 1
+                continue
+            # -------- table --------
+            if state != NORMAL:
+                if (
+                    text is not None
+                    and (re_table_align if state == ALIGN else re_table_body).search(text)
+                    and get_doc_indent(text) == indent
+                    and not (i >= wave_from and re_wave_token_start.search(text))
+                ):
+                    rows.append(text)
+                    state = BODY if state == ALIGN else TABLE
+                    i += 1
+                    continue
+                if state == TABLE:
+                    comment_items.append(get_table(rows, indent))
+                else:
+                    comment_items.append(get_line(cmt_lines[mark]))
+                    i = mark + 1
+                state = NORMAL
+                continue
+            # -------- 普通行 --------
+            if text is None:
+                break
+            if i >= wave_from and (m := re_wave_token_start.search(text)):
+                state, mark, indent = WAVE, i, get_doc_indent(text)
+                wave_token, wave_lines = m.group("token"), [text[m.end() :]]
+            elif "|" in text and re_table_head.search(text):
+                state, mark, indent, rows = ALIGN, i, get_doc_indent(text), [text]
+            else:
+                comment_items.append(get_line(text))
+            i += 1
+        yield cmt_line_tot, comment_items
+
+    # ------------------------------------------------------------------------------
+    # dump 解析数据
+    # ------------------------------------------------------------------------------
+    def dump_parsed(self, dump_module=True, dump_comment=False):
+        text = ""
+        # dump module
+        if dump_module:
+            text += (
+                "# ------------------------------------------------------------------------------\n"
+            )
+            text += f"module::name = {self.module_name}\n"
+            text += (
+                "# ------------------------------------------------------------------------------\n"
+            )
+            text += f"module::parameters = (see below)\n"
+            for p in self.module_parameters:
+                text += f"\t{p}\n"
+            text += (
+                "# ------------------------------------------------------------------------------\n"
+            )
+            text += f"module::ports = (see below)\n"
+            for p in self.module_ports:
+                text += f"\t{p}\n"
+        # dump commenmts
+        if dump_comment:
+            text += (
+                "# ------------------------------------------------------------------------------\n"
+            )
+            text += f"cmt_lines = (see below)\n"
+            for c in self.comment_items:
+                text += f"\t{c}\n"
+            text += f"cmt_lines::has_wavedrom = {self.has_wavedrom}\n"
+        # dump raw::code
+        text += "\n\n"
+        text += "# ------------------------------------------------------------------------------\n"
+        text += f"raw::verilog_code = (see below)\n"
+        text += f"{self.__code}\n"
+
+        # 写入临时文件
+        return write_to_tmpfile("hyhdl_dump", text, unique=False)
@@ -0,0 +1,458 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     轻量的 verilog 预处理: `define, `undef, `ifdef/`ifndef/`elsif/`else/`endif, `include
+# *         在删除注释后的代码上处理, 解析 module 声明之前展开宏, 删除条件编译中未选中的分支
+# *         保持行结构: 指令和未选中的分支替换为等长的空白, 宏展开和 include 的内容中不含换行
+# *         记录每一段在原代码中的偏移, 解析结果中的偏移 (module 的位置, 行尾注释) 仍对应原代码
+# *     未定义的宏保持原样, 不认识的指令 (`timescale 等) 替换为空白
+# *     include 的文件删除注释后缓存在 include_cache 中 (key 为路径, mtime 和 size), 所有文件共用
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import json
+import os
+import re
+from bisect import bisect_right
+from pathlib import Path
+from typing import NamedTuple
+
+from .util_cache import hash_text, include_cache
+from .VerilogLexer import VerilogLexer, blank
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+_STRING = r'"(?:\\.|[^"\\\n])*"?'  # 字符串 (与 VerilogLexer 相同), 其中的 ` 不处理
+re_pp_token = re.compile(_STRING + r"|`([a-zA-Z_][\w$]*)")  # 指令或宏
+re_pp_conditional = re.compile(_STRING + r"|`(ifdef|ifndef|elsif|else|endif)\b")  # 未选中的分支中只处理条件编译
+# `define NAME(params) body, 行尾的 "\" 表示续行 (删除注释后 "\" 之后可能有空白)
+re_define = re.compile(r"[ \t]+([a-zA-Z_][\w$]*)(?:\(([^)]*)\))?((?:[^\n\\]+|\\[ \t]*\n|\\[^\n])*)")
+re_define_continuation = re.compile(r"\\[ \t]*\n")
+re_directive_name = re.compile(r"\s+([a-zA-Z_][\w$]*)")  # `ifdef/`undef 等之后的宏名称
+re_include = re.compile(r'\s*("[^"\n]*"|<[^>\n]*>)')
+re_macro_args_open = re.compile(r"\s*\(")
+re_macro_args_token = re.compile(_STRING + r"|[(){}\[\],]")
+re_identifier_or_string = re.compile(_STRING + r"|[a-zA-Z_][\w$]*")
+# 不影响 module 声明的指令: 删除到行尾 / 只删除指令本身
+LINE_DIRECTIVES = {
+    "timescale", "default_nettype", "line", "pragma", "begin_keywords", "unconnected_drive",
+    "default_decay_time", "default_trireg_strength",
+}
+WORD_DIRECTIVES = {
+    "resetall", "celldefine", "endcelldefine", "nounconnected_drive", "end_keywords",
+    "delay_mode_distributed", "delay_mode_path", "delay_mode_unit", "delay_mode_zero",
+}
+# 影响解析结果的指令 (与宏展开一样, 编辑后需要重新完整解析)
+EFFECTIVE_DIRECTIVES = {
+    "define", "undef", "undefineall", "include", "ifdef", "ifndef", "elsif", "else", "endif",
+    "__FILE__", "__LINE__",
+}
+MAX_DEPTH = 32  # include 和宏展开的最大嵌套层数 (防止循环 include)
+
+
+# %% ---------------------------------------------------------------------------
+# 结果
+# ------------------------------------------------------------------------------
+class Macro(NamedTuple):
+    """
+    params: list[tuple[str, str]] => 参数 (名称, 默认值), 不带参数的宏为 None\n
+    body: str => 宏的内容 (续行已合并为一行)
+    """
+
+    params: list
+    body: str
+
+
+class SourceMap:
+    """
+    预处理后的代码的偏移 -> 原代码的偏移\n
+    代码分为若干段: 与原代码逐字符对应的段 (代码, 替换为空白的指令和分支), 宏展开或 include 的内容
+    """
+
+    def __init__(self) -> None:
+        self.starts = []  # 每一段在预处理后的代码中的起始偏移
+        self.sources = []  # 每一段在原代码中的起始偏移
+        self.copied = []  # 每一段是否与原代码逐字符对应
+
+    def add(self, start: int, source: int, copied: bool) -> None:
+        """
+        增加一段, 与上一段在原代码中连续时合并\n
+        start: int => 在预处理后的代码中的起始偏移\n
+        source: int => 在原代码中的起始偏移\n
+        copied: bool => 是否与原代码逐字符对应
+        """
+        if copied and self.copied and self.copied[-1] and self.sources[-1] + start - self.starts[-1] == source:
+            return
+        self.starts.append(start)
+        self.sources.append(source)
+        self.copied.append(copied)
+
+    def to_source(self, offset: int) -> int:
+        """
+        offset: int => 预处理后的代码中的偏移\n
+        return: int => 原代码中的偏移, 位于宏展开或 include 的内容中时为宏或指令的偏移
+        """
+        k = bisect_right(self.starts, offset) - 1
+        if k < 0:
+            return offset
+        if self.copied[k]:
+            return self.sources[k] + offset - self.starts[k]
+        return self.sources[k]
+
+
+class PreprocessedCode(NamedTuple):
+    """
+    code: str => 预处理后的代码\n
+    source_map: SourceMap => 偏移的对应关系\n
+    deps: list[tuple] => include 的文件 (路径, mtime_ns, size)\n
+    effective: bool => 是否有影响解析结果的指令 (宏定义, 条件编译, include, 宏展开),
+        只有 `timescale 等指令时为 False
+    """
+
+    code: str
+    source_map: SourceMap
+    deps: list
+    effective: bool
+
+
+# %% ---------------------------------------------------------------------------
+# 工具函数
+# ------------------------------------------------------------------------------
+def parse_defines(items) -> dict:
+    """
+    解析宏定义的列表 (与 -D 和 +define+ 的写法相同)\n
+    items: list[str] => "NAME=VALUE" 或 "NAME" 的列表\n
+    return: dict => 宏名称 -> 宏的内容
+    """
+    defines = {}
+    for item in items or []:
+        name, _, value = str(item).partition("=")
+        if name.strip():
+            defines[name.strip()] = value
+    return defines
+
+
+def deps_unchanged(deps: list) -> bool:
+    """
+    检查 include 的文件是否未变化\n
+    deps: list[tuple] => PreprocessedCode.deps\n
+    return: bool => 所有文件的 mtime 和 size 都未变化时为 True
+    """
+    for path, mtime_ns, size in deps:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if (st.st_mtime_ns, st.st_size) != (mtime_ns, size):
+            return False
+    return True
+
+
+# %% ---------------------------------------------------------------------------
+# VerilogPreprocessor
+# ------------------------------------------------------------------------------
+class VerilogPreprocessor:
+    """
+    verilog 预处理, 宏定义和 include 目录由用户指定 (-D, -I)
+    """
+
+    def __init__(self, defines=None, include_dirs: list = None) -> None:
+        """
+        defines: dict 或 list[str] => 宏名称 -> 宏的内容, 或 "NAME=VALUE" 的列表\n
+        include_dirs: list[str] => 查找 include 文件的目录 (在 include 所在文件的目录之后查找)
+        """
+        self.defines = dict(defines) if isinstance(defines, dict) else parse_defines(defines)
+        self.include_dirs = [str(x) for x in include_dirs or []]
+        # 配置的 hash, 作为解析结果的缓存的 key 的一部分
+        self.fingerprint = hash_text(json.dumps([sorted(self.defines.items()), self.include_dirs]))
+        # 一次预处理的状态
+        self.macros = {}
+        self.deps = []
+        self.effective = False
+
+    # ------------------------------------------------------------------------------
+    # 预处理
+    # ------------------------------------------------------------------------------
+    def process(self, code_stub: str, file: str = None) -> PreprocessedCode:
+        """
+        预处理代码\n
+        code_stub: str => 删除了所有注释和 attribute 的代码\n
+        file: str => 代码所在的文件, 用于查找 include 的文件, None 表示当前目录\n
+        return: PreprocessedCode => 预处理后的代码 (行数与原代码相同), 偏移的对应关系, include 的文件
+        """
+        self.macros = {name: Macro(None, value) for name, value in self.defines.items()}
+        self.deps = []
+        self.effective = False
+        source_map = SourceMap()
+        texts = []
+        pos = 0
+        for text, source, copied in self._process_text(code_stub, file, 0):
+            source_map.add(pos, source, copied)
+            texts.append(text)
+            pos += len(text)
+        return PreprocessedCode("".join(texts), source_map, self.deps, self.effective)
+
+    def _process_text(self, code: str, file: str, depth: int) -> list[tuple]:
+        """
+        预处理一个文件的代码\n
+        code: str => 删除了所有注释和 attribute 的代码\n
+        file: str => 代码所在的文件\n
+        depth: int => include 的嵌套层数\n
+        return: list[tuple] => (文本, 在 code 中的偏移, 是否与 code 逐字符对应) 的列表
+        """
+        pieces = []
+        stack = []  # 条件编译的嵌套: [外层是否选中, 本层是否已有分支被选中]
+        active = True  # 当前分支是否选中
+        pos = 0  # 已输出的偏移
+        scan = 0  # 继续查找的偏移
+        while m := (re_pp_token if active else re_pp_conditional).search(code, scan):
+            scan = m.end()
+            name = m.group(1)
+            if name is None:  # 字符串
+                continue
+            start, end = m.start(), m.end()
+            expansion = None  # 替换指令的文本, None 表示替换为等长的空白
+            if name in EFFECTIVE_DIRECTIVES or name in self.macros:
+                self.effective = True
+            # -------- 条件编译 --------
+            if name in ("ifdef", "ifndef", "elsif", "else", "endif"):
+                defined = False
+                if name not in ("else", "endif") and (m_name := re_directive_name.match(code, end)):
+                    end = m_name.end()
+                    defined = m_name.group(1) in self.macros
+                pieces.append((code[pos:start] if active else blank(code[pos:start]), pos, True))
+                if name in ("ifdef", "ifndef"):
+                    taken = active and defined != (name == "ifndef")
+                    stack.append([active, taken])
+                    active = taken
+                elif not stack:  # 多余的 `elsif/`else/`endif
+                    pass
+                elif name == "elsif":
+                    active = stack[-1][0] and not stack[-1][1] and defined
+                    stack[-1][1] |= active
+                elif name == "else":
+                    active = stack[-1][0] and not stack[-1][1]
+                    stack[-1][1] = True
+                else:
+                    active = stack.pop()[0]
+                pieces.append((blank(code[start:end]), start, True))
+                pos = scan = end
+                continue
+            # -------- 宏定义 --------
+            if name == "define":
+                if m_def := re_define.match(code, end):
+                    end = m_def.end()
+                    self._define(m_def.group(1), m_def.group(2), m_def.group(3))
+            elif name == "undef":
+                if m_name := re_directive_name.match(code, end):
+                    end = m_name.end()
+                    self.macros.pop(m_name.group(1), None)
+            elif name == "undefineall":
+                self.macros.clear()
+            # -------- include --------
+            elif name == "include":
+                if m_inc := re_include.match(code, end):
+                    end = m_inc.end()
+                    expansion = self._include(m_inc.group(1)[1:-1], file, depth)
+            # -------- 其他指令 --------
+            elif name in LINE_DIRECTIVES:
+                end = code.find("\n", end)
+                end = len(code) if end < 0 else end
+            elif name in WORD_DIRECTIVES:
+                pass
+            elif name == "__FILE__":
+                expansion = json.dumps(str(file or ""))
+            elif name == "__LINE__":
+                expansion = str(code.count("\n", 0, start) + 1)
+            # -------- 宏 --------
+            elif name in self.macros:
+                expansion, end = self._expand_macro(code, name, end, 0, frozenset())
+                if expansion is None:
+                    continue
+            else:  # 未定义的宏保持原样
+                continue
+            pieces.append((code[pos:start], pos, True))
+            directive = code[start:end]
+            if expansion is None:
+                pieces.append((blank(directive), start, True))
+            else:
+                # 展开的内容放在一行中, 之后补上指令占用的换行, 保持行结构
+                pieces.append((expansion.replace("\n", " ") + "\n" * directive.count("\n"), start, False))
+            pos = scan = end
+        pieces.append((code[pos:] if active else blank(code[pos:]), pos, True))
+        return pieces
+
+    # ------------------------------------------------------------------------------
+    # 宏
+    # ------------------------------------------------------------------------------
+    def _define(self, name: str, params: str, body: str) -> None:
+        """
+        定义宏\n
+        name: str => 宏名称\n
+        params: str => 参数列表 (括号之内的文本), 不带参数时为 None\n
+        body: str => 宏的内容 (包含续行)
+        """
+        if params is not None:
+            params = [
+                (p_name.strip(), default.strip() if sep else None)
+                for p_name, sep, default in (x.partition("=") for x in params.split(","))
+            ]
+            params = [x for x in params if x[0]]
+        self.macros[name] = Macro(params, re_define_continuation.sub(" ", body).strip())
+
+    def _expand_macro(self, code: str, name: str, pos: int, depth: int, expanding: frozenset) -> tuple[str, int]:
+        """
+        展开一个宏 (包括其中的宏)\n
+        code: str => 代码\n
+        name: str => 宏名称\n
+        pos: int => 宏名称之后的偏移 (带参数的宏从这里读取参数)\n
+        depth: int => 宏展开的嵌套层数\n
+        expanding: frozenset => 正在展开的宏, 宏中再次使用时不展开 (防止无限递归)\n
+        return: tuple[str, int] => (展开的文本, 宏 (及参数) 之后的偏移), 不能展开时为 (None, pos)
+        """
+        macro = self.macros[name]
+        if depth >= MAX_DEPTH or name in expanding:
+            return None, pos
+        body = macro.body
+        if macro.params is not None:
+            if not (m_open := re_macro_args_open.match(code, pos)):
+                return None, pos
+            values, end = self._read_macro_args(code, m_open.end())
+            if values is None:
+                return None, pos
+            args = {}
+            for k, (p_name, default) in enumerate(macro.params):
+                value = values[k].strip() if k < len(values) else ""
+                args[p_name] = self._expand_text(value, depth + 1, expanding) if value else default or ""
+            body = re_identifier_or_string.sub(lambda m: args.get(m.group(), m.group()), body)
+            pos = end
+        body = body.replace("``", "").replace('`"', '"')
+        return self._expand_text(body, depth + 1, expanding | {name}), pos
+
+    @staticmethod
+    def _read_macro_args(code: str, pos: int) -> tuple[list[str], int]:
+        """
+        读取宏的参数\n
+        code: str => 代码\n
+        pos: int => "(" 之后的偏移\n
+        return: tuple[list[str], int] => (参数的文本, ")" 之后的偏移), 没有 ")" 时为 (None, pos)
+        """
+        values = []
+        depth = 0
+        start = pos
+        for m in re_macro_args_token.finditer(code, pos):
+            token = m.group()
+            if token[0] == '"':
+                continue
+            if token in "([{":
+                depth += 1
+            elif token in ")]}":
+                if depth == 0:
+                    values.append(code[start : m.start()])
+                    return values, m.end()
+                depth -= 1
+            elif depth == 0:  # ","
+                values.append(code[start : m.start()])
+                start = m.end()
+        return None, pos
+
+    def _expand_text(self, text: str, depth: int, expanding: frozenset) -> str:
+        """
+        展开文本 (宏的内容或参数) 中的宏\n
+        text: str => 文本\n
+        depth: int => 宏展开的嵌套层数\n
+        expanding: frozenset => 正在展开的宏\n
+        return: str => 展开后的文本
+        """
+        if "`" not in text:
+            return text
+        parts = []
+        pos = scan = 0
+        while m := re_pp_token.search(text, scan):
+            scan = m.end()
+            if (name := m.group(1)) is None or name not in self.macros:
+                continue
+            expansion, end = self._expand_macro(text, name, m.end(), depth, expanding)
+            if expansion is None:
+                continue
+            parts += (text[pos : m.start()], expansion)
+            pos = scan = end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    # ------------------------------------------------------------------------------
+    # include
+    # ------------------------------------------------------------------------------
+    def _include(self, name: str, file: str, depth: int) -> str:
+        """
+        预处理 include 的文件 (其中的宏定义在之后的代码中有效)\n
+        name: str => include 的文件名\n
+        file: str => include 所在的文件\n
+        depth: int => include 的嵌套层数\n
+        return: str => 预处理后的代码, 找不到文件时为空
+        """
+        if depth >= MAX_DEPTH or (path := self._find_include(name, file)) is None:
+            return ""
+        code_stub = self._read_include(path)
+        return "".join(x[0] for x in self._process_text(code_stub, path, depth + 1))
+
+    def _find_include(self, name: str, file: str) -> str:
+        """
+        查找 include 的文件: 依次在 include 所在文件的目录, include 目录中查找\n
+        name: str => include 的文件名\n
+        file: str => include 所在的文件, None 表示当前目录\n
+        return: str => 文件的绝对路径, 找不到时为 None
+        """
+        dirs = [Path(file).parent if file else Path(".")] + [Path(x) for x in self.include_dirs]
+        for directory in dirs:
+            path = directory.joinpath(name)
+            if path.is_file():
+                return os.path.abspath(path)
+        return None
+
+    def _read_include(self, path: str) -> str:
+        """
+        读取 include 的文件并删除注释, 文件未变化时使用缓存的结果\n
+        path: str => 文件的绝对路径\n
+        return: str => 删除了所有注释和 attribute 的代码
+        """
+        st = os.stat(path)
+        self.deps.append((path, st.st_mtime_ns, st.st_size))
+        key = hash_text("include", path, str(st.st_mtime_ns), str(st.st_size))
+        if (code_stub := include_cache.get(key)) is None:
+            with open(path, "r", encoding="utf-8", errors="replace") as fp:
+                code_stub = VerilogLexer(fp.read()).get_code()
+            include_cache.put(key, code_stub)
+        return code_stub
+
+
+# %% ---------------------------------------------------------------------------
+# 全局的预处理配置 (-D, -I)
+# ------------------------------------------------------------------------------
+_preprocessor = VerilogPreprocessor()
+
+
+def set_preprocessor(defines=None, include_dirs: list = None) -> None:
+    """
+    设置解析所有文件时使用的宏定义和 include 目录\n
+    defines: dict 或 list[str] => 宏名称 -> 宏的内容, 或 "NAME=VALUE" 的列表\n
+    include_dirs: list[str] => 查找 include 文件的目录
+    """
+    global _preprocessor
+    _preprocessor = VerilogPreprocessor(defines, include_dirs)
+
+
+def get_preprocessor() -> VerilogPreprocessor:
+    """
+    return: VerilogPreprocessor => 当前的预处理配置
+    """
+    return _preprocessor
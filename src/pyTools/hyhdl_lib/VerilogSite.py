@@ -0,0 +1,181 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     由多个 verilog 文件生成静态文档站点
+# *         每个 module 一个页面, 首页 (index.html) 列出所有 module
+# *         wavedrom 的脚本和主题只写入一次 (assets/), 各页面引用, 不再内嵌
+# *         页面中出现的其他 module 的名称链接到其页面
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import re
+import shutil
+from pathlib import Path
+
+from .VerilogDocumentor import VerilogDocumentor
+from .util_asset import get_wavedrom_assets
+from .util_file import get_template
+from .util_metrics import NULL_METRICS, Metrics
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+ASSET_DIR = "assets"  # 共享资源的目录 (相对于站点根目录)
+INDEX_PAGE = "index.html"
+# 切分 html: 标签, <script> 和 <svg> 不添加链接, 只处理其间的文本
+re_html_split = re.compile(r"(<script\b.*?</script>|<svg\b.*?</svg>|<[^>]*>)", re.S | re.I)
+
+
+# %% ---------------------------------------------------------------------------
+# VerilogSite
+# ------------------------------------------------------------------------------
+class VerilogSite:
+    """
+    由多个 verilog 文件生成静态文档站点
+    """
+
+    def __init__(
+        self,
+        pytools_dir: str,
+        metrics: Metrics = None,
+        skin: str = None,
+        wave_svg: bool = False,
+        diagram: str = None,
+    ) -> None:
+        """
+        pytools_dir: str => pyTools 的路径\n
+        metrics: Metrics => 记录各阶段的耗时, None 表示不记录\n
+        skin: str => wavedrom 的主题, None 表示默认主题\n
+        wave_svg: bool => 是否将 wave 直接转换为 svg, 所有 wave 都可以转换时不再写入 wavedrom 的脚本\n
+        diagram: str => 框图的模式 ("auto", "full", "summary"), None 表示 auto
+        """
+        self.__pytools_dir = Path(pytools_dir)
+        self.metrics = metrics or NULL_METRICS
+        self.skin = skin
+        self.wave_svg = wave_svg
+        self.diagram = diagram
+        self.__assets = get_wavedrom_assets(pytools_dir, skin)  # 主题不存在时尽早报错
+        # 页面: dict(name, page, path, documentor), 同一文件中的 module 共享 documentor
+        self.pages = []
+
+    # ------------------------------------------------------------------------------
+    # 增加文件
+    # ------------------------------------------------------------------------------
+    def add_file(self, verilog_file: str) -> int:
+        """
+        解析文件, 为其中的每个 module 增加一个页面 (同名 module 的页面名增加序号)\n
+        verilog_file: str => verilog 文件路径\n
+        return: int => 增加的页面数
+        """
+        documentor = VerilogDocumentor(
+            verilog_file, self.__pytools_dir, metrics=self.metrics, diagram=self.diagram
+        )
+        names = [x["name"] for x in documentor.parse_modules()]
+        used = {x["page"] for x in self.pages}
+        for name in names:
+            page, k = f"{name}.html", 2
+            while page in used:
+                page, k = f"{name}_{k}.html", k + 1
+            used.add(page)
+            self.pages.append(
+                {"name": name, "page": page, "path": str(verilog_file), "documentor": documentor}
+            )
+        return len(names)
+
+    # ------------------------------------------------------------------------------
+    # 链接其他 module
+    # ------------------------------------------------------------------------------
+    def _get_linker(self, links: dict[str, str]):
+        """
+        生成为 html 中出现的 module 名称添加链接的函数\n
+        links: dict[str, str] => module 名称 -> 页面\n
+        return: Callable[[str, str], str] => linker(html, 当前 module 的名称)
+        """
+        if not links:
+            return lambda html, current: html
+        # 较长的名称优先匹配
+        names = sorted(links, key=len, reverse=True)
+        re_names = re.compile(r"\b(" + "|".join(map(re.escape, names)) + r")\b")
+
+        def link(m: re.Match, current: str) -> str:
+            name = m.group()
+            return name if name == current else f'<a href="{links[name]}">{name}</a>'
+
+        def linker(html: str, current: str) -> str:
+            parts = re_html_split.split(html)
+            parts[0::2] = [re_names.sub(lambda m: link(m, current), x) for x in parts[0::2]]
+            return "".join(parts)
+
+        return linker
+
+    # ------------------------------------------------------------------------------
+    # 写入站点
+    # ------------------------------------------------------------------------------
+    def write(self, out_dir: str, title: str = "Modules") -> dict:
+        """
+        将所有页面, 共享资源和首页写入目录\n
+        out_dir: str => 输出目录\n
+        title: str => 首页的标题\n
+        return: dict => 统计信息 (pages, assets, bytes)
+        """
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        template = self.__pytools_dir.joinpath("exportTemplate.html")
+        links = {}
+        for x in self.pages:
+            links.setdefault(x["name"], x["page"])
+        linker = self._get_linker(links)
+        stats = {"pages": 0, "assets": 0, "bytes": 0}
+        has_wavedrom = False
+        modules = []
+        # -------- 页面 --------
+        for x in self.pages:
+            documentor = x["documentor"]
+            documentor.parse_module(x["name"])
+            text = documentor.get_site_html(
+                template,
+                ASSET_DIR,
+                INDEX_PAGE,
+                lambda html: linker(html, x["name"]),
+                self.skin,
+                self.wave_svg,
+            )
+            with self.metrics.phase("write"):
+                out_dir.joinpath(x["page"]).write_text(text, encoding="utf-8")
+            stats["pages"] += 1
+            stats["bytes"] += len(text.encode("utf-8"))
+            has_wavedrom = has_wavedrom or documentor.needs_wavedrom_js(self.wave_svg, self.skin)
+            modules.append(
+                {
+                    "name": x["name"],
+                    "href": x["page"],
+                    "path": x["path"],
+                    "parameters": len(documentor.module_parameters),
+                    "ports": len(documentor.module_ports),
+                }
+            )
+        # -------- 共享资源 (只写入一次) --------
+        if has_wavedrom:
+            with self.metrics.phase("write"):
+                out_dir.joinpath(ASSET_DIR).mkdir(exist_ok=True)
+                for src in self.__assets:
+                    dst = out_dir.joinpath(ASSET_DIR, src.name)
+                    shutil.copyfile(src, dst)
+                    stats["assets"] += 1
+                    stats["bytes"] += dst.stat().st_size
+        # -------- 首页 --------
+        with self.metrics.phase("template render"):
+            tmpl = get_template(self.__pytools_dir.joinpath("siteIndexTemplate.html"))
+            text = tmpl.render(title=title, modules=sorted(modules, key=lambda x: x["name"]))
+        with self.metrics.phase("write"):
+            out_dir.joinpath(INDEX_PAGE).write_text(text, encoding="utf-8")
+        stats["bytes"] += len(text.encode("utf-8"))
+        return stats
@@ -0,0 +1,488 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     将 wavedrom 数据直接转换为 svg, 生成的 html 不再需要在浏览器中运行 wavedrom.min.js
+# *     支持常用的子集:
+# *         signal: 信号 (name, wave, data, period, phase, node), 分组 (list), 空行 ({})
+# *         wave:   0 1 h l H L z u d (电平), p P n N (时钟), = 2-9 x (数据), . | (延续, 间断)
+# *         edge:   - ~ -~ ~- -| |- -|- 及两端的 < >, 以及标签
+# *         head/foot: text, tick/tock; config: hscale
+# *     不支持的数据抛出 ValueError, 由调用者改为在浏览器中使用 wavedrom.min.js 渲染
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import json
+import re
+from html import escape
+
+from .util_cache import code_version, hash_text, wave_cache
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+# -------- 尺寸 --------
+TICK_W = 40  # 一个周期的宽度 (hscale = 1)
+LANE_H = 30  # 每个信号占用的高度
+WAVE_TOP = 5  # 信号的高电平在该行中的位置
+WAVE_BOT = 25  # 信号的低电平在该行中的位置
+SLOPE = 3  # 电平跳变的水平宽度
+GROUP_W = 14  # 每一级分组占用的宽度
+CHAR_W = 7  # 估算文本宽度时每个字符的宽度
+HEAD_H = 20  # head/foot 的文本, tick/tock 各占用的高度
+MAX_CYCLES = 2048  # 周期数 (每个信号的 wave 的字符数) 的上限, 超过时由 wavedrom.min.js 渲染 (每个周期一条网格线)
+MAX_ROWS = 2048  # 信号数的上限
+FONT = 'font-family="Helvetica, Arial, sans-serif" font-size="11"'
+EDGE_COLOR = "#0041c4"
+# -------- wave 字符 --------
+LEVEL_Y = {  # 电平: 在行中的位置
+    "0": WAVE_BOT,
+    "1": WAVE_TOP,
+    "l": WAVE_BOT,
+    "h": WAVE_TOP,
+    "L": WAVE_BOT,
+    "H": WAVE_TOP,
+    "d": WAVE_BOT,
+    "u": WAVE_TOP,
+    "z": (WAVE_TOP + WAVE_BOT) / 2,
+}
+CLOCKS = "pPnN"  # 时钟: 每个周期都有跳变
+BOX_FILL = {  # 数据: 填充的颜色 (与 wavedrom 的 default 主题一致)
+    "=": "#fff",
+    "2": "#fff",
+    "3": "#ffffb4",
+    "4": "#ffe0b9",
+    "5": "#b9e0ff",
+    "6": "#ccfdfe",
+    "7": "#cdfdc5",
+    "8": "#f0c1fb",
+    "9": "#f5c2c0",
+}
+# 各主题对应的水平缩放和是否使用彩色
+SKIN_STYLE = {
+    "default": (1.0, True),
+    "narrow": (0.5, True),
+    "lowkey": (1.0, False),
+}
+# -------- 支持的字段 --------
+WAVE_KEYS = {"signal", "edge", "config", "head", "foot"}
+LANE_KEYS = {"name", "wave", "data", "period", "phase", "node"}
+re_edge = re.compile(r"^\s*([^-~|<>\s])(<?)(-\|-|-\||\|-|-~|~-|-|~)(>?)([^-~|<>\s])\s*(.*)$")
+
+
+# %% ---------------------------------------------------------------------------
+# 工具函数
+# ------------------------------------------------------------------------------
+def num(x: float) -> str:
+    """
+    svg 中的数值 (保留 1 位小数, 去掉多余的 0)\n
+    x: float => 数值\n
+    return: str => 文本
+    """
+    return f"{round(x, 1):g}"
+
+
+def text_width(text: str) -> float:
+    """
+    估算文本的宽度 (全角字符按 2 个字符计算)\n
+    text: str => 文本\n
+    return: float => 宽度
+    """
+    return sum(2 if ord(c) > 0x2E7F else 1 for c in text) * CHAR_W
+
+
+def render_wave_svg(data: str, skin: str = None) -> str:
+    """
+    将 wavedrom 数据转换为 svg (结果按数据的 hash 缓存)\n
+    data: str => json 格式的 wavedrom 数据\n
+    skin: str => wavedrom 的主题, None 表示默认主题\n
+    return: str => svg 文本, 含有不支持的内容时为 ""
+    """
+    key = hash_text("wave", code_version(), data, skin or "")
+    if (svg := wave_cache.get(key)) is None:
+        try:
+            # svg 中的 id 只由数据决定, 同一数据生成的 svg 总是相同
+            svg = WaveRenderer(json.loads(data), skin).render(hash_text(data, skin or "")[:8])
+        except (ValueError, TypeError, KeyError, AttributeError, OverflowError):
+            svg = ""
+        wave_cache.put(key, svg)
+    return svg
+
+
+# %% ---------------------------------------------------------------------------
+# WaveRenderer
+# ------------------------------------------------------------------------------
+class WaveRenderer:
+    """
+    将一个 wavedrom 数据转换为 svg
+    """
+
+    def __init__(self, wave: dict, skin: str = None) -> None:
+        """
+        wave: dict => wavedrom 数据 (signal, edge, config, head, foot)\n
+        skin: str => wavedrom 的主题, None 表示默认主题
+        """
+        if not isinstance(wave, dict) or not isinstance(wave.get("signal"), list):
+            raise ValueError("signal is required")
+        if unknown := set(wave) - WAVE_KEYS:
+            raise ValueError(f"unsupported keys: {unknown}")
+        config = wave.get("config") or {}
+        if set(config) - {"hscale"}:
+            raise ValueError(f"unsupported config: {config}")
+        scale, self.colored = SKIN_STYLE.get(skin or "default", SKIN_STYLE["default"])
+        self.tick_w = TICK_W * scale * float(config.get("hscale", 1))
+        self.wave = wave
+        self.rows = []  # 信号: (lane, 分组的级数)
+        self.groups = []  # 分组: (名称, 级数, 起始行, 结束行)
+        self._walk(wave["signal"], 0)
+        self.head = self._get_head(wave.get("head"), "tick")
+        self.foot = self._get_head(wave.get("foot"), "tock")
+
+    # -------- 展开分组 --------
+    def _walk(self, items: list, depth: int) -> None:
+        for item in items:
+            if isinstance(item, list):
+                name = item[0] if item and isinstance(item[0], str) else ""
+                first = len(self.rows)
+                self._walk(item[1:] if item and isinstance(item[0], str) else item, depth + 1)
+                self.groups.append((name, depth, first, len(self.rows)))
+            elif isinstance(item, dict):
+                if unknown := set(item) - LANE_KEYS:
+                    raise ValueError(f"unsupported lane keys: {unknown}")
+                if len(self.rows) >= MAX_ROWS or len(item.get("wave", "")) > MAX_CYCLES:
+                    raise ValueError("too many signals or cycles")
+                self.rows.append((item, depth))
+            else:
+                raise ValueError(f"unsupported signal item: {item!r}")
+
+    @staticmethod
+    def _get_head(head: dict, tick_key: str) -> tuple:
+        """
+        head/foot 的文本和 tick/tock 的起始值\n
+        return: tuple => (文本, tick 的起始值; 不显示时为 None)
+        """
+        if head is None:
+            return "", None
+        if not isinstance(head, dict) or set(head) - {"text", tick_key}:
+            raise ValueError(f"unsupported head/foot: {head}")
+        text = head.get("text", "")
+        if not isinstance(text, str):
+            raise ValueError("only plain text is supported in head/foot")
+        tick = head.get(tick_key)
+        return text, None if tick is None else int(tick)
+
+    # ------------------------------------------------------------------------------
+    # 生成 svg
+    # ------------------------------------------------------------------------------
+    def render(self, uid: str = "w") -> str:
+        """
+        生成 svg\n
+        uid: str => svg 中 id 的后缀, 同一页面中的多个 svg 不能重复\n
+        return: str => svg 文本
+        """
+        depth = max((d for _, d, _, _ in self.groups), default=-1) + 1
+        name_w = max((text_width(str(lane.get("name", ""))) for lane, _ in self.rows), default=0)
+        self.x0 = depth * GROUP_W + name_w + 10  # 波形的起始位置
+        cycles = max((self._cycles(lane) for lane, _ in self.rows), default=0)
+        if cycles > MAX_CYCLES:
+            raise ValueError(f"too many cycles: {cycles}")
+        wave_w = cycles * self.tick_w
+        head_h = HEAD_H * (bool(self.head[0]) + (self.head[1] is not None))
+        foot_h = HEAD_H * (bool(self.foot[0]) + (self.foot[1] is not None))
+        self.y0 = head_h
+        width = self.x0 + wave_w + 10
+        height = head_h + len(self.rows) * LANE_H + foot_h + 5
+        self.uid = uid
+        self.nodes = {}
+        out = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{num(width)}" height="{num(height)}" '
+            f'viewBox="0 0 {num(width)} {num(height)}" class="wavedrom-svg">',
+            self._defs(wave_w),
+            f"<g {FONT}>",
+        ]
+        # -------- 网格 --------
+        for k in range(cycles + 1):
+            x = num(self.x0 + k * self.tick_w)
+            out.append(
+                f'<line x1="{x}" y1="{num(self.y0)}" x2="{x}" y2="{num(self.y0 + len(self.rows) * LANE_H)}" '
+                f'stroke="#ddd" stroke-dasharray="2,2"/>'
+            )
+        # -------- head, foot --------
+        out += self._draw_head(self.head, cycles, 0, True)
+        out += self._draw_head(self.foot, cycles, self.y0 + len(self.rows) * LANE_H, False)
+        # -------- 分组 --------
+        for name, d, first, stop in self.groups:
+            if stop <= first:
+                continue
+            x = d * GROUP_W + 5
+            y1, y2 = self.y0 + first * LANE_H + 3, self.y0 + stop * LANE_H - 3
+            out.append(
+                f'<path d="M{num(x + 4)},{num(y1)} h-4 V{num(y2)} h4" fill="none" stroke="#666"/>'
+            )
+            if name:
+                ym = (y1 + y2) / 2
+                out.append(
+                    f'<text x="{num(x + 8)}" y="{num(ym)}" text-anchor="middle" '
+                    f'transform="rotate(-90 {num(x + 8)} {num(ym)})">{escape(name)}</text>'
+                )
+        # -------- 信号 --------
+        for row, (lane, _) in enumerate(self.rows):
+            top = self.y0 + row * LANE_H
+            if name := str(lane.get("name", "")):
+                out.append(
+                    f'<text x="{num(self.x0 - 8)}" y="{num(top + LANE_H / 2 + 4)}" '
+                    f'text-anchor="end">{escape(name)}</text>'
+                )
+            if lane.get("wave"):
+                out.append(f'<g clip-path="url(#clip-{uid})">')
+                out += self._draw_lane(lane, top)
+                out.append("</g>")
+            self._add_nodes(lane, top)
+        # -------- edge --------
+        for edge in self.wave.get("edge") or []:
+            out += self._draw_edge(edge)
+        out.append("</g>\n</svg>")
+        return "\n".join(out)
+
+    def _defs(self, wave_w: float) -> str:
+        uid = self.uid
+        return (
+            "<defs>"
+            f'<clipPath id="clip-{uid}"><rect x="{num(self.x0)}" y="0" width="{num(wave_w)}" '
+            f'height="100%"/></clipPath>'
+            f'<pattern id="hatch-{uid}" width="4" height="4" patternUnits="userSpaceOnUse" '
+            f'patternTransform="rotate(45)"><rect width="4" height="4" fill="#fff"/>'
+            f'<line x1="0" y1="0" x2="0" y2="4" stroke="#888" stroke-width="1.5"/></pattern>'
+            f'<marker id="arrow-{uid}" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" '
+            f'markerHeight="6" orient="auto-start-reverse"><path d="M0,0 L10,5 L0,10 z" '
+            f'fill="{EDGE_COLOR}"/></marker>'
+            "</defs>"
+        )
+
+    def _draw_head(self, head: tuple, cycles: int, top: float, is_head: bool) -> list:
+        """
+        绘制 head 或 foot: head 的 tick 位于文本下方, foot 的 tock 位于文本上方\n
+        head: tuple => (文本, tick 的起始值)\n
+        cycles: int => 周期数\n
+        top: float => 起始位置\n
+        is_head: bool => 是否为 head\n
+        return: list[str] => svg 元素
+        """
+        text, tick = head
+        out = []
+        rows = ([text] if text else []) + (["tick"] if tick is not None else [])
+        if not is_head:
+            rows.reverse()
+        for k, item in enumerate(rows):
+            y = top + k * HEAD_H + 14
+            if item == "tick":
+                for c in range(cycles + 1):
+                    out.append(
+                        f'<text x="{num(self.x0 + c * self.tick_w)}" y="{num(y)}" '
+                        f'text-anchor="middle" fill="#888">{tick + c}</text>'
+                    )
+            else:
+                out.append(
+                    f'<text x="{num(self.x0 + cycles * self.tick_w / 2)}" y="{num(y)}" '
+                    f'text-anchor="middle" font-weight="bold">{escape(item)}</text>'
+                )
+        return out
+
+    # ------------------------------------------------------------------------------
+    # 信号
+    # ------------------------------------------------------------------------------
+    @staticmethod
+    def _period(lane: dict) -> float:
+        period = float(lane.get("period", 1))
+        if period <= 0:
+            raise ValueError(f"invalid period: {period}")
+        return period
+
+    def _cycles(self, lane: dict) -> int:
+        """
+        信号占用的周期数 (向上取整)
+        """
+        span = len(lane.get("wave", "")) * self._period(lane) - float(lane.get("phase", 0))
+        return max(int(-(-span // 1)), 0)
+
+    def _lane_x(self, lane: dict, idx: float) -> float:
+        """
+        wave 中第 idx 个字符的起始位置
+        """
+        return self.x0 + (idx * self._period(lane) - float(lane.get("phase", 0))) * self.tick_w
+
+    @staticmethod
+    def _segments(wave: str) -> list:
+        """
+        将 wave 切分为段: "." 和 "|" 延续前一段\n
+        return: list => [字符, 起始索引, 结束索引, 间断的索引列表]
+        """
+        segments = []
+        for idx, ch in enumerate(wave):
+            if ch in ".|":
+                if not segments:
+                    segments.append(["x", idx, idx, []])
+                segments[-1][2] = idx + 1
+                if ch == "|":
+                    segments[-1][3].append(idx)
+            elif ch in LEVEL_Y or ch in CLOCKS or ch in BOX_FILL or ch == "x":
+                segments.append([ch, idx, idx + 1, []])
+            else:
+                raise ValueError(f"unsupported wave character: {ch!r}")
+        return segments
+
+    def _draw_lane(self, lane: dict, top: float) -> list:
+        """
+        绘制一个信号的波形\n
+        lane: dict => 信号\n
+        top: float => 该行的起始位置\n
+        return: list[str] => svg 元素
+        """
+        wave = str(lane["wave"])
+        data = lane.get("data", [])
+        if isinstance(data, str):
+            data = data.split()
+        data = iter(str(x) for x in data)
+        y_hi, y_lo, y_mid = top + WAVE_TOP, top + WAVE_BOT, top + (WAVE_TOP + WAVE_BOT) / 2
+        cycle_w = self._period(lane) * self.tick_w
+        segments = self._segments(wave)
+        out = []
+        gaps = []
+        prev_y = None  # 前一段结束处的电平, 数据段为 None
+        for k, (ch, i0, i1, seg_gaps) in enumerate(segments):
+            x0, x1 = self._lane_x(lane, i0), self._lane_x(lane, i1)
+            gaps += [self._lane_x(lane, i + 0.5) for i in seg_gaps]
+            nxt = segments[k + 1][0] if k + 1 < len(segments) else ""
+            # -------- 电平 --------
+            if ch in LEVEL_Y:
+                y = top + LEVEL_Y[ch]
+                dash = ' stroke-dasharray="3,2"' if ch in "ud" else ""
+                if prev_y is not None and prev_y != y:
+                    d = f"M{num(x0)},{num(prev_y)} L{num(x0 + SLOPE)},{num(y)}"
+                else:
+                    d = f"M{num(x0)},{num(y)}"
+                out.append(f'<path d="{d} L{num(x1)},{num(y)}" fill="none" stroke="#000"{dash}/>')
+                if ch in "HL" and prev_y is not None and prev_y != y:
+                    out.append(self._arrow(x0 + SLOPE / 2, y_mid, up=ch == "H"))
+                prev_y = y
+            # -------- 时钟 --------
+            elif ch in CLOCKS:
+                first_hi = ch in "pP"
+                a, b = (y_hi, y_lo) if first_hi else (y_lo, y_hi)
+                d = f"M{num(x0)},{num(b if prev_y is None else prev_y)}"
+                arrows = []
+                for c in range(round((x1 - x0) / cycle_w)):
+                    cx, hx = x0 + c * cycle_w, x0 + (c + 0.5) * cycle_w
+                    d += f" L{num(cx)},{num(a)} L{num(hx)},{num(a)} L{num(hx)},{num(b)} L{num(cx + cycle_w)},{num(b)}"
+                    if ch in "PN":
+                        arrows.append(self._arrow(cx, y_mid, up=ch == "P"))
+                out.append(f'<path d="{d}" fill="none" stroke="#000"/>')
+                out += arrows
+                prev_y = b
+            # -------- 数据 --------
+            else:
+                y_start = y_mid if prev_y is None else prev_y
+                if nxt in LEVEL_Y:
+                    y_end = top + LEVEL_Y[nxt]
+                elif nxt in CLOCKS:
+                    y_end = y_lo if nxt in "pP" else y_hi
+                else:
+                    y_end = y_mid
+                s = min(SLOPE, (x1 - x0) / 2)
+                points = [
+                    (x0, y_start), (x0 + s, y_hi), (x1 - s, y_hi),
+                    (x1, y_end), (x1 - s, y_lo), (x0 + s, y_lo),
+                ]
+                if ch == "x":
+                    fill = f"url(#hatch-{self.uid})"
+                else:
+                    fill = BOX_FILL[ch] if self.colored else "#fff"
+                out.append(
+                    f'<polygon points="{" ".join(f"{num(x)},{num(y)}" for x, y in points)}" '
+                    f'fill="{fill}" stroke="#000"/>'
+                )
+                if ch != "x" and (text := next(data, "")):
+                    out.append(
+                        f'<text x="{num((x0 + x1) / 2)}" y="{num(y_mid + 4)}" '
+                        f'text-anchor="middle">{escape(text)}</text>'
+                    )
+                prev_y = None if nxt not in LEVEL_Y and nxt not in CLOCKS else y_end
+        # -------- 间断 --------
+        for x in gaps:
+            out.append(
+                f'<path d="M{num(x - 4)},{num(y_lo + 3)} L{num(x)},{num(y_hi - 3)} '
+                f'L{num(x + 4)},{num(y_hi - 3)} L{num(x)},{num(y_lo + 3)} z" fill="#fff" stroke="none"/>'
+                f'<path d="M{num(x - 4)},{num(y_lo + 3)} L{num(x)},{num(y_hi - 3)} '
+                f'M{num(x)},{num(y_lo + 3)} L{num(x + 4)},{num(y_hi - 3)}" fill="none" stroke="#000"/>'
+            )
+        return out
+
+    @staticmethod
+    def _arrow(x: float, y: float, up: bool) -> str:
+        d = -1 if up else 1
+        return (
+            f'<path d="M{num(x - 3)},{num(y - 3 * d)} L{num(x + 3)},{num(y - 3 * d)} '
+            f'L{num(x)},{num(y + 3 * d)} z" fill="#000"/>'
+        )
+
+    # ------------------------------------------------------------------------------
+    # edge
+    # ------------------------------------------------------------------------------
+    def _add_nodes(self, lane: dict, top: float) -> None:
+        for idx, ch in enumerate(str(lane.get("node", ""))):
+            if ch != ".":
+                self.nodes[ch] = (self._lane_x(lane, idx), top + LANE_H / 2)
+
+    def _draw_edge(self, edge: str) -> list:
+        """
+        绘制两个 node 之间的连线\n
+        edge: str => 例如 "a~>b label"\n
+        return: list[str] => svg 元素
+        """
+        if not (m := re_edge.match(str(edge))):
+            raise ValueError(f"unsupported edge: {edge!r}")
+        src, arrow_start, shape, arrow_end, dst, label = m.groups()
+        if src not in self.nodes or dst not in self.nodes:
+            return []  # 与 wavedrom 一致, 忽略不存在的 node
+        (ax, ay), (bx, by) = self.nodes[src], self.nodes[dst]
+        dx = bx - ax
+        mx = (ax + bx) / 2
+        match shape:
+            case "~":
+                d = f"C{num(ax + dx * 0.7)},{num(ay)} {num(ax + dx * 0.3)},{num(by)} {num(bx)},{num(by)}"
+            case "-~":
+                d = f"C{num(ax + dx * 0.7)},{num(ay)} {num(bx)},{num(by)} {num(bx)},{num(by)}"
+            case "~-":
+                d = f"C{num(ax)},{num(ay)} {num(ax + dx * 0.3)},{num(by)} {num(bx)},{num(by)}"
+            case "-|":
+                d = f"L{num(bx)},{num(ay)} L{num(bx)},{num(by)}"
+            case "|-":
+                d = f"L{num(ax)},{num(by)} L{num(bx)},{num(by)}"
+            case "-|-":
+                d = f"L{num(mx)},{num(ay)} L{num(mx)},{num(by)} L{num(bx)},{num(by)}"
+            case _:
+                d = f"L{num(bx)},{num(by)}"
+        markers = ""
+        if arrow_start:
+            markers += f' marker-start="url(#arrow-{self.uid})"'
+        if arrow_end:
+            markers += f' marker-end="url(#arrow-{self.uid})"'
+        out = [
+            f'<path d="M{num(ax)},{num(ay)} {d}" fill="none" stroke="{EDGE_COLOR}"{markers}/>'
+        ]
+        if label := label.strip():
+            lx, ly = mx, (ay + by) / 2
+            w = text_width(label) + 4
+            out.append(
+                f'<rect x="{num(lx - w / 2)}" y="{num(ly - 8)}" width="{num(w)}" height="14" fill="#fff"/>'
+                f'<text x="{num(lx)}" y="{num(ly + 3)}" text-anchor="middle" fill="{EDGE_COLOR}">'
+                f"{escape(label)}</text>"
+            )
+        return out
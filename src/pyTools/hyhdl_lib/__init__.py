@@ -1,15 +1,24 @@
-# ==============================================================================
-# COPYRIGHT(C) SIAT
-# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
-# DESCRIPTION:
-# *
-#
-# MODIFICATION HISTORY:---------------------------------------------------------
-#    Version | Author       | Date       | Changes
-#    :-----: | :----------: | :--------: | -------------------------------------------
-#    0.1     | WangXH       | 2022-08-14 | start coding
-#
-# ==============================================================================
-from .VerilogInstTb import VerilogInstTb
-from .VerilogDocumentor import VerilogDocumentor
-from .util_file import write_to_tmpfile
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------------
+#    0.1     | WangXH       | 2022-08-14 | start coding
+#
+# ==============================================================================
+from .VerilogInstTb import VerilogInstTb
+from .VerilogDocumentor import VerilogDocumentor
+from .VerilogIndexer import VerilogIndexer, iter_verilog_files
+from .VerilogSite import VerilogSite
+from .ModuleDiagram import DIAGRAM_MODES
+from .util_asset import WAVEDROM_SKINS, get_wavedrom_assets
+from .VerilogPreprocessor import get_preprocessor, parse_defines, set_preprocessor
+from .VerilogConstEval import eval_const, resolve_module
+from .util_cache import cache_stats, clear_caches, set_cache_dir
+from .util_file import write_to_tmpfile
+from .RequestScheduler import RequestScheduler
+from .util_metrics import Metrics, NULL_METRICS
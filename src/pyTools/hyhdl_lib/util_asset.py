@@ -0,0 +1,86 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     随插件发布的 wavedrom 资源 (脚本和主题)
+# *         每个进程中每个文件只读取一次, 主题 (skin) 可选
+# *         预览时可以通过 webview 的资源地址引用脚本, 不再内嵌到页面中
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+from .util_cache import hash_file, hash_text
+from .util_file import read_text_cached
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+WAVEDROM_DIR = "wavedrom"  # 资源的目录 (相对于 pyTools)
+WAVEDROM_JS = "wavedrom.min.js"
+WAVEDROM_SKINS = ("default", "lowkey", "narrow")  # 可选的主题, 对应 wavedrom/<skin>.js
+DEFAULT_SKIN = "default"
+
+
+# %% ---------------------------------------------------------------------------
+# WavedromAssets
+# ------------------------------------------------------------------------------
+class WavedromAssets(NamedTuple):
+    """
+    js_file: Path => wavedrom 脚本\n
+    theme_file: Path => 主题脚本
+    """
+
+    js_file: Path
+    theme_file: Path
+
+    @property
+    def js_text(self) -> str:
+        return read_text_cached(self.js_file)
+
+    @property
+    def theme_text(self) -> str:
+        return read_text_cached(self.theme_file)
+
+    @property
+    def version(self) -> str:
+        """
+        资源的版本 (文件内容的 hash), 用于生成的 html 的缓存的 key
+        """
+        return hash_text(hash_file(self.js_file), hash_file(self.theme_file))
+
+    def get_src(self, base: str) -> tuple[str, str]:
+        """
+        获取脚本和主题的引用地址\n
+        base: str => 资源目录的地址 (例如 webview 的资源地址, 静态站点中的相对路径)\n
+        return: tuple[str, str] => (脚本的地址, 主题的地址)
+        """
+        base = base.rstrip("/")
+        return f"{base}/{self.js_file.name}", f"{base}/{self.theme_file.name}"
+
+
+# %% ---------------------------------------------------------------------------
+# 获取资源
+# ------------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_wavedrom_assets(pytools_dir: str, skin: str = DEFAULT_SKIN) -> WavedromAssets:
+    """
+    获取 wavedrom 资源 (同一进程中复用, 文件内容在第一次使用时读取)\n
+    pytools_dir: str => pyTools 的路径\n
+    skin: str => 主题 (WAVEDROM_SKINS), None 表示默认主题\n
+    return: WavedromAssets => 脚本和主题
+    """
+    skin = skin or DEFAULT_SKIN
+    if skin not in WAVEDROM_SKINS:
+        raise ValueError(f"unknown wavedrom skin: {skin}, choose from {', '.join(WAVEDROM_SKINS)}")
+    wavedrom_dir = Path(pytools_dir).joinpath(WAVEDROM_DIR)
+    return WavedromAssets(wavedrom_dir.joinpath(WAVEDROM_JS), wavedrom_dir.joinpath(f"{skin}.js"))
@@ -0,0 +1,221 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     按内容 hash 缓存解析结果和生成的文本
+# *         model_cache: 源代码的 hash -> 解析结果 (module, 注释)
+# *         render_cache: 解析结果的 hash + 模板的 hash + 资源的版本 -> 生成的文本
+# *         wave_cache: wavedrom 数据的 hash -> svg (每个文件中可能有上百个 wave, 单独缓存)
+# *         include_cache: include 的文件 (路径, mtime, size) -> 删除注释后的代码, 被许多文件共用
+# *     内存中为有界的 LRU, 可选的磁盘缓存 (set_cache_dir) 用于在多次命令行调用之间共享
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+from .util_file import set_template_cache_dir
+
+# %% ---------------------------------------------------------------------------
+# hash
+# ------------------------------------------------------------------------------
+def hash_bytes(data: bytes) -> str:
+    """
+    计算内容的 hash\n
+    data: bytes => 内容\n
+    return: str => hash 字符串
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_text(*texts: str) -> str:
+    """
+    计算多个文本的 hash (文本之间以 "\\0" 分隔)\n
+    texts: str => 文本\n
+    return: str => hash 字符串
+    """
+    return hash_bytes("\0".join(texts).encode("utf-8", errors="surrogatepass"))
+
+
+_file_hashes: dict[str, tuple] = {}  # 文件路径 -> (mtime_ns, size, hash)
+
+
+def hash_file(file_name: str) -> str:
+    """
+    计算文件内容的 hash, 文件的 mtime 和 size 未变化时复用上次的结果\n
+    file_name: str => 文件路径\n
+    return: str => hash 字符串
+    """
+    file_name = str(file_name)
+    st = os.stat(file_name)
+    cached = _file_hashes.get(file_name)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    with open(file_name, "rb") as fp:
+        digest = hash_bytes(fp.read())
+    _file_hashes[file_name] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+@lru_cache(maxsize=None)
+def code_version() -> str:
+    """
+    hyhdl_lib 代码的版本 (由各源文件的 mtime 和 size 计算), 代码更新后磁盘缓存自动失效\n
+    return: str => 版本字符串
+    """
+    stats = sorted(
+        (p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in Path(__file__).parent.glob("*.py")
+    )
+    return hash_text(repr(stats))
+
+
+# %% ---------------------------------------------------------------------------
+# ContentCache
+# ------------------------------------------------------------------------------
+_MISSING = object()
+
+
+class ContentCache:
+    """
+    按内容 hash 缓存对象: 内存中为有界的 LRU, 可选的磁盘缓存 (pickle)
+    """
+
+    def __init__(self, name: str, maxsize: int = 32) -> None:
+        """
+        name: str => 缓存的名称 (磁盘缓存的子目录名)\n
+        maxsize: int => 内存中最多缓存的条目数
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.disk_dir = None  # 磁盘缓存的目录, None 表示不使用
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.__lru = OrderedDict()
+
+    # -------- 磁盘缓存的文件 --------
+    def _disk_file(self, key: str) -> Path:
+        return self.disk_dir.joinpath(key[:2], f"{key}.pkl")
+
+    # -------- 读取 --------
+    def get(self, key: str, default=None):
+        """
+        读取缓存, 内存中没有时再读取磁盘缓存\n
+        key: str => 内容的 hash\n
+        default: object => 没有缓存时的返回值\n
+        return: object => 缓存的对象
+        """
+        if (value := self.__lru.get(key, _MISSING)) is not _MISSING:
+            self.__lru.move_to_end(key)
+            self.hits += 1
+            return value
+        if self.disk_dir is not None:
+            try:
+                with open(self._disk_file(key), "rb") as fp:
+                    value = pickle.load(fp)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+            else:
+                self.disk_hits += 1
+                self._put_memory(key, value)
+                return value
+        self.misses += 1
+        return default
+
+    # -------- 写入 --------
+    def put(self, key: str, value) -> None:
+        """
+        写入缓存 (磁盘缓存先写入临时文件再重命名, 多个进程同时写入时不会读到不完整的文件)\n
+        key: str => 内容的 hash\n
+        value: object => 待缓存的对象 (写入后不应再修改)
+        """
+        self._put_memory(key, value)
+        if self.disk_dir is not None:
+            fname = self._disk_file(key)
+            try:
+                fname.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_name = tempfile.mkstemp(dir=fname.parent, suffix=".tmp")
+                with open(fd, "wb") as fp:
+                    pickle.dump(value, fp, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_name, fname)
+            except OSError:
+                pass
+
+    def _put_memory(self, key: str, value) -> None:
+        self.__lru[key] = value
+        self.__lru.move_to_end(key)
+        while len(self.__lru) > self.maxsize:
+            self.__lru.popitem(last=False)
+
+    # -------- 清空 --------
+    def clear(self) -> None:
+        """
+        清空内存中的缓存和统计 (不删除磁盘缓存)
+        """
+        self.__lru.clear()
+        self.hits = self.disk_hits = self.misses = 0
+
+    # -------- 统计 --------
+    def stats(self) -> dict:
+        """
+        return: dict => 命中和未命中的次数
+        """
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self.__lru),
+        }
+
+
+# %% ---------------------------------------------------------------------------
+# 全局缓存
+# ------------------------------------------------------------------------------
+model_cache = ContentCache("model", maxsize=32)
+render_cache = ContentCache("render", maxsize=64)
+wave_cache = ContentCache("wave", maxsize=1024)
+include_cache = ContentCache("include", maxsize=256)  # include 的文件删除注释后的代码
+
+
+def set_cache_dir(cache_dir: str) -> None:
+    """
+    启用磁盘缓存, 目录下按代码版本分开保存, 代码更新后不会读到旧的结果\n
+    模板的字节码也保存在该目录下 (templates)\n
+    cache_dir: str => 磁盘缓存的目录, None 表示不使用磁盘缓存 (模板的字节码使用 jinja2 的默认目录)
+    """
+    for cache in (model_cache, render_cache, wave_cache, include_cache):
+        if cache_dir is None:
+            cache.disk_dir = None
+        else:
+            cache.disk_dir = Path(cache_dir).joinpath(code_version(), cache.name)
+    try:
+        set_template_cache_dir(None if cache_dir is None else Path(cache_dir).joinpath("templates"))
+    except OSError:
+        pass
+
+
+def cache_stats() -> dict:
+    """
+    return: dict => 各缓存的命中和未命中的次数
+    """
+    return {cache.name: cache.stats() for cache in (model_cache, render_cache, wave_cache, include_cache)}
+
+
+def clear_caches() -> None:
+    """
+    清空内存中的所有缓存 (例如性能测试时每次都重新解析和生成)
+    """
+    for cache in (model_cache, render_cache, wave_cache, include_cache):
+        cache.clear()
@@ -1,27 +1,116 @@
-# ==============================================================================
-# COPYRIGHT(C) SIAT
-# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
-# DESCRIPTION:
-# *
-#
-# MODIFICATION HISTORY:---------------------------------------------------------
-#    Version | Author       | Date       | Changes
-#    :-----: | :----------: | :--------: | -------------------------------------------
-#    0.1     | WangXH       | 2022-08-14 | start coding
-#
-# ==============================================================================
-import tempfile
-from pathlib import Path
-
-# -------- 写入到临时文件 --------
-def write_to_tmpfile(file_name: str, text: str) -> str:
-    """
-    将文本写到临时文件\n
-    file_name: str => 文件名\n
-    text: str => 待写入的文本\n
-    return: str => 临时文件的路径
-    """
-    with Path(tempfile.gettempdir()).joinpath(file_name).open("w", encoding="utf-8") as fp:
-        fp.write(text)
-        fname = fp.name
-    return fname
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------------
+#    0.1     | WangXH       | 2022-08-14 | start coding
+#
+# ==============================================================================
+import os
+import tempfile
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+# -------- 写入到临时文件 --------
+TMPFILE_MAX_AGE = 3600  # 唯一的临时文件保留的时间 (s), 之后写入同名前缀的文件时删除
+
+
+def write_to_tmpfile(file_name: str, text: str, suffix: str = "", unique: bool = True) -> str:
+    """
+    将文本写到临时文件\n
+    file_name: str => 文件名 (unique 为 True 时作为前缀)\n
+    text: str => 待写入的文本\n
+    suffix: str => 文件后缀\n
+    unique: bool => 是否为每次调用生成唯一的文件名, 避免多个编辑器窗口同时调用时互相覆盖;
+        同一前缀的超过 TMPFILE_MAX_AGE 的文件在此时删除, 调用者也可以在读取后自行删除\n
+    return: str => 临时文件的路径
+    """
+    if unique:
+        remove_old_tmpfiles(file_name)
+        fd, fname = tempfile.mkstemp(suffix=suffix, prefix=f"{file_name}_", text=True)
+    else:
+        fd = fname = str(Path(tempfile.gettempdir()).joinpath(file_name + suffix))
+    with open(fd, "w", encoding="utf-8") as fp:
+        fp.write(text)
+    return fname
+
+
+def remove_old_tmpfiles(file_name: str, max_age: float = TMPFILE_MAX_AGE) -> None:
+    """
+    删除临时目录中 write_to_tmpfile 生成的旧文件 (不能删除的文件忽略)\n
+    file_name: str => 文件名的前缀\n
+    max_age: float => 保留的时间 (s)
+    """
+    prefix = f"{file_name}_"
+    expire = time.time() - max_age
+    try:
+        with os.scandir(tempfile.gettempdir()) as it:
+            for entry in it:
+                try:
+                    if (
+                        entry.name.startswith(prefix)
+                        and entry.is_file(follow_symlinks=False)
+                        and entry.stat(follow_symlinks=False).st_mtime < expire
+                    ):
+                        os.remove(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+
+
+# -------- 读取文本 (缓存) --------
+@lru_cache(maxsize=None)
+def read_text_cached(file_name: str) -> str:
+    """
+    读取文本文件, 同一进程中每个文件只读取一次 (用于 wavedrom 等随插件发布的资源)\n
+    file_name: str => 文件路径\n
+    return: str => 文件内容
+    """
+    with Path(file_name).open("r", encoding="utf-8") as fp:
+        return fp.read()
+
+
+# -------- 读取模板 (缓存) --------
+_template_envs: dict[Path, Environment] = {}  # 每个模板目录对应一个 jinja2 Environment
+_bytecode_cache = None  # 模板编译后的字节码的磁盘缓存, 第一次使用时创建
+
+
+def set_template_cache_dir(cache_dir: str = None) -> None:
+    """
+    设置模板字节码的缓存目录 (字节码按模板内容的 hash 保存, 模板修改后自动重新编译)\n
+    cache_dir: str => 缓存目录, None 表示 jinja2 的默认目录 (临时目录下每个用户一个)
+    """
+    global _bytecode_cache
+    if cache_dir is not None:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        cache_dir = str(cache_dir)
+    _bytecode_cache = FileSystemBytecodeCache(cache_dir, "hyhdl_%s.cache")
+    for env in _template_envs.values():
+        env.bytecode_cache = _bytecode_cache
+
+
+def get_template(template_fname: str) -> Template:
+    """
+    获取 jinja2 模板, 同一目录下的模板共享一个 Environment, 模板编译后由 Environment 缓存,\n
+    编译后的字节码同时保存在磁盘中, 新的进程不再重新编译\n
+    template_fname: str => 模板文件路径\n
+    return: Template => jinja2 模板
+    """
+    tPath = Path(template_fname).absolute()
+    if (env := _template_envs.get(tPath.parent)) is None:
+        if _bytecode_cache is None:
+            try:
+                set_template_cache_dir()
+            except OSError:  # 没有可用的缓存目录时只在内存中缓存
+                pass
+        env = Environment(loader=FileSystemLoader(tPath.parent), bytecode_cache=_bytecode_cache)
+        _template_envs[tPath.parent] = env
+    return env.get_template(tPath.name)
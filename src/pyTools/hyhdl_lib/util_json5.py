@@ -0,0 +1,100 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     解析宽松的 json (wavedrom 中常用的 JSON5 风格的写法), 不执行注释中的任何代码
+# *         key 可以不加引号, 字符串可以使用单引号, 数组和对象末尾可以有多余的逗号
+# *         支持 // 和 /* */ 注释, 十六进制数, 以 "." 开头或结尾的小数, 正号, Infinity, NaN
+# *         不加引号的其他单词 (例如 {name: clk}) 作为字符串, 与 wavedrom 的写法习惯一致
+# *     用一次正则切分找出需要转换的片段, 转换为严格的 json 后由 json.loads (C 实现) 解析
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+import json
+import re
+
+# %% ---------------------------------------------------------------------------
+# const
+# ------------------------------------------------------------------------------
+# 切分出需要转换的片段, 其余的文本 (标点, 空白, 严格 json 的数值) 保持不变
+re_relaxed_split = re.compile(
+    r"("
+    r'"(?:[^"\\\n]|\\.|\\\n)*"|' r"'(?:[^'\\\n]|\\.|\\\n)*'|"  # 字符串
+    r"//[^\n]*|/\*.*?\*/|"  # 注释
+    r",(?=(?:\s|//[^\n]*|/\*.*?\*/)*[}\]])|"  # 末尾多余的逗号
+    r"(?<![\w$.])(?:[+-]?(?:0[xX][0-9a-fA-F]+|\d*\.\d*(?:[eE][+-]?\d+)?)|\+\d+(?:[eE][+-]?\d+)?)(?![\w$.])|"  # 数值
+    r"(?<![\w$.])[A-Za-z_$\u0080-\uffff][\w$\u0080-\uffff]*"  # 不加引号的单词
+    r")",
+    re.S,
+)
+re_escape = re.compile(r"\\(x[0-9a-fA-F]{2}|\n|.)", re.S)
+re_unescaped_quote = re.compile(r'(?<!\\)((?:\\\\)*)"')
+ESCAPES = {"'": "'", "v": "\\u000b", "0": "\\u0000", "\n": ""}  # json 中没有的转义
+JSON_WORDS = {"true", "false", "null", "Infinity", "NaN"}  # json.loads 可以解析的单词
+
+
+# %% ---------------------------------------------------------------------------
+# 转换
+# ------------------------------------------------------------------------------
+def _convert_escape(m: re.Match) -> str:
+    esc = m.group(1)
+    if esc[0] == "x" and len(esc) == 3:
+        return f"\\u00{esc[1:]}"
+    return ESCAPES.get(esc, m.group())
+
+
+def _convert_token(token: str) -> str:
+    """
+    将一个片段转换为严格的 json\n
+    token: str => 字符串, 注释, 末尾多余的逗号, 数值或单词\n
+    return: str => 转换后的文本
+    """
+    ch = token[0]
+    # -------- 字符串 --------
+    if ch in "\"'":
+        body = token[1:-1]
+        if "\\" in body:
+            body = re_escape.sub(_convert_escape, body)
+        if ch == "'":
+            body = re_unescaped_quote.sub(r'\1\\"', body)
+        return f'"{body}"'
+    # -------- 注释, 逗号 --------
+    elif ch == "/":
+        return " "
+    elif ch == ",":
+        return ""
+    # -------- 数值 --------
+    elif ch in "+-.0123456789":
+        sign = "-" if ch == "-" else ""
+        body = token.lstrip("+-")
+        if body[:2] in ("0x", "0X"):
+            return f"{sign}{int(body, 16)}"
+        if body == ".":
+            raise ValueError("invalid number: .")
+        return f"{sign}{float(body)!r}" if "." in body else f"{sign}{body}"
+    # -------- 单词 --------
+    return token if token in JSON_WORDS else json.dumps(token, ensure_ascii=False)
+
+
+def loads_relaxed(text: str):
+    """
+    解析宽松的 json\n
+    text: str => json 文本\n
+    return: object => 解析结果 (dict, list, str, int, float, bool, None)
+    """
+    parts = re_relaxed_split.split(text)
+    # 单引号字符串和不加引号的 key 最常见, 直接转换, 其余的片段由 _convert_token 处理
+    parts[1::2] = [
+        f'"{x[1:-1]}"' if x[0] == "'" and "\\" not in x and '"' not in x
+        else (x if x in JSON_WORDS else f'"{x}"') if x.isidentifier()
+        else _convert_token(x)
+        for x in parts[1::2]
+    ]
+    return json.loads("".join(parts))
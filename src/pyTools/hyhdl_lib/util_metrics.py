@@ -0,0 +1,122 @@
+# ==============================================================================
+# COPYRIGHT(C) SIAT
+# AUTHOR: WangXH<xh.wang@siat.ac.cn>, From the group of PET
+# DESCRIPTION:
+# *     记录各处理阶段的耗时和数据量, 用于定位性能瓶颈 (hyhdl --metrics)
+# *     各阶段的开始也是处理可以停止的位置: CancellableMetrics 在阶段开始时检查请求是否已被取消
+#
+# MODIFICATION HISTORY:---------------------------------------------------------
+#    Version | Author       | Date       | Changes
+#    :-----: | :----------: | :--------: | -------------------------------------------
+#    0.1     | WangXH       | 2026-10-18 | start coding
+#
+# ==============================================================================
+# %% ---------------------------------------------------------------------------
+# import
+# ------------------------------------------------------------------------------
+from contextlib import contextmanager
+from time import perf_counter
+
+
+# %% ---------------------------------------------------------------------------
+# Metrics
+# ------------------------------------------------------------------------------
+class Metrics:
+    """
+    记录各阶段的耗时 (同名阶段累加) 和计数, enabled 为 False 时所有记录均为空操作
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        """
+        enabled: bool => 是否记录
+        """
+        self.enabled = enabled
+        self.timings = {}  # 阶段名 -> 耗时 (s)
+        self.counts = {}  # 计数名 -> 数值
+
+    # -------- 记录一个阶段的耗时 --------
+    @contextmanager
+    def phase(self, name: str):
+        """
+        with metrics.phase("module parse"): ...\n
+        name: str => 阶段名
+        """
+        if not self.enabled:
+            yield
+            return
+        t_start = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + perf_counter() - t_start
+
+    # -------- 记录计数 --------
+    def count(self, name: str, n: int) -> None:
+        """
+        name: str => 计数名\n
+        n: int => 累加的数值
+        """
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    # -------- 导出 --------
+    def to_dict(self) -> dict:
+        """
+        return: dict => {"timings_ms": {阶段名: 毫秒}, "counts": {计数名: 数值}}
+        """
+        return {
+            "timings_ms": {k: round(v * 1000, 3) for k, v in self.timings.items()},
+            "counts": dict(self.counts),
+        }
+
+
+# 不记录任何数据的 Metrics, 未开启 --metrics 时使用
+NULL_METRICS = Metrics(enabled=False)
+
+
+# %% ---------------------------------------------------------------------------
+# CancellableMetrics
+# ------------------------------------------------------------------------------
+class RequestCancelled(Exception):
+    """
+    请求已被取消 (被更新的请求取代)
+    """
+
+
+class CancellableMetrics(Metrics):
+    """
+    可以取消的 Metrics: 在 cancellable() 的范围内, 每个阶段开始时检查是否已取消, 已取消时抛出 RequestCancelled\n
+    (其他线程调用 cancel, 处理在下一个阶段开始时停止, 不需要修改各阶段的代码)
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        """
+        enabled: bool => 是否记录耗时和计数 (取消与是否记录无关)
+        """
+        super().__init__(enabled)
+        self.cancelled = False
+        self.__armed = False  # 是否位于可以停止的范围内
+
+    def cancel(self) -> None:
+        """
+        取消请求, 处理在下一个阶段开始时停止 (不在 cancellable 的范围内时不停止)
+        """
+        self.cancelled = True
+
+    @contextmanager
+    def cancellable(self):
+        """
+        with metrics.cancellable(): ... 范围内的处理可以在阶段开始时停止 (停止后不会留下不一致的状态)
+        """
+        self.__armed = True
+        try:
+            yield
+        finally:
+            self.__armed = False
+
+    @contextmanager
+    def phase(self, name: str):
+        if self.cancelled and self.__armed:
+            raise RequestCancelled(name)
+        with super().phase(name):
+            yield